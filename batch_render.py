@@ -0,0 +1,152 @@
+"""
+Render whole directories of PDF scores to page images or thumbnails.
+
+Pages are rendered by a pool of worker processes, one page per job, with
+the same rasterization code as the viewer (page_render). Every image is
+written to a temporary file and renamed into place, and images newer than
+their PDF are skipped, so an interrupted run simply picks up where it
+stopped when started again. Only the age of an image is compared, so
+pass --force after changing the size or rotation of existing outputs.
+
+Usage:
+    python batch_render.py scores/ -o thumbnails/ --width 200
+    python batch_render.py score.pdf -o pages/ --zoom 2 --format webp --pages 1-4
+"""
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import fitz  # PyMuPDF
+
+import page_render
+
+FORMATS = ('png', 'webp')
+
+
+def find_pdfs(inputs):
+    """PDF files named in inputs, with directories searched recursively, as (path, root) pairs."""
+    found = []
+    for path in inputs:
+        if os.path.isdir(path):
+            for directory, _, names in os.walk(path):
+                found.extend((os.path.join(directory, name), path) for name in sorted(names)
+                             if name.lower().endswith('.pdf'))
+        else:
+            found.append((path, os.path.dirname(path)))
+    return found
+
+
+def parse_pages(text, page_count):
+    """Page indices selected by a 1-based spec such as '1-3,7'; all pages if text is empty."""
+    if not text:
+        return range(page_count)
+    pages = set()
+    for part in text.split(','):
+        first, _, last = part.partition('-')
+        first = int(first) if first else 1
+        last = int(last) if last else (page_count if _ else first)
+        pages.update(range(max(first, 1) - 1, min(last, page_count)))
+    return sorted(pages)
+
+
+def output_path(output_dir, pdf_path, root, page_index, image_format):
+    """Image path of one page: the PDF's path below root, one directory per document."""
+    relative = os.path.splitext(os.path.relpath(pdf_path, root))[0]
+    return os.path.join(output_dir, relative, f"page-{page_index + 1:04d}.{image_format}")
+
+
+def is_up_to_date(output, pdf_mtime):
+    try:
+        st = os.stat(output)
+    except FileNotFoundError:
+        return False
+    return st.st_size > 0 and st.st_mtime >= pdf_mtime
+
+
+def render_page_file(pdf_path, page_index, output, zoom_factor, width, rotation, image_format):
+    """Render one page to an image file; runs in a worker process."""
+    page = page_render.worker_document(pdf_path)[page_index]
+    if width:
+        zoom_factor = page_render.fit_width_zoom(page, width, rotation)
+    pixmap = page_render.render_pixmap(page, zoom_factor, rotation)
+
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    temp_path = f"{output}.{os.getpid()}.tmp"
+    try:
+        if image_format == 'webp':
+            from PIL import Image
+
+            image = Image.frombytes('RGB', (pixmap.width, pixmap.height), pixmap.samples)
+            image.save(temp_path, format='WEBP', quality=85)
+        else:
+            pixmap.save(temp_path, output='png')
+        os.replace(temp_path, output)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    return output
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render PDF scores to page images and thumbnails.")
+    parser.add_argument('inputs', nargs='+', help="PDF files or directories to search for PDFs")
+    parser.add_argument('-o', '--output', required=True, help="directory for the rendered images")
+    size = parser.add_mutually_exclusive_group()
+    size.add_argument('--zoom', type=float, default=1.0, help="zoom factor (default: 1.0, i.e. 72 DPI)")
+    size.add_argument('--width', type=int, help="thumbnail width in pixels instead of a zoom factor")
+    parser.add_argument('--rotation', type=int, default=0, choices=(0, 90, 180, 270))
+    parser.add_argument('--format', choices=FORMATS, default='png', help="image format (webp needs Pillow)")
+    parser.add_argument('--pages', help="1-based pages to render, e.g. 1-3,7 (default: all)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="worker processes (default: all cores)")
+    parser.add_argument('--force', action='store_true', help="re-render images that are up to date")
+    args = parser.parse_args(argv)
+
+    if args.format == 'webp':
+        try:
+            import PIL  # noqa: F401
+        except ImportError:
+            parser.error("--format webp needs Pillow (pip install Pillow)")
+
+    jobs = []
+    skipped = 0
+    for pdf_path, root in find_pdfs(args.inputs):
+        try:
+            with fitz.open(pdf_path) as document:
+                page_count = len(document)
+            pdf_mtime = os.stat(pdf_path).st_mtime
+        except Exception as e:
+            print(f"Error opening {pdf_path}: {e}")
+            continue
+        for page_index in parse_pages(args.pages, page_count):
+            output = output_path(args.output, pdf_path, root, page_index, args.format)
+            if not args.force and is_up_to_date(output, pdf_mtime):
+                skipped += 1
+                continue
+            jobs.append((pdf_path, page_index, output))
+
+    # Jobs are submitted document by document, so workers mostly reuse their open file
+    rendered = 0
+    failed = 0
+    if jobs:
+        with ProcessPoolExecutor(max_workers=args.workers) as executor:
+            futures = {executor.submit(render_page_file, pdf_path, page_index, output, args.zoom,
+                                       args.width, args.rotation, args.format): (pdf_path, page_index)
+                       for pdf_path, page_index, output in jobs}
+            for future in as_completed(futures):
+                pdf_path, page_index = futures[future]
+                try:
+                    future.result()
+                    rendered += 1
+                except Exception as e:
+                    print(f"Error rendering page {page_index + 1} of {pdf_path}: {e}")
+                    failed += 1
+                if (rendered + failed) % 50 == 0:
+                    print(f"{rendered + failed} / {len(jobs)} pages")
+
+    print(f"Rendered {rendered} pages, skipped {skipped} up to date, {failed} failed")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
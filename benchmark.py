@@ -0,0 +1,358 @@
+"""
+Reproducible benchmarks of page rendering and MusicXML parsing.
+
+The viewer runs offscreen on the bundled La Gazza ladra score and on
+synthetic scores made by repeating it (--scales 1,4 gives the score itself
+and one four times as long, in pages and in measures). For every score:
+
+    open_ms              load_pdf until the first page is on screen
+    page_turn_ms/<zoom>  next_page until the page is on screen (median, p95);
+                         at tiled zooms, until every visible tile is
+    scroll_pages_per_s   Continuous mode scrolled a screen at a time, waiting
+                         for every visible page to be sharp
+    peak_rss_mb          peak resident memory of the viewer process
+    parse/...            MusicXML summary, structure index and note table,
+                         each timed in one run, and the parse process's peak RSS
+
+Viewer and parser runs each get a fresh process, so caches and peak RSS
+do not carry over between scores. Thumbnails are rendered before the
+viewer starts so that they do not compete with the measured pages.
+
+Results are written as JSON. With --baseline they are compared to an
+earlier result, and the exit status is 1 if any metric is worse by more
+than --threshold (a fraction; 0.2 allows 20%).
+
+Usage:
+    python benchmark.py -o results.json --baseline benchmark_baseline.json
+    python benchmark.py --scales 1,4,16 -o new.json --baseline results.json
+"""
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import platform
+import re
+import resource
+import statistics
+import sys
+import tempfile
+import time
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+DEFAULT_ZOOMS = '1,2,3,4.5'  # 4.5 is past TILE_ZOOM_THRESHOLD, so pages are tiled
+DEFAULT_THRESHOLD = 0.2
+TIMEOUT = 60  # Seconds to wait for a page before giving up
+
+_MEASURE_NUMBER = re.compile(rb'(<measure\b[^>]*?\bnumber=")(\d+)')
+
+
+def bundled_score():
+    """(PDF, MusicXML) paths of the score in the data directory."""
+    pdfs = sorted(glob.glob(os.path.join(DATA_DIR, '*.pdf')))
+    if not pdfs:
+        raise FileNotFoundError(f"No PDF in {DATA_DIR}")
+    base = os.path.splitext(pdfs[0])[0]
+    return pdfs[0], base + '.musicxml'
+
+
+def repeat_pdf(source, output, times):
+    import fitz  # PyMuPDF
+
+    with fitz.open(source) as original, fitz.open() as document:
+        for _ in range(times):
+            document.insert_pdf(original)
+        document.save(output)
+
+
+def repeat_musicxml(source, output, times):
+    """
+    Write a score whose parts hold the measures of source's parts times
+    times over, renumbered to follow on from each other.
+    """
+    import score_tree
+
+    with open(source, 'rb') as f:
+        data = f.read()
+    parts = score_tree.index_structure(data)
+    chunks = []
+    position = 0
+    for part in parts:
+        if not part['numbers']:
+            continue
+        first, last = int(part['starts'][0]), int(part['ends'][-1])
+        measures = data[first:last]
+        count = len(part['numbers'])
+        chunks.append(data[position:first])
+        for copy in range(times):
+            offset = copy * count
+            chunks.append(_MEASURE_NUMBER.sub(
+                lambda m, offset=offset: m.group(1) + str(int(m.group(2)) + offset).encode(), measures))
+        position = last
+    chunks.append(data[position:])
+    with open(output, 'wb') as f:
+        f.write(b''.join(chunks))
+
+
+def prepare_scores(scales, work_dir):
+    """
+    Put a copy of the score at every scale in work_dir, each PDF in a
+    directory of its own (so the viewer finds no MusicXML beside it and
+    builds no measure map while being timed). Returns (label, pdf, xml) tuples.
+    """
+    pdf, xml = bundled_score()
+    scores = []
+    for scale in scales:
+        label = f"x{scale}"
+        directory = os.path.join(work_dir, label)
+        os.makedirs(directory, exist_ok=True)
+        scale_pdf = os.path.join(directory, 'score.pdf')
+        scale_xml = os.path.join(work_dir, f"{label}.musicxml")
+        repeat_pdf(pdf, scale_pdf, scale)
+        repeat_musicxml(xml, scale_xml, scale)
+        scores.append((label, scale_pdf, scale_xml))
+    return scores
+
+
+def render_thumbnails(pdf):
+    import page_render
+    import thumbnail_store
+
+    digest = thumbnail_store.pdf_hash(pdf)
+    for page_index in range(len(page_render.worker_document(pdf))):
+        thumbnail_store.render_thumbnail(pdf, digest, page_index)
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1048576 if sys.platform == 'darwin' else 1024), 1)
+
+
+def summarize(durations):
+    ordered = sorted(durations)
+    return {'median': round(statistics.median(ordered) * 1000, 2),
+            'p95': round(ordered[max(0, -(-len(ordered) * 95 // 100) - 1)] * 1000, 2)}
+
+
+def wait_until(app, condition):
+    """Process events until condition() holds; returns the seconds it took."""
+    start = time.perf_counter()
+    while not condition():
+        if time.perf_counter() - start > TIMEOUT:
+            raise TimeoutError("Page was not displayed in time")
+        app.processEvents()
+        time.sleep(0.0005)
+    return time.perf_counter() - start
+
+
+def bench_viewer(pdf, zooms, turns, turn_interval):
+    """Time the viewer on pdf; runs in a process of its own."""
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt5.QtWidgets import QApplication
+
+    from music_pdf_viewer import PDFViewer
+    from page_cache import PageCache
+
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    viewer = PDFViewer()
+    viewer.resize(1200, 900)
+    viewer.show()
+    app.processEvents()
+
+    def page_shown():
+        if viewer.zoom_timer.isActive():
+            return False
+        if viewer.zoom_factor >= viewer.TILE_ZOOM_THRESHOLD:
+            # Tiled pages have no page item; every tile on screen must be there
+            return (viewer.tiled_zoom == viewer.zoom_factor
+                    and all(tile in viewer.tile_items for tile in viewer.tiles_near_viewport(0)))
+        key = PageCache.make_key(viewer.current_page, viewer.zoom_factor, viewer.rotation)
+        return viewer.page_item_key == key
+
+    def pages_sharp():
+        visible = viewer.pages_near_viewport(0)
+        return all(page in viewer.page_pixmap_items and page not in viewer.preview_pages
+                   for page in visible)
+
+    def dwell():
+        # Leave the viewer idle for a while as a reader would, so prefetching can work
+        end = time.perf_counter() + turn_interval
+        while time.perf_counter() < end:
+            app.processEvents()
+            time.sleep(0.001)
+
+    results = {}
+    try:
+        start = time.perf_counter()
+        viewer.load_pdf(pdf)
+        wait_until(app, page_shown)
+        results['open_ms'] = round((time.perf_counter() - start) * 1000, 2)
+        page_count = len(viewer.pdf_document)
+
+        results['page_turn_ms'] = {}
+        for zoom in zooms:
+            viewer.first_page()
+            viewer.zoom_factor = zoom
+            viewer.apply_zoom()
+            wait_until(app, page_shown)
+            durations = []
+            for _ in range(min(turns, page_count - 1)):
+                dwell()
+                start = time.perf_counter()
+                viewer.next_page()
+                wait_until(app, page_shown)
+                durations.append(time.perf_counter() - start)
+            results['page_turn_ms'][f"{zoom:g}"] = summarize(durations)
+
+        viewer.first_page()
+        viewer.zoom_factor = 1.0
+        viewer.apply_zoom()
+        viewer.view_mode_combo.setCurrentIndex(viewer.CONTINUOUS)
+        wait_until(app, pages_sharp)
+        scroll_bar = viewer.view.verticalScrollBar()
+        step = viewer.view.viewport().height()
+        pages_seen = set(viewer.pages_near_viewport(0))
+        start = time.perf_counter()
+        while scroll_bar.value() < scroll_bar.maximum():
+            scroll_bar.setValue(scroll_bar.value() + step)
+            wait_until(app, pages_sharp)
+            pages_seen.update(viewer.pages_near_viewport(0))
+        results['scroll_pages_per_s'] = round(len(pages_seen) / (time.perf_counter() - start), 2)
+    finally:
+        viewer.close()
+    results['peak_rss_mb'] = peak_rss_mb()
+    return results
+
+
+def bench_parse(xml):
+    """Time the MusicXML readers on xml; runs in a process of its own."""
+    import musicxml_reader
+    import note_table
+    import score_tree
+
+    results = {}
+    for name, function in (('summary_ms', musicxml_reader.read_summary),
+                           ('structure_ms', score_tree.index_file),
+                           ('note_table_ms', note_table.extract_note_table)):
+        start = time.perf_counter()
+        function(xml)
+        results[name] = round((time.perf_counter() - start) * 1000, 2)
+    results['peak_rss_mb'] = peak_rss_mb()
+    return results
+
+
+def _run_child(connection, function, args):
+    try:
+        connection.send((True, function(*args)))
+    except Exception as e:
+        connection.send((False, f"{type(e).__name__}: {e}"))
+    finally:
+        connection.close()
+
+
+def run_isolated(function, *args):
+    """Run function(*args) in a fresh process and return its result."""
+    # Spawn rather than fork so no state (or memory) of this process carries over
+    context = multiprocessing.get_context('spawn')
+    receiver, sender = context.Pipe(duplex=False)
+    process = context.Process(target=_run_child, args=(sender, function, args))
+    process.start()
+    sender.close()
+    try:
+        ok, result = receiver.recv()
+    except EOFError:
+        ok, result = False, f"benchmark process exited with code {process.exitcode}"
+    process.join()
+    if not ok:
+        raise RuntimeError(result)
+    return result
+
+
+def flatten(results, prefix=''):
+    """{'a': {'b': 1}} -> {'a/b': 1}"""
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{key}/"))
+        else:
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+
+def compare(results, baseline, threshold):
+    """
+    Print every metric next to its baseline value and return the names of
+    those that got worse by more than threshold.
+    """
+    current = flatten(results['scores'])
+    previous = flatten(baseline['scores'])
+    regressions = []
+    print(f"{'metric':<40}{'baseline':>12}{'current':>12}{'change':>9}")
+    for name in sorted(current.keys() & previous.keys()):
+        new, old = current[name], previous[name]
+        if not old:
+            continue
+        change = (new - old) / old
+        # Throughputs should go up, everything else (times, memory) down
+        worse = -change if name.endswith('_per_s') else change
+        flag = ''
+        if worse > threshold:
+            regressions.append(name)
+            flag = '  REGRESSION'
+        print(f"{name:<40}{old:>12.2f}{new:>12.2f}{change:>+9.0%}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark page rendering and MusicXML parsing offscreen.")
+    parser.add_argument('-o', '--output', help="write the results to this JSON file")
+    parser.add_argument('--baseline', help="compare with the results in this JSON file")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help=f"largest tolerated slowdown, as a fraction (default: {DEFAULT_THRESHOLD})")
+    parser.add_argument('--scales', default='1,4', help="score sizes as multiples of the bundled score (default: 1,4)")
+    parser.add_argument('--zooms', default=DEFAULT_ZOOMS, help=f"zoom factors for page turns (default: {DEFAULT_ZOOMS})")
+    parser.add_argument('--turns', type=int, default=20, help="page turns per zoom factor (default: 20)")
+    parser.add_argument('--turn-interval', type=float, default=0.2,
+                        help="seconds between page turns (default: 0.2)")
+    args = parser.parse_args(argv)
+
+    scales = [int(scale) for scale in args.scales.split(',')]
+    zooms = [float(zoom) for zoom in args.zooms.split(',')]
+
+    results = {'meta': {'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                        'python': platform.python_version(), 'platform': platform.platform(),
+                        'cpus': os.cpu_count(), 'zooms': zooms, 'turns': args.turns,
+                        'turn_interval': args.turn_interval},
+               'scores': {}}
+    with tempfile.TemporaryDirectory(prefix='mrviewer-benchmark-') as work_dir:
+        # Keep the score cache and thumbnail store of the user out of it
+        os.environ['MRVIEWER_CACHE_DIR'] = os.path.join(work_dir, 'cache')
+        os.environ['QT_QPA_PLATFORM'] = 'offscreen'
+        os.environ.pop('MRVIEWER_PERF_LOG', None)
+        for label, pdf, xml in prepare_scores(scales, work_dir):
+            print(f"{label}: {os.path.getsize(pdf) / 1048576:.1f} MB PDF, "
+                  f"{os.path.getsize(xml) / 1048576:.1f} MB MusicXML")
+            render_thumbnails(pdf)
+            score = run_isolated(bench_viewer, pdf, zooms, args.turns, args.turn_interval)
+            score['parse'] = run_isolated(bench_parse, xml)
+            results['scores'][label] = score
+            print(json.dumps(score))
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+            f.write('\n')
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} metrics regressed by more than {args.threshold:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
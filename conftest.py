@@ -0,0 +1,75 @@
+"""
+Shared pytest fixtures: a Qt application for the viewer tests and small
+generated PDFs, so no test depends on the bundled score.
+"""
+import os
+import shutil
+import time
+import zipfile
+
+import pytest
+
+TEST_SCORE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'test_score.musicxml')
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    """Keep the score cache and thumbnail store of every test in its own directory."""
+    directory = tmp_path / 'cache'
+    monkeypatch.setenv('MRVIEWER_CACHE_DIR', str(directory))
+    monkeypatch.delenv('MRVIEWER_PERF_LOG', raising=False)
+    return directory
+
+
+@pytest.fixture(scope='session')
+def qapp():
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt5.QtWidgets import QApplication
+
+    return QApplication.instance() or QApplication([])
+
+
+def wait_until(qapp, condition, timeout=30):
+    """Process Qt events until condition() is true."""
+    end = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > end:
+            raise TimeoutError("Condition not met in time")
+        qapp.processEvents()
+        time.sleep(0.002)
+
+
+def make_pdf(path, pages, width=595, height=842):
+    """Write a PDF of pages A4 pages, each with a line of text and a few staff-like lines."""
+    import fitz  # PyMuPDF
+
+    with fitz.open() as document:
+        for page_index in range(pages):
+            page = document.new_page(width=width, height=height)
+            page.insert_text((72, 72), f"Page {page_index + 1}", fontsize=24)
+            for line in range(5):
+                y = 150 + line * 6
+                page.draw_line((50, y), (width - 50, y))
+        document.save(path)
+    return str(path)
+
+
+def make_mxl(path, members):
+    """Write a compressed MusicXML archive holding members (name -> bytes)."""
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    return str(path)
+
+
+@pytest.fixture
+def pdf_path(tmp_path):
+    return make_pdf(tmp_path / 'score.pdf', 6)
+
+
+@pytest.fixture
+def score_path(tmp_path):
+    """A copy of test_score.musicxml (two parts, two measures each) that tests may rewrite."""
+    path = tmp_path / 'score.musicxml'
+    shutil.copy(TEST_SCORE, path)
+    return str(path)
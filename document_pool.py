@@ -0,0 +1,81 @@
+"""
+Pool of open fitz documents, so switching back to a score does not reopen it.
+"""
+import os
+import time
+from collections import OrderedDict
+
+import fitz  # PyMuPDF
+
+
+class DocumentPool:
+    """
+    Open documents keyed by path, least recently used first.
+
+    At most max_open documents stay open; beyond that the least recently
+    used one is closed. close_idle closes those unused for idle_seconds,
+    for callers that want to give memory back after a while. A document
+    whose file has been replaced or rewritten since it was opened is
+    opened again.
+    """
+
+    def __init__(self, max_open=10, idle_seconds=600):
+        self.max_open = max_open
+        self.idle_seconds = idle_seconds
+        self._documents = OrderedDict()  # path -> [document, time of last use, (size, mtime)]
+
+    def get(self, path):
+        """The open document at path, opening it if necessary."""
+        st = os.stat(path)
+        identity = (st.st_size, st.st_mtime_ns)
+        entry = self._documents.get(path)
+        if entry is not None and entry[2] != identity:
+            self.close(path)
+            entry = None
+        if entry is None:
+            entry = self._documents[path] = [fitz.open(path), 0, identity]
+            self._trim(path)
+        else:
+            self._documents.move_to_end(path)
+        entry[1] = time.monotonic()
+        return entry[0]
+
+    def is_current(self, path):
+        """Whether the document at path is open and its file unchanged since."""
+        entry = self._documents.get(path)
+        if entry is None:
+            return False
+        try:
+            st = os.stat(path)
+        except OSError:
+            return False
+        return entry[2] == (st.st_size, st.st_mtime_ns)
+
+    def close(self, path):
+        entry = self._documents.pop(path, None)
+        if entry is not None:
+            entry[0].close()
+
+    def close_idle(self, keep=()):
+        """Close documents unused for idle_seconds, except those whose paths are in keep."""
+        limit = time.monotonic() - self.idle_seconds
+        for path, (_, last_used, _) in list(self._documents.items()):
+            if last_used < limit and path not in keep:
+                self.close(path)
+
+    def close_all(self):
+        for path in list(self._documents):
+            self.close(path)
+
+    def _trim(self, keep):
+        for path in list(self._documents):
+            if len(self._documents) <= self.max_open:
+                break
+            if path != keep:
+                self.close(path)
+
+    def __contains__(self, path):
+        return path in self._documents
+
+    def __len__(self):
+        return len(self._documents)
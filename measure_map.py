@@ -0,0 +1,288 @@
+"""
+Map of where each measure of a score sits in its PDF.
+
+Measures are placed on pages and systems using the <print new-page> and
+<print new-system> breaks of the MusicXML, and within a system using the
+barlines found in the PDF's vector drawings (or, where those cannot be
+matched, the measure widths of the MusicXML layout). The map is built
+once, in a worker process, and saved as JSON beside the score.
+"""
+import json
+import os
+import tempfile
+import xml.etree.ElementTree as ET
+
+import fitz  # PyMuPDF
+
+import musicxml_reader
+
+MAP_FORMAT = 1  # Bump when the layout of the JSON file changes
+MAP_SUFFIX = '.measuremap.json'
+
+
+class MeasureMap:
+    """
+    Page and page-space rectangle of every measure, looked up by number.
+    unplaced counts the measures of the MusicXML that were left out because
+    the PDF ends before them.
+    """
+
+    def __init__(self, measures, unplaced=0):
+        # (measure number, page index, (x0, y0, x1, y1) or None) in score order
+        self.measures = [(number, page, tuple(rect) if rect else None) for number, page, rect in measures]
+        self.unplaced = unplaced
+        self._by_number = {}
+        for entry in self.measures:
+            self._by_number.setdefault(entry[0], entry)
+
+    def __len__(self):
+        return len(self.measures)
+
+    def __repr__(self):
+        return f"MeasureMap({len(self)} measures)"
+
+    def locate(self, number):
+        """(page index, rect or None) of a measure number such as '312', or None."""
+        entry = self._by_number.get(str(number).strip())
+        return None if entry is None else entry[1:]
+
+    def locate_all(self, numbers):
+        """
+        Location (as from locate) of each of a score's measure numbers in
+        order. When the map lists the same numbers, measures are matched by
+        position, so numbers that occur twice find the right occurrence.
+        """
+        if [entry[0] for entry in self.measures] == list(numbers):
+            return [entry[1:] for entry in self.measures]
+        return [self.locate(number) for number in numbers]
+
+
+def map_path(musicxml_path):
+    """Location of the saved map for a score."""
+    return os.path.splitext(musicxml_path)[0] + MAP_SUFFIX
+
+
+def _identity(path, stat=None):
+    st = stat or os.stat(path)
+    return [st.st_size, st.st_mtime_ns]
+
+
+def load(pdf_path, musicxml_path, musicxml_stat=None):
+    """
+    Saved MeasureMap for this PDF and MusicXML, or None if missing or stale.
+    With musicxml_stat (an os.stat result), the map must have been built for
+    the MusicXML file as it was then.
+    """
+    try:
+        with open(map_path(musicxml_path), encoding='utf-8') as f:
+            data = json.load(f)
+        if (data.get('format') != MAP_FORMAT or data.get('pdf') != _identity(pdf_path)
+                or data.get('musicxml') != _identity(musicxml_path, musicxml_stat)):
+            return None
+        return MeasureMap(data['measures'], data.get('unplaced', 0))
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"Ignoring unreadable measure map for {musicxml_path}: {e}")
+        return None
+
+
+def save(pdf_path, musicxml_path, measure_map):
+    path = map_path(musicxml_path)
+    data = {'format': MAP_FORMAT, 'pdf': _identity(pdf_path), 'musicxml': _identity(musicxml_path),
+            'measures': [[number, page, list(rect) if rect else None]
+                         for number, page, rect in measure_map.measures],
+            'unplaced': measure_map.unplaced}
+    try:
+        # Write to a temporary file first so readers never see half a map
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, separators=(',', ':'))
+        os.replace(temp_path, path)
+    except OSError as e:
+        print(f"Could not save measure map for {musicxml_path}: {e}")
+
+
+def score_layout(musicxml_path):
+    """
+    Measures of the first part with their layout hints, as a list of
+    (number, width in tenths or None, new page, new system) tuples.
+    Also returns the number of staves in a system.
+
+    Only the first part is read: its breaks and widths stand for the whole
+    score, and of the parts with several staves (<staves>) only the first
+    counts them, so a system of a score whose later parts are piano or
+    organ parts is taken to have fewer staves than it has.
+    """
+    measures = []
+    staves = 0
+    depth = 0
+    with musicxml_reader.open_musicxml(musicxml_path) as f:
+        for event, elem in ET.iterparse(f, events=('start', 'end')):
+            if event == 'start':
+                depth += 1
+                continue
+            depth -= 1
+            if elem.tag == 'score-part':
+                staves += 1
+            elif elem.tag == 'measure':
+                staves_text = elem.findtext('attributes/staves')
+                if staves_text and not measures:
+                    staves += int(staves_text) - 1
+                print_element = elem.find('print')
+                new_page = print_element is not None and print_element.get('new-page') == 'yes'
+                new_system = new_page or (print_element is not None and print_element.get('new-system') == 'yes')
+                width = elem.get('width')
+                measures.append((elem.get('number', ''), float(width) if width else None, new_page, new_system))
+                elem.clear()
+            elif elem.tag == 'part' and depth == 1:
+                break  # The layout of the first part is enough
+    return measures, max(staves, 1)
+
+
+def _merge_positions(values, tolerance):
+    """Sort values and average runs that lie within tolerance of each other."""
+    merged = []
+    for value in sorted(values):
+        if merged and value - merged[-1][-1] <= tolerance:
+            merged[-1].append(value)
+        else:
+            merged.append([value])
+    return [sum(run) / len(run) for run in merged]
+
+
+def page_systems(page, staves_per_system=1):
+    """
+    Find the systems on a PDF page from its vector drawings. Returns a list,
+    top to bottom, of dicts with 'rect' (x0, y0, x1, y1 of the system's
+    staves) and 'bounds' (x positions of the measure boundaries).
+    """
+    min_length = page.rect.width * 0.25
+    horizontal = []  # (y, x0, x1)
+    vertical = []  # (x, y0, y1)
+    for drawing in page.get_drawings():
+        for item in drawing['items']:
+            if item[0] == 'l':
+                rect = fitz.Rect(item[1], item[2]).normalize()
+            elif item[0] == 're':
+                rect = fitz.Rect(item[1]).normalize()
+            elif item[0] == 'qu':
+                rect = item[1].rect
+            else:
+                continue
+            if rect.height <= 1.5 and rect.width >= min_length:
+                horizontal.append(((rect.y0 + rect.y1) / 2, rect.x0, rect.x1))
+            elif rect.width <= 4 and rect.height > 4:
+                vertical.append(((rect.x0 + rect.x1) / 2, rect.y0, rect.y1))
+
+    # Staff lines: five evenly spaced long horizontal lines
+    ys = _merge_positions([y for y, _, _ in horizontal], 0.8)
+    staves = []
+    i = 0
+    while i + 4 < len(ys):
+        gaps = [ys[i + k + 1] - ys[i + k] for k in range(4)]
+        if max(gaps) < 20 and max(gaps) <= min(gaps) * 1.25:
+            lines = [(y, x0, x1) for y, x0, x1 in horizontal if ys[i] - 1 <= y <= ys[i + 4] + 1]
+            staves.append([ys[i], ys[i + 4], min(x0 for _, x0, _ in lines), max(x1 for _, _, x1 in lines)])
+            i += 5
+        else:
+            i += 1
+    if not staves:
+        return []
+
+    # Staves joined by a vertical line belong to the same system
+    groups = [[staff] for staff in staves]
+    for x, y0, y1 in vertical:
+        covered = [k for k, group in enumerate(groups)
+                   if any(y0 - 1.5 <= staff[0] and staff[1] <= y1 + 1.5 for staff in group)]
+        if len(covered) > 1:
+            first = covered[0]
+            for k in reversed(covered[1:]):
+                groups[first].extend(groups.pop(k))
+    if all(len(group) == 1 for group in groups) and staves_per_system > 1:
+        # No system brackets drawn: take the staves in score-sized groups
+        groups = [staves[k:k + staves_per_system] for k in range(0, len(staves), staves_per_system)]
+
+    systems = []
+    for group in groups:
+        group.sort(key=lambda staff: staff[0])
+        top, bottom = group[0][0], max(staff[1] for staff in group)
+        x0, x1 = min(staff[2] for staff in group), max(staff[3] for staff in group)
+        # Barlines cross every staff of the system at the same x; stems
+        # that happen to span one staff do not
+        crossings = [_merge_positions([x for x, y0, y1 in vertical
+                                       if y0 <= staff[0] + 1.5 and y1 >= staff[1] - 1.5
+                                       and x0 - 2 <= x <= x1 + 2], 1.5)
+                     for staff in group]
+        barlines = [x for x in crossings[0]
+                    if all(any(abs(x - other) <= 1.5 for other in xs) for xs in crossings[1:])]
+        bounds = _merge_positions([x0, x1] + barlines, 4)
+        bounds[0], bounds[-1] = x0, x1
+        systems.append({'rect': (x0, top, x1, bottom), 'bounds': bounds})
+    systems.sort(key=lambda system: system['rect'][1])
+    return systems
+
+
+def _system_regions(system, measures):
+    """Rectangles of the measures of one system, from barlines or measure widths."""
+    x0, top, x1, bottom = system['rect']
+    margin = max(8.0, (bottom - top) * 0.1)  # Room for notes above and below the staves
+    top, bottom = top - margin, bottom + margin
+    bounds = system['bounds']
+    if len(bounds) - 1 != len(measures):
+        # Barlines do not match: split the system in proportion to the widths
+        widths = [width or 1.0 for _, width, _, _ in measures]
+        total = sum(widths)
+        bounds = [x0]
+        for width in widths:
+            bounds.append(bounds[-1] + (x1 - x0) * width / total)
+    return [(bounds[k], top, bounds[k + 1], bottom) for k in range(len(measures))]
+
+
+def build(pdf_path, musicxml_path):
+    """Build the MeasureMap of a score from its PDF and MusicXML."""
+    measures, staves_per_system = score_layout(musicxml_path)
+    result = []
+    unplaced = 0
+    with fitz.open(pdf_path) as document:
+        pdf_systems = [page_systems(page, staves_per_system) for page in document]
+
+        if any(new_system for _, _, _, new_system in measures[1:]):
+            # Group measures into systems and systems into pages by their breaks
+            pages = []
+            for measure in measures:
+                if measure[2] or not pages:
+                    pages.append([])
+                if measure[3] or not pages[-1]:
+                    pages[-1].append([])
+                pages[-1][-1].append(measure)
+            for page_index, systems in enumerate(pages):
+                if page_index >= len(pdf_systems):
+                    # More pages in the MusicXML than in the PDF
+                    unplaced += sum(len(system_measures) for system_measures in systems)
+                    continue
+                found = pdf_systems[page_index]
+                for system_index, system_measures in enumerate(systems):
+                    if len(found) != len(systems):
+                        # The page does not look as the MusicXML describes it
+                        regions = [None] * len(system_measures)
+                    else:
+                        regions = _system_regions(found[system_index], system_measures)
+                    result.extend((measure[0], page_index, region)
+                                  for measure, region in zip(system_measures, regions))
+        else:
+            # No layout in the MusicXML: walk the barlines of the PDF in order
+            regions = [(page_index, (system['bounds'][k], system['rect'][1], system['bounds'][k + 1], system['rect'][3]))
+                       for page_index, systems in enumerate(pdf_systems)
+                       for system in systems for k in range(len(system['bounds']) - 1)]
+            for measure, region in zip(measures, regions):
+                result.append((measure[0],) + region)
+            unplaced = max(len(measures) - len(regions), 0)
+    return MeasureMap(result, unplaced)
+
+
+def build_and_save(pdf_path, musicxml_path):
+    """Build a map and save it beside the score; runs in a worker process."""
+    measure_map = build(pdf_path, musicxml_path)
+    save(pdf_path, musicxml_path, measure_map)
+    return measure_map
@@ -1,28 +1,263 @@
+import time
+
+_LAUNCHED = time.perf_counter()  # For the startup timing report
+
+import argparse
 import sys
 import os
+from bisect import bisect_left, bisect_right
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QGraphicsView, QGraphicsScene, 
-                             QGraphicsPixmapItem, QFileDialog, QVBoxLayout, QHBoxLayout, 
-                             QWidget, QPushButton, QLabel, QSlider, QScrollArea, QAction,
-                             QToolBar, QComboBox, QShortcut, QMessageBox, QDockWidget,
-                             QTextBrowser, QTreeWidget, QTreeWidgetItem)
-from PyQt5.QtGui import QPixmap, QImage, QIcon, QTransform, QKeySequence, QPainter
-from PyQt5.QtCore import Qt, QRectF
-import fitz  # PyMuPDF
-import xml.etree.ElementTree as ET  # For parsing MusicXML
+                             QGraphicsPixmapItem, QGraphicsRectItem, QFileDialog, QVBoxLayout, QHBoxLayout, 
+                             QWidget, QPushButton, QLabel, QScrollArea, QAction,
+                             QToolBar, QComboBox, QShortcut, QDockWidget,
+                             QTreeView, QInputDialog, QTabBar, QCheckBox)
+from PyQt5.QtGui import QTransform, QKeySequence, QPainter, QBrush, QPen
+from PyQt5.QtCore import (Qt, QRectF, QSize, QTimer, QThread, QObject, QEvent, QFileSystemWatcher,
+                          pyqtSignal)
+import measure_map
+import musicxml_reader  # Streaming MusicXML parsing
+import perf
+import score_cache
+import score_changes
+import score_timeline
+import thumbnail_store
+from document_pool import DocumentPool
+from page_cache import PageCache
+from perf_hud import PerfHud
+from page_render import (TILE_SIZE, fit_width_zoom, page_pixel_rect, region_rect, render_pixmap,
+                         tile_clip, tile_grid)
+from render_worker import RenderPool, pixmap_from_samples
+from score_follower import FollowCursor, ScoreFollower
+from thumbnail_view import ThumbnailModel, ThumbnailView
+# score_tree and xml_view pull in NumPy, so they are imported when a score
+# is first shown rather than at startup
+
+class _LoadInterrupted(Exception):
+    pass
+
+
+class MusicXMLLoader(QThread):
+    """Reads the summary and structure index of a MusicXML file off the GUI thread."""
+    progress = pyqtSignal(int)  # Percentage of the file read
+    loaded = pyqtSignal(str, object)  # Path, summary dict
+    indexed = pyqtSignal(str, object, object)  # Path, part/measure index and its fingerprint (None if unavailable)
+    failed = pyqtSignal(str, str)  # Path, error message
+
+    def __init__(self, path, parent=None):
+        super().__init__(parent)
+        self.path = path
+
+    def run(self):
+        try:
+            # Scores opened before are served from the on-disk cache
+            data = score_cache.load(self.path, 'summary')
+            if data is None:
+                with perf.measure('musicxml', kind='summary', file=os.path.basename(self.path)):
+                    data = musicxml_reader.read_summary(self.path, progress=self.report_progress)
+                score_cache.store(self.path, 'summary', data)
+        except _LoadInterrupted:
+            return
+        except Exception as e:
+            self.failed.emit(self.path, str(e))
+            return
+        self.loaded.emit(self.path, data)
+
+        # The byte-offset index behind the structure tree comes second, so
+        # the summary is on screen as early as possible
+        structure = fingerprint = None
+        if not self.isInterruptionRequested():
+            try:
+                structure = score_cache.load(self.path, 'structure')
+                fingerprint = score_cache.load(self.path, 'fingerprint')
+                if structure is None or fingerprint is None:
+                    # The hashes of parts and measures tell what a re-export changed
+                    with perf.measure('musicxml', kind='structure', file=os.path.basename(self.path)):
+                        structure, fingerprint = score_changes.index_score(self.path)
+                    score_cache.store(self.path, 'structure', structure)
+                    score_cache.store(self.path, 'fingerprint', fingerprint)
+            except Exception as e:
+                print(f"Error indexing MusicXML structure: {e}")
+        self.indexed.emit(self.path, structure, fingerprint)
+
+    def report_progress(self, percent):
+        if self.isInterruptionRequested():
+            raise _LoadInterrupted()
+        self.progress.emit(percent)
+
+
+class StartupReport(QObject):
+    """
+    Prints how long after launch the window, the first page and the
+    MusicXML summary appeared (the --timing option).
+    """
+
+    def __init__(self, viewer):
+        super().__init__(viewer)
+        self.viewer = viewer
+        viewer.view.viewport().installEventFilter(self)
+
+    def mark(self, event, moment=None):
+        elapsed = (moment or time.perf_counter()) - _LAUNCHED
+        print(f"Startup: {event} after {elapsed * 1000:.0f} ms")
+
+    def eventFilter(self, watched, event):
+        # The first paint of a page, rather than its rendering, is what the user sees
+        if event.type() == QEvent.Paint and (self.viewer.page_item is not None
+                                             or self.viewer.page_pixmap_items):
+            watched.removeEventFilter(self)
+            self.mark("first page on screen")
+            stages = ', '.join(f"{stage} {perf.stats(stage)['last'] * 1000:.0f} ms"
+                               for stage in ('open', 'render', 'convert', 'scene')
+                               if perf.stats(stage) is not None)
+            print(f"Startup: {stages}")
+        return False
+
+
+def file_identity(path):
+    """(size, mtime) of the file at path, or None if it is missing."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+class DocumentTab:
+    """
+    What the viewer shows of one open PDF, kept while its tab is in the
+    background and put back when the tab is selected again.
+    """
+
+    # PDFViewer attributes saved and restored on tab switches
+    STATE = ('pdf_path', 'current_page', 'zoom_factor', 'rotation', 'view_mode', 'page_sizes',
+             'page_hashes', 'thumbnail_digest', 'musicxml_searched', 'musicxml_file', 'musicxml_data',
+             'musicxml_structure', 'musicxml_fingerprint', 'measure_map')
+
+    def __init__(self, pdf_path, thumbnails):
+        self.pdf_path = pdf_path
+        self.current_page = 0
+        self.zoom_factor = 1.0
+        self.rotation = 0
+        self.view_mode = PDFViewer.SINGLE_PAGE
+        self.page_sizes = None
+        self.page_hashes = None
+        self.thumbnail_digest = None
+        self.musicxml_searched = False
+        self.musicxml_file = None
+        self.musicxml_data = None
+        self.musicxml_structure = None
+        self.musicxml_fingerprint = None
+        self.measure_map = None
+        self.thumbnails = thumbnails  # The tab's own ThumbnailModel
+        self.scroll = None  # (horizontal, vertical) scroll bar values
+        self.changed_files = set()  # Files rewritten while the tab was in the background
+
+    def save(self, viewer):
+        for name in self.STATE:
+            setattr(self, name, getattr(viewer, name))
+        self.scroll = (viewer.view.horizontalScrollBar().value(),
+                       viewer.view.verticalScrollBar().value())
+
+    def restore(self, viewer):
+        for name in self.STATE:
+            setattr(viewer, name, getattr(self, name))
+
 
 class PDFViewer(QMainWindow):
+    # Entries of view_mode_combo
+    SINGLE_PAGE, TWO_PAGES, CONTINUOUS = range(3)
+    PAGE_GAP = 10  # Spacing between pages in the multi-page layouts
+    TILE_ZOOM_THRESHOLD = 4.0  # From this zoom on, single pages are rendered in tiles
+    MAX_THUMBNAIL_JOBS = 2  # Thumbnails rendered at once, leaving workers for pages
+
     def __init__(self):
         super().__init__()
         self.current_page = 0
         self.zoom_factor = 1.0
         self.pdf_document = None
+        self.pdf_path = None
         self.rotation = 0  # Rotation in degrees
+        self.gray = False  # Render pages in grayscale rather than color
+        self.musicxml_searched = False  # Whether the MusicXML file of the PDF has been looked for
         self.musicxml_file = None  # Path to associated MusicXML file
         self.musicxml_data = None  # Parsed MusicXML data
+        self.musicxml_structure = None  # Part and measure index of the MusicXML file, once built
+        self.musicxml_fingerprint = None  # Hashes of its parts and measures (score_changes)
+        self.musicxml_reload_task = None  # Name of the task bringing a rewritten MusicXML file up to date
+        self.musicxml_loader = None  # Background MusicXMLLoader, if one is running
+        self.measure_map = None  # Page and region of every measure, once built
+        self.measure_map_task = None  # Name of the running measure map build
+        self.pending_region = None  # (page, rect) to scroll to once the page is shown
+        
+        # Score following: a cursor moved over the pages along the score's timeline
+        self.timeline = None  # score_timeline.Timeline of the MusicXML file, once read
+        self.timeline_task = None  # Name of the task reading it
+        self.follower = None  # ScoreFollower playing the timeline
+        self.follow_locations = None  # (page, rect) or None of every measure of the timeline
+        self.follow_measure = None  # Index of the measure under the cursor
+        self.follow_rect = None  # (measure, layout state, scene rect) of the cursor
+        self.follow_cursor = FollowCursor()
+        self.page_cache = PageCache()  # Rendered pages keyed by (page, zoom, rotation)
+        self.documents = DocumentPool()  # Open PDFs of all tabs
+        self.current_tab = None  # DocumentTab whose document is shown
+        self.prefetch_distance = 2  # Pages rendered ahead of and behind the current one
+        self.render_pool = RenderPool(parent=self)
+        self.render_pool.page_ready.connect(self.on_page_rendered)
+        self.render_pool.task_done.connect(self.on_task_done)
+        
+        # Multi-page layout state (Two Pages / Continuous view modes)
+        self.view_mode = self.SINGLE_PAGE
+        self.page_sizes = None  # Unscaled (width, height) of every page
+        self.page_hashes = None  # Hash of what every page draws, to tell which pages a rewrite changed
+        self.page_hash_task = None  # Name of the task hashing them
+        self.layout_key = None  # (view mode, zoom, rotation) of the current layout
+        self.page_rects = []  # Scene rect of every page in the layout
+        self.row_spans = []  # (top, bottom) of the row holding every page
+        self.page_pixmap_items = {}  # Page index -> item for rasterized pages
+        self.scrolling_to_page = False
+        self.preview_pages = set()  # Layout pages still showing a scaled preview
+        
+        # Single page mode: the displayed whole-page item and its cache key
+        self.page_item = None
+        self.page_item_key = None
+        
+        # Tiled single page rendering at high zoom
+        self.tiled_zoom = None  # Zoom of the displayed tiles, None when not tiled
+        self.tile_items = {}  # (column, row) -> pixmap item
+        
+        # Page thumbnails: stored ones are read in one task, missing ones rendered a few at a time
+        self.thumbnail_digest = None  # Content hash of the PDF, once known
+        self.thumbnail_load_task = None  # Name of the task reading stored thumbnails
+        self.thumbnail_tasks = {}  # Task name -> page index of thumbnails being rendered
+        
+        # Zooming shows a scaled preview at once and re-renders once it settles
+        self.zoom_timer = QTimer(self)
+        self.zoom_timer.setSingleShot(True)
+        self.zoom_timer.setInterval(250)
+        self.zoom_timer.timeout.connect(self.refine_zoom)
+        
+        # Documents of background tabs are closed after a while without use
+        self.idle_timer = QTimer(self)
+        self.idle_timer.setInterval(60 * 1000)
+        self.idle_timer.timeout.connect(lambda: self.documents.close_idle(keep={self.pdf_path}))
+        self.idle_timer.start()
+        
+        # Rewritten PDF and MusicXML files are reloaded once their writer is done
+        self.file_watcher = QFileSystemWatcher(self)
+        self.file_watcher.fileChanged.connect(self.on_file_changed)
+        self.changed_files = set()
+        self.file_identities = {}  # Watched path -> (size, mtime) of the version last handled
+        self.reload_timer = QTimer(self)
+        self.reload_timer.setSingleShot(True)
+        self.reload_timer.setInterval(500)
+        self.reload_timer.timeout.connect(self.reload_changed_files)
+        
+        self.musicxml_dock = None  # Built once a MusicXML file is first found
+        self.startup_report = None  # StartupReport when launched with --timing
         
         self.init_ui()
         self.setup_shortcuts()
-        self.create_musicxml_dock()
+        self.create_thumbnail_dock()
         
     def init_ui(self):
         self.setWindowTitle('Music Score PDF Viewer')
@@ -56,6 +291,16 @@ class PDFViewer(QMainWindow):
         next_action.triggered.connect(self.next_page)
         toolbar.addAction(next_action)
         
+        go_to_measure_action = QAction("Go to Measure", self)
+        go_to_measure_action.triggered.connect(self.go_to_measure)
+        toolbar.addAction(go_to_measure_action)
+        
+        # Score following toggle
+        follow_action = QAction("Follow", self)
+        follow_action.setCheckable(True)
+        follow_action.triggered.connect(self.toggle_follow)
+        toolbar.addAction(follow_action)
+        
         toolbar.addSeparator()
         
         # Zoom actions
@@ -90,7 +335,7 @@ class PDFViewer(QMainWindow):
         # MusicXML toggle action
         toggle_musicxml_action = QAction("MusicXML Info", self)
         toggle_musicxml_action.setCheckable(True)
-        toggle_musicxml_action.triggered.connect(lambda checked: self.musicxml_dock.setVisible(checked))
+        toggle_musicxml_action.triggered.connect(lambda checked: self.create_musicxml_dock().setVisible(checked))
         toolbar.addAction(toggle_musicxml_action)
         self.musicxml_toolbar_action = toggle_musicxml_action
         
@@ -104,11 +349,34 @@ class PDFViewer(QMainWindow):
         controls_layout.addWidget(QLabel("View Mode:"))
         controls_layout.addWidget(self.view_mode_combo)
         
+        # Color mode: grayscale pages take a third of the memory of color ones
+        self.color_mode_combo = QComboBox()
+        self.color_mode_combo.addItems(["Color", "Grayscale"])
+        self.color_mode_combo.currentIndexChanged.connect(self.change_color_mode)
+        controls_layout.addWidget(QLabel("Colors:"))
+        controls_layout.addWidget(self.color_mode_combo)
+        
+        # Reload the PDF and MusicXML files when they are written again
+        self.reload_checkbox = QCheckBox("Reload changed files")
+        self.reload_checkbox.setChecked(True)
+        controls_layout.addWidget(self.reload_checkbox)
+        
         controls_layout.addStretch()
         
         # Add controls to main layout
         main_layout.addLayout(controls_layout)
         
+        # One tab per open PDF, shown once there is more than one
+        self.tab_bar = QTabBar()
+        self.tab_bar.setTabsClosable(True)
+        self.tab_bar.setMovable(True)
+        self.tab_bar.setDocumentMode(True)
+        self.tab_bar.setExpanding(False)
+        self.tab_bar.setAutoHide(True)
+        self.tab_bar.currentChanged.connect(self.on_tab_changed)
+        self.tab_bar.tabCloseRequested.connect(self.close_tab)
+        main_layout.addWidget(self.tab_bar)
+        
         # PDF view
         self.scroll_area = QScrollArea()
         self.scroll_area.setWidgetResizable(True)
@@ -119,8 +387,13 @@ class PDFViewer(QMainWindow):
         self.view.setScene(self.scene)
         self.view.setDragMode(QGraphicsView.ScrollHandDrag)
         self.view.setRenderHint(QPainter.SmoothPixmapTransform)
+        self.view.verticalScrollBar().valueChanged.connect(self.update_visible_pages)
+        self.view.horizontalScrollBar().valueChanged.connect(self.update_visible_pages)
         self.scroll_area.setWidget(self.view)
         
+        # Stage timings overlay, toggled with F12
+        self.perf_hud = PerfHud(self.view, self.page_cache)
+        
         main_layout.addWidget(self.scroll_area)
         
         # Disable actions initially
@@ -132,8 +405,12 @@ class PDFViewer(QMainWindow):
         rotate_left_action.setEnabled(False)
         rotate_right_action.setEnabled(False)
         toggle_musicxml_action.setEnabled(False)
+        go_to_measure_action.setEnabled(False)
+        follow_action.setEnabled(False)
         
         self.prev_action = prev_action
+        self.go_to_measure_action = go_to_measure_action
+        self.follow_action = follow_action
         self.next_action = next_action
         self.zoom_in_action = zoom_in_action
         self.zoom_out_action = zoom_out_action
@@ -165,47 +442,436 @@ class PDFViewer(QMainWindow):
         QShortcut(QKeySequence(Qt.Key_Home), self, self.first_page)
         QShortcut(QKeySequence(Qt.Key_End), self, self.last_page)
         
+        # Measure navigation shortcut
+        QShortcut(QKeySequence(Qt.CTRL + Qt.Key_G), self, self.go_to_measure)
+        
+        # Tab shortcuts (Ctrl+W already fits the page to the width)
+        QShortcut(QKeySequence(QKeySequence.NextChild), self, lambda: self.cycle_tabs(1))
+        QShortcut(QKeySequence(QKeySequence.PreviousChild), self, lambda: self.cycle_tabs(-1))
+        QShortcut(QKeySequence(Qt.CTRL + Qt.Key_F4), self, lambda: self.close_tab(self.tab_bar.currentIndex()))
+        
+        # Score following shortcut
+        QShortcut(QKeySequence(Qt.Key_F5), self, self.follow_action.trigger)
+        
+        # Performance overlay shortcut
+        QShortcut(QKeySequence(Qt.Key_F12), self, self.perf_hud.toggle)
+        
     def open_pdf(self):
-        file_path, _ = QFileDialog.getOpenFileName(
-            self, 'Open PDF File', '', 'PDF Files (*.pdf)')
+        file_paths, _ = QFileDialog.getOpenFileNames(
+            self, 'Open PDF Files', '', 'PDF Files (*.pdf)')
         
-        if file_path:
-            if self.pdf_document:
-                self.pdf_document.close()
+        for file_path in file_paths:
+            self.open_document(file_path)
+    
+    def open_document(self, file_path, page_index=0, zoom_factor=1.0):
+        """Show a PDF in a new tab, or select its tab if it is open already."""
+        file_path = os.path.abspath(file_path)
+        for index in range(self.tab_bar.count()):
+            if self.tab_bar.tabData(index).pdf_path == file_path:
+                self.tab_bar.setCurrentIndex(index)
+                return
+        
+        if self.current_tab is not None:
+            self.current_tab.save(self)
+        if not self.load_pdf(file_path, page_index, zoom_factor):
+            return
+        tab = DocumentTab(file_path, ThumbnailModel(self.thumbnail_view))
+        self.current_tab = tab
+        self.thumbnail_view.set_model(tab.thumbnails)
+        # The new tab is already on screen, so on_tab_changed has nothing to do
+        self.tab_bar.blockSignals(True)
+        index = self.tab_bar.addTab(os.path.basename(file_path))
+        self.tab_bar.setTabData(index, tab)
+        self.tab_bar.setTabToolTip(index, file_path)
+        self.tab_bar.setCurrentIndex(index)
+        self.tab_bar.blockSignals(False)
+    
+    def on_tab_changed(self, index):
+        tab = self.tab_bar.tabData(index) if index >= 0 else None
+        if tab is None or tab is self.current_tab:
+            return
+        if self.current_tab is not None:
+            self.current_tab.save(self)
+        self.show_tab(tab)
+    
+    def show_tab(self, tab):
+        """
+        Put back the document and view of a background tab. Its document is
+        normally still open and its pages still cached, so nothing but the
+        scene has to be rebuilt.
+        """
+        self.zoom_timer.stop()
+        self.stop_musicxml_loader()
+        self.stop_following()
+        try:
+            document = self.pooled_document(tab.pdf_path)
+        except Exception as e:
+            # The file has gone since its document was closed for being idle
+            print(f"Error opening PDF: {e}")
+            self.statusBar().showMessage(f"Error opening PDF: {e}", 5000)
+            self.current_tab = None
+            self.close_tab(self.tab_bar.indexOf(tab))
+            return
+        self.current_tab = tab
+        tab.restore(self)
+        self.pdf_document = document
+        self.page_cache.set_document(self.pdf_path)
+        self.render_pool.set_document(self.pdf_path)
+        self.pending_region = None
+        self.measure_map_task = None
+        self.page_hash_task = None
+        self.musicxml_reload_task = None
+        self.thumbnail_load_task = None
+        self.thumbnail_tasks = {}
+        self.thumbnail_view.set_model(tab.thumbnails)
+        self.view_mode_combo.blockSignals(True)
+        self.view_mode_combo.setCurrentIndex(self.view_mode)
+        self.view_mode_combo.blockSignals(False)
+        self.update_actions()
+        self.update_zoom_label()
+        
+        self.clear_scene()
+        self.render_page()
+        if tab.scroll is not None:
+            self.view.horizontalScrollBar().setValue(tab.scroll[0])
+            self.view.verticalScrollBar().setValue(tab.scroll[1])
+        self.update_page_label()
+        
+        if self.thumbnail_digest is None:
+            self.load_thumbnails()
+        else:
+            self.request_thumbnails()
+        self.show_tab_musicxml()
+        
+        changed, tab.changed_files = tab.changed_files, set()
+        if self.page_hashes is None and self.pdf_path not in changed:
+            self.hash_pages()
+        for path in changed:
+            self.reload_file(path)
+    
+    def show_tab_musicxml(self):
+        """Show the MusicXML summary of a tab that has just been selected."""
+        if self.musicxml_data is None:
+            if self.musicxml_searched and self.musicxml_file is None:
+                self.clear_musicxml()
+                self.musicxml_toolbar_action.setEnabled(False)
+                self.setWindowTitle(f'Music Score PDF Viewer - {os.path.basename(self.pdf_path)}')
+                return
+            # Still being read when the tab was left, or never looked for
+            self.load_musicxml_file(self.pdf_path)
+            self.musicxml_toolbar_action.setEnabled(self.musicxml_file is not None)
+            return
+        self.create_musicxml_dock()
+        self.update_musicxml_display()
+        if self.musicxml_structure is not None:
+            self.musicxml_tree.model().set_structure(self.musicxml_structure)
+        self.musicxml_text.clear()
+        if self.musicxml_text.isVisible():
+            self.load_musicxml_source()
+        if self.measure_map is None:
+            self.load_measure_map()
+        self.go_to_measure_action.setEnabled(self.measure_map is not None)
+        self.follow_action.setEnabled(self.measure_map is not None)
+        self.musicxml_dock.setVisible(True)
+        self.musicxml_toolbar_action.setEnabled(True)
+        self.musicxml_toolbar_action.setChecked(True)
+        self.setWindowTitle(f'Music Score PDF Viewer - {os.path.basename(self.pdf_path)} (MusicXML loaded)')
+    
+    def cycle_tabs(self, step):
+        if self.tab_bar.count() > 1:
+            self.tab_bar.setCurrentIndex((self.tab_bar.currentIndex() + step) % self.tab_bar.count())
+    
+    def close_tab(self, index):
+        """Close a tab, its document and its cached pages."""
+        tab = self.tab_bar.tabData(index) if index >= 0 else None
+        if tab is None:
+            return
+        if tab is self.current_tab:
+            # Nothing to save: removing the tab selects a neighbour, whose state replaces it
+            self.current_tab = None
+        self.tab_bar.removeTab(index)
+        self.documents.close(tab.pdf_path)
+        self.page_cache.discard_document(tab.pdf_path)
+        tab.thumbnails.deleteLater()
+        if self.tab_bar.count() == 0:
+            self.close_document()
+        self.watch_files()
+    
+    def close_document(self):
+        """Go back to an empty window once the last tab has been closed."""
+        self.zoom_timer.stop()
+        self.render_pool.set_document(None)
+        self.page_cache.set_document(None)
+        self.pdf_document = None
+        self.pdf_path = None
+        self.current_page = 0
+        self.page_sizes = None
+        self.page_hashes = None
+        self.page_hash_task = None
+        self.thumbnail_digest = None
+        self.thumbnail_load_task = None
+        self.thumbnail_tasks = {}
+        self.thumbnail_view.set_model(ThumbnailModel(self.thumbnail_view))
+        self.clear_musicxml()
+        self.musicxml_toolbar_action.setEnabled(False)
+        self.clear_scene()
+        self.scene.setSceneRect(QRectF())
+        self.view.setSceneRect(QRectF())
+        self.update_actions()
+        self.page_label.setText('Page: 0 / 0')
+        self.setWindowTitle('Music Score PDF Viewer')
+    
+    def watch_files(self):
+        """Watch the PDF and MusicXML files of every tab, and only those."""
+        wanted = {self.pdf_path, self.musicxml_file}
+        for index in range(self.tab_bar.count()):
+            tab = self.tab_bar.tabData(index)
+            wanted.update((tab.pdf_path, tab.musicxml_file))
+        wanted.discard(None)
+        watched = set(self.file_watcher.files())
+        if watched - wanted:
+            self.file_watcher.removePaths(list(watched - wanted))
+        for path in set(self.file_identities) - wanted:
+            del self.file_identities[path]
+        missing = [path for path in wanted - watched if os.path.exists(path)]
+        if missing:
+            self.file_watcher.addPaths(missing)
+        for path in missing:
+            # A file watched again after being replaced keeps the version last handled
+            self.file_identities.setdefault(path, file_identity(path))
+    
+    def on_file_changed(self, path):
+        # Writers take a while and may replace the file, so wait until they are done
+        self.changed_files.add(path)
+        self.reload_timer.start()
+    
+    def reload_changed_files(self):
+        changed, self.changed_files = self.changed_files, set()
+        # A file replaced by a new one is no longer watched
+        self.watch_files()
+        if not self.reload_checkbox.isChecked():
+            return
+        for path in changed:
+            identity = file_identity(path)
+            if identity is None:
+                continue  # Deleted, or not written yet
+            if identity == self.file_identities.get(path):
+                continue  # Already handled, e.g. the event from watching a replaced file again
+            self.file_identities[path] = identity
+            if path in (self.pdf_path, self.musicxml_file):
+                self.reload_file(path)
+                continue
+            for index in range(self.tab_bar.count()):
+                tab = self.tab_bar.tabData(index)
+                if path in (tab.pdf_path, tab.musicxml_file):
+                    tab.changed_files.add(path)
+    
+    def reload_file(self, path):
+        """Bring the display up to date with a rewritten PDF or MusicXML file of the current tab."""
+        if path == self.pdf_path:
+            if self.page_hashes is None:
+                self.reload_pages(None)  # Nothing to compare with
+            else:
+                self.hash_pages()  # reload_pages follows with the new hashes
+        elif path == self.musicxml_file:
+            if self.musicxml_fingerprint is None or self.musicxml_data is None:
+                # Still loading, or not indexed: read it all again
+                self.load_musicxml_file(self.pdf_path)
+                return
+            self.musicxml_reload_task = f"reload of {self.musicxml_file}"
+            self.render_pool.run_task(self.musicxml_reload_task, score_changes.reload_score, self.musicxml_file,
+                                      self.musicxml_fingerprint, self.musicxml_data, self.pdf_path)
+    
+    def hash_pages(self):
+        """Hash what every page draws in a worker; the result arrives in on_task_done."""
+        self.page_hash_task = f"page hashes of {self.pdf_path}"
+        self.render_pool.run_task(self.page_hash_task, score_changes.page_hashes, self.pdf_path)
+    
+    def reload_pages(self, page_hashes):
+        """
+        Show the rewritten PDF of the current tab, keeping page, zoom and
+        scroll position. Only pages whose hash differs from page_hashes are
+        rendered again; with no hashes, every page is.
+        """
+        scroll = (self.view.horizontalScrollBar().value(), self.view.verticalScrollBar().value())
+        self.documents.close(self.pdf_path)
+        try:
+            self.pdf_document = self.pooled_document(self.pdf_path)
+        except Exception as e:
+            print(f"Error reloading PDF: {e}")
+            self.statusBar().showMessage(f"Error reloading PDF: {e}", 5000)
+            return
+        page_count = len(self.pdf_document)
+        if page_hashes is None:
+            old_count = len(self.page_hashes or ()) or page_count
+            changed, removed = list(range(page_count)), list(range(page_count, old_count))
+            self.page_hashes = None
+            self.hash_pages()  # To compare the next rewrite with
+        else:
+            changed, removed = score_changes.changed_pages(self.page_hashes, page_hashes)
+            self.page_hashes = page_hashes
+        
+        # Renders already running show the old pages
+        self.render_pool.set_document(self.pdf_path)
+        for page_index in changed + removed:
+            self.page_cache.invalidate(page_index)
+        self.page_sizes = None
+        self.current_page = min(self.current_page, max(page_count - 1, 0))
+        self.update_actions()
+        if changed or removed:
+            # Unchanged pages come straight back from the page cache
+            self.clear_scene()
+            self.render_page()
+            self.view.horizontalScrollBar().setValue(scroll[0])
+            self.view.verticalScrollBar().setValue(scroll[1])
+            self.load_thumbnails(keep_pages=[page for page in range(page_count) if page not in changed])
+        self.update_page_label()
+        
+        if self.musicxml_file is not None:
+            if changed or removed:
+                # Measures may have moved on the changed pages
+                self.stop_following()
+                self.measure_map = None
+                self.go_to_measure_action.setEnabled(False)
+                self.follow_action.setEnabled(False)
+                if self.musicxml_data is not None:
+                    self.load_measure_map()
+            elif self.measure_map is not None:
+                # Same drawing in a newer file: the map still holds
+                measure_map.save(self.pdf_path, self.musicxml_file, self.measure_map)
+        if not (changed or removed):
+            return  # Written again with the same pages
+        message = f"{os.path.basename(self.pdf_path)} changed: {len(changed)} of {page_count} pages redrawn"
+        if removed:
+            message += f", {len(removed)} removed"
+        self.statusBar().showMessage(message, 5000)
+    
+    def apply_musicxml_reload(self, result):
+        """Show what score_changes.reload_score found in a rewritten MusicXML file."""
+        if result is None:
+            self.load_musicxml_file(self.pdf_path)  # Read it all again
+            return
+        summary, structure, fingerprint, changes = result
+        self.musicxml_fingerprint = fingerprint
+        if not (changes['header'] or changes['parts'] or changes['removed']):
+            return  # Written again without changes
+        
+        self.stop_following()
+        self.musicxml_data = summary
+        self.musicxml_structure = structure
+        self.update_musicxml_display()
+        model = self.musicxml_tree.model()
+        if structure is not None and model is not None:
+            model.set_structure(structure)
+        visible = self.musicxml_text.isVisible()
+        self.musicxml_text.clear()
+        if visible:
+            self.load_musicxml_source()
+        # The saved map is kept when the layout did not change, else rebuilt
+        self.measure_map = None
+        self.go_to_measure_action.setEnabled(False)
+        self.follow_action.setEnabled(False)
+        self.load_measure_map()
+        
+        names = {part['id']: part['name'] for part in summary.get('parts', [])}
+        if changes['parts']:
+            measures = sum(len(changes['measures'][part_id]) for part_id in changes['parts'])
+            where = f"{measures} measure{'s' if measures != 1 else ''} of {', '.join(names.get(part_id, part_id) for part_id in changes['parts'])}"
+        else:
+            where = "score header"
+        self.statusBar().showMessage(f"{os.path.basename(self.musicxml_file)} changed: {where}", 5000)
+    
+    def pooled_document(self, file_path):
+        """The open document at file_path, timed as the 'open' stage if it has to be opened."""
+        if self.documents.is_current(file_path):
+            return self.documents.get(file_path)
+        with perf.measure('open', file=os.path.basename(file_path)):
+            return self.documents.get(file_path)
+    
+    def update_actions(self):
+        """Enable the page actions that make sense for the current document."""
+        page_count = len(self.pdf_document) if self.pdf_document else 0
+        self.prev_action.setEnabled(page_count > 0)
+        self.next_action.setEnabled(page_count > 1)
+        self.zoom_in_action.setEnabled(page_count > 0)
+        self.zoom_out_action.setEnabled(page_count > 0)
+        self.fit_width_action.setEnabled(page_count > 0)
+        self.rotate_left_action.setEnabled(page_count > 0)
+        self.rotate_right_action.setEnabled(page_count > 0)
+    
+    def load_pdf(self, file_path, page_index=0, zoom_factor=1.0):
+        """
+        Open the PDF at file_path in the current tab and show one of its
+        pages, the first by default, then look for its MusicXML.
+        Returns whether the PDF could be opened.
+        """
+        try:
+            # Other tabs' documents stay open in the pool and their pages in the cache
+            self.pdf_document = self.pooled_document(file_path)
+            self.pdf_path = file_path
+            self.page_cache.set_document(file_path)
+            self.render_pool.set_document(file_path)
+            self.page_sizes = None
+            self.layout_key = None
+            self.current_page = min(max(page_index, 0), max(len(self.pdf_document) - 1, 0))
+            self.page_hashes = None
+            self.page_hash_task = None
+            self.musicxml_searched = False
+            # Thumbnails still arriving for the previous document are ignored
+            self.thumbnail_digest = None
+            self.thumbnail_load_task = None
+            self.thumbnail_tasks = {}
+            self.update_page_label()
             
-            try:
-                self.pdf_document = fitz.open(file_path)
-                self.current_page = 0
-                self.update_page_label()
-                
-                # Enable navigation if document has pages
-                has_pages = len(self.pdf_document) > 0
-                self.prev_action.setEnabled(has_pages)
-                self.next_action.setEnabled(has_pages and len(self.pdf_document) > 1)
-                self.zoom_in_action.setEnabled(has_pages)
-                self.zoom_out_action.setEnabled(has_pages)
-                self.fit_width_action.setEnabled(has_pages)
-                self.rotate_left_action.setEnabled(has_pages)
-                self.rotate_right_action.setEnabled(has_pages)
-                
-                # Reset rotation and zoom
-                self.rotation = 0
-                self.zoom_factor = 1.0
-                self.update_zoom_label()
-                
-                # Look for associated MusicXML file
-                self.load_musicxml_file(file_path)
-                
-                # Enable MusicXML toggle if XML file was found
-                self.musicxml_toolbar_action.setEnabled(self.musicxml_file is not None)
-                
-                if has_pages:
-                    self.render_page()
-            except Exception as e:
-                print(f"Error opening PDF: {e}")
+            # Enable navigation if document has pages
+            has_pages = len(self.pdf_document) > 0
+            self.update_actions()
+            
+            # Reset rotation and zoom
+            self.rotation = 0
+            self.zoom_factor = zoom_factor
+            self.update_zoom_label()
+            
+            # The previous score goes at once; the new one is looked for below
+            self.clear_musicxml()
+            self.musicxml_toolbar_action.setEnabled(False)
+            
+            if has_pages:
+                self.render_page()
+            
+            # Thumbnails and the MusicXML file are only started on once the
+            # page is on screen, so their workers and thread do not delay it
+            QTimer.singleShot(0, lambda: self.load_companions(file_path))
+            return True
+        except Exception as e:
+            print(f"Error opening PDF: {e}")
+            return False
+    
+    def load_companions(self, pdf_path):
+        """Start on the thumbnails and the MusicXML file of a newly opened PDF."""
+        if pdf_path != self.pdf_path:
+            return  # Another PDF has been opened since
+        if self.pdf_document is None or self.pdf_document.is_closed:
+            return  # The window was closed before this ran
+        self.load_thumbnails()
+        self.update_page_label()
+        self.hash_pages()
+        
+        # Look for associated MusicXML file
+        self.load_musicxml_file(pdf_path)
+        
+        # Enable MusicXML toggle if XML file was found
+        self.musicxml_toolbar_action.setEnabled(self.musicxml_file is not None)
     
     def create_musicxml_dock(self):
-        """Create a dock widget to display MusicXML information."""
+        """
+        Create the dock widget displaying MusicXML information on first use,
+        which keeps it out of startup, and return it.
+        """
+        if self.musicxml_dock is not None:
+            return self.musicxml_dock
+        from xml_view import XmlSourceView
+        
         self.musicxml_dock = QDockWidget("MusicXML Information", self)
         self.musicxml_dock.setAllowedAreas(Qt.LeftDockWidgetArea | Qt.RightDockWidgetArea)
         
@@ -213,10 +879,10 @@ class PDFViewer(QMainWindow):
         musicxml_widget = QWidget()
         musicxml_layout = QVBoxLayout(musicxml_widget)
         
-        # Tree widget for structured display
-        self.musicxml_tree = QTreeWidget()
-        self.musicxml_tree.setHeaderLabels(["Property", "Value"])
-        self.musicxml_tree.setColumnWidth(0, 150)
+        # Tree view for structured display; its model is set once a score is read
+        self.musicxml_tree = QTreeView()
+        self.musicxml_tree.setUniformRowHeights(True)
+        self.musicxml_tree.doubleClicked.connect(self.on_musicxml_item_activated)
         musicxml_layout.addWidget(self.musicxml_tree)
         
         # Add a button to view/hide more detailed MusicXML information
@@ -224,206 +890,840 @@ class PDFViewer(QMainWindow):
         self.detail_button.clicked.connect(self.toggle_musicxml_details)
         musicxml_layout.addWidget(self.detail_button)
         
-        # Text browser for raw XML display
-        self.musicxml_text = QTextBrowser()
+        # Raw XML display, only loaded when it is first shown
+        self.musicxml_text = XmlSourceView()
         self.musicxml_text.setVisible(False)
         musicxml_layout.addWidget(self.musicxml_text)
         
         self.musicxml_dock.setWidget(musicxml_widget)
         self.addDockWidget(Qt.RightDockWidgetArea, self.musicxml_dock)
         self.musicxml_dock.setVisible(False)
-        
-        # Add action to toggle dock visibility
-        toggle_musicxml_action = QAction("Toggle MusicXML Panel", self)
-        toggle_musicxml_action.setCheckable(True)
-        toggle_musicxml_action.triggered.connect(lambda checked: self.musicxml_dock.setVisible(checked))
-        
-        # Add to toolbar
-        self.musicxml_toolbar_action = toggle_musicxml_action
-        
+        return self.musicxml_dock
+        
+    def create_thumbnail_dock(self):
+        """Create a dock widget with a thumbnail of every page."""
+        self.thumbnail_dock = QDockWidget("Pages", self)
+        self.thumbnail_dock.setAllowedAreas(Qt.LeftDockWidgetArea | Qt.RightDockWidgetArea)
+        self.thumbnail_view = ThumbnailView()
+        self.thumbnail_view.clicked.connect(self.on_thumbnail_clicked)
+        # Thumbnails scrolled into view are rendered first
+        self.thumbnail_view.verticalScrollBar().valueChanged.connect(self.request_thumbnails)
+        self.thumbnail_dock.setWidget(self.thumbnail_view)
+        self.addDockWidget(Qt.LeftDockWidgetArea, self.thumbnail_dock)
+    
+    def load_thumbnails(self, keep_pages=()):
+        """
+        Show blank thumbnails for a new document and start filling them in.
+        Pages in keep_pages keep the thumbnails they have.
+        """
+        model = self.thumbnail_view.model()
+        kept = {page: model.thumbnails[page] for page in keep_pages if page in model.thumbnails}
+        page_count = len(self.pdf_document)
+        width = thumbnail_store.THUMBNAIL_WIDTH
+        size = QSize(width, width)
+        if page_count:
+            rect = self.pdf_document[0].rect
+            size = QSize(width, round(width * rect.height / rect.width))
+        self.thumbnail_view.set_document(page_count, size)
+        for page_index, pixmap in kept.items():
+            model.keep_thumbnail(page_index, pixmap)
+        self.thumbnail_digest = None
+        self.thumbnail_tasks = {}
+        # Hashing the file and reading the store happen in a worker too
+        self.thumbnail_load_task = f"thumbnails of {self.pdf_path}"
+        self.render_pool.run_task(self.thumbnail_load_task, thumbnail_store.load_thumbnails, self.pdf_path)
+    
+    def request_thumbnails(self):
+        """Render missing thumbnails, visible ones first, a few at a time."""
+        if self.thumbnail_digest is None or len(self.thumbnail_tasks) >= self.MAX_THUMBNAIL_JOBS:
+            return
+        rendering = set(self.thumbnail_tasks.values())
+        missing = [page for page in self.thumbnail_view.model().missing_pages() if page not in rendering]
+        visible = self.thumbnail_view.visible_rows()
+        missing.sort(key=lambda page: (page not in visible, abs(page - visible.start) if visible else page))
+        for page_index in missing[:self.MAX_THUMBNAIL_JOBS - len(self.thumbnail_tasks)]:
+            name = f"thumbnail {page_index} of {self.thumbnail_digest}"
+            self.thumbnail_tasks[name] = page_index
+            self.render_pool.run_task(name, thumbnail_store.render_thumbnail,
+                                      self.pdf_path, self.thumbnail_digest, page_index)
+    
+    def on_thumbnail_clicked(self, index):
+        if self.pdf_document and index.row() != self.current_page:
+            self.current_page = index.row()
+            self.render_page()
+            self.update_page_label()
+    
     def load_musicxml_file(self, pdf_path):
         """
         Load MusicXML file with the same basename as the PDF file.
-        Look for both .xml and .musicxml extensions.
+        Look for .xml, .musicxml and compressed .mxl files. The file is read in the
+        background; on_musicxml_loaded fills in the dock when it is done.
         """
-        self.musicxml_file = None
-        self.musicxml_data = None
-        self.musicxml_tree.clear()
-        self.musicxml_text.setText("")
-        self.musicxml_dock.setVisible(False)
-        self.musicxml_toolbar_action.setChecked(False)
+        self.clear_musicxml()
+        self.musicxml_searched = True
         
         # Get the base name of the PDF file without extension
         base_path = os.path.splitext(pdf_path)[0]
         
-        # Check for .xml extension
-        xml_path = f"{base_path}.xml"
-        if os.path.exists(xml_path):
-            self.musicxml_file = xml_path
-        else:
-            # Check for .musicxml extension
-            musicxml_path = f"{base_path}.musicxml"
-            if os.path.exists(musicxml_path):
-                self.musicxml_file = musicxml_path
+        # Check each MusicXML extension in turn
+        for extension in musicxml_reader.MUSICXML_EXTENSIONS:
+            xml_path = f"{base_path}{extension}"
+            if os.path.exists(xml_path):
+                self.musicxml_file = xml_path
+                break
+        
+        self.setWindowTitle(f'Music Score PDF Viewer - {os.path.basename(pdf_path)}')
         
-        # If MusicXML file was found, try to parse it
+        # If MusicXML file was found, start parsing it
         if self.musicxml_file:
-            try:
-                self.parse_musicxml()
-                self.update_musicxml_display()
-                self.musicxml_dock.setVisible(True)
-                self.musicxml_toolbar_action.setChecked(True)
-                self.setWindowTitle(f'Music Score PDF Viewer - {os.path.basename(pdf_path)} (MusicXML loaded)')
-                print(f"Loaded associated MusicXML file: {self.musicxml_file}")
-                QMessageBox.information(self, "MusicXML Loaded", 
-                                      f"Loaded associated MusicXML file:\n{os.path.basename(self.musicxml_file)}")
-            except Exception as e:
-                print(f"Error parsing MusicXML file: {e}")
-                self.musicxml_file = None
+            loader = MusicXMLLoader(self.musicxml_file, self)
+            loader.progress.connect(self.on_musicxml_progress)
+            loader.loaded.connect(self.on_musicxml_loaded)
+            loader.indexed.connect(self.on_musicxml_indexed)
+            loader.failed.connect(self.on_musicxml_failed)
+            loader.finished.connect(loader.deleteLater)
+            self.musicxml_loader = loader
+            loader.start()
         else:
             print(f"No associated MusicXML file found for {pdf_path}")
-            self.setWindowTitle(f'Music Score PDF Viewer - {os.path.basename(pdf_path)}')
+        self.watch_files()
     
-    def parse_musicxml(self):
-        """
-        Parse the MusicXML file to extract music notation information.
-        """
-        if not self.musicxml_file or not os.path.exists(self.musicxml_file):
+    def clear_musicxml(self):
+        """Forget the MusicXML file of the previous PDF and everything derived from it."""
+        self.musicxml_file = None
+        self.musicxml_data = None
+        self.musicxml_structure = None
+        self.musicxml_fingerprint = None
+        self.musicxml_reload_task = None
+        self.measure_map = None
+        self.measure_map_task = None
+        self.pending_region = None
+        self.go_to_measure_action.setEnabled(False)
+        self.follow_action.setEnabled(False)
+        self.stop_following()
+        if self.musicxml_dock is not None:
+            self.clear_musicxml_tree()
+            self.musicxml_text.clear()
+            self.musicxml_dock.setVisible(False)
+        self.musicxml_toolbar_action.setChecked(False)
+        self.stop_musicxml_loader()
+    
+    def stop_musicxml_loader(self):
+        """Ask a running MusicXML loader to give up; its results are ignored."""
+        if self.musicxml_loader is not None:
+            self.musicxml_loader.requestInterruption()
+            self.musicxml_loader = None
+    
+    def on_musicxml_progress(self, percent):
+        if self.musicxml_file:
+            self.statusBar().showMessage(
+                f"Reading {os.path.basename(self.musicxml_file)}... {percent}%")
+    
+    def on_musicxml_loaded(self, path, data):
+        if path != self.musicxml_file:
+            return  # Superseded by another document
+        self.musicxml_data = data
+        print(f"MusicXML data loaded: {self.musicxml_data}")
+        if self.startup_report is not None:
+            self.startup_report.mark("MusicXML summary loaded")
+            self.startup_report = None
+        self.create_musicxml_dock()
+        self.update_musicxml_display()
+        self.load_measure_map()
+        self.musicxml_dock.setVisible(True)
+        self.musicxml_toolbar_action.setChecked(True)
+        self.setWindowTitle(f'Music Score PDF Viewer - {os.path.basename(self.pdf_path)} (MusicXML loaded)')
+        print(f"Loaded associated MusicXML file: {self.musicxml_file}")
+        # A status message rather than a dialog: loading finishes at an
+        # arbitrary moment and must not steal focus from page turning
+        self.statusBar().showMessage(
+            f"Loaded associated MusicXML file: {os.path.basename(self.musicxml_file)}", 5000)
+
+    def on_musicxml_indexed(self, path, structure, fingerprint):
+        if path != self.musicxml_file:
             return
-            
-        try:
-            tree = ET.parse(self.musicxml_file)
-            root = tree.getroot()
-            
-            # Store the parsed data
-            self.musicxml_data = {
-                'title': self.get_musicxml_title(root),
-                'composer': self.get_musicxml_composer(root),
-                'parts': self.get_musicxml_parts(root),
-                'measures': self.count_musicxml_measures(root),
-            }
-            
-            print(f"MusicXML data loaded: {self.musicxml_data}")
-        except Exception as e:
-            print(f"Error parsing MusicXML file: {e}")
-            self.musicxml_data = None
-    
-    def get_musicxml_title(self, root):
-        """Extract the title from MusicXML file."""
-        # Handle both compressed and uncompressed MusicXML formats
-        if root.tag == 'score-partwise':
-            # Uncompressed MusicXML
-            work_title = root.find('.//work-title')
-            if work_title is not None and work_title.text:
-                return work_title.text
-                
-            movement_title = root.find('.//movement-title')
-            if movement_title is not None and movement_title.text:
-                return movement_title.text
-        
-        return "Unknown Title"
-    
-    def get_musicxml_composer(self, root):
-        """Extract the composer from MusicXML file."""
-        if root.tag == 'score-partwise':
-            composer = root.find('.//creator[@type="composer"]')
-            if composer is not None and composer.text:
-                return composer.text
-        
-        return "Unknown Composer"
-    
-    def get_musicxml_parts(self, root):
-        """Extract parts information from MusicXML file."""
-        parts = []
-        
-        if root.tag == 'score-partwise':
-            part_list = root.find('.//part-list')
-            if part_list is not None:
-                for part in part_list.findall('.//score-part'):
-                    part_id = part.get('id')
-                    part_name = part.find('.//part-name')
-                    name = part_name.text if part_name is not None and part_name.text else "Unknown"
-                    parts.append({'id': part_id, 'name': name})
-        
-        return parts
-    
-    def count_musicxml_measures(self, root):
-        """Count measures in the MusicXML file."""
-        if root.tag == 'score-partwise':
-            # Get first part
-            first_part = root.find('.//part')
-            if first_part is not None:
-                return len(first_part.findall('.//measure'))
-        
-        return 0
+        self.musicxml_loader = None
+        self.musicxml_structure = structure
+        self.musicxml_fingerprint = fingerprint
+        model = self.musicxml_tree.model()
+        if structure is not None and model is not None:
+            model.set_structure(structure)
+    
+    def load_measure_map(self):
+        """Use the saved measure map of the score, or build one in the background."""
+        self.measure_map = measure_map.load(self.pdf_path, self.musicxml_file)
+        if self.measure_map is not None:
+            self.go_to_measure_action.setEnabled(True)
+            self.follow_action.setEnabled(True)
+            return
+        # Scanning every page for barlines needs fitz, so it runs in a render worker
+        self.measure_map_task = f"measure map of {self.musicxml_file}"
+        self.render_pool.run_task(self.measure_map_task, measure_map.build_and_save,
+                                  self.pdf_path, self.musicxml_file)
+
+    def on_task_done(self, name, result):
+        if name == self.thumbnail_load_task:
+            self.thumbnail_load_task = None
+            if result is not None:
+                self.thumbnail_digest, thumbnails = result
+                for page_index, png_data in thumbnails.items():
+                    self.thumbnail_view.model().set_thumbnail(page_index, png_data)
+                self.request_thumbnails()
+        elif name in self.thumbnail_tasks:
+            del self.thumbnail_tasks[name]
+            if result is not None:
+                self.thumbnail_view.model().set_thumbnail(*result)
+            self.request_thumbnails()
+        elif name == self.measure_map_task:
+            self.measure_map_task = None
+            if result is None:
+                return
+            self.measure_map = result
+            self.go_to_measure_action.setEnabled(True)
+            self.follow_action.setEnabled(True)
+            message = f"Located {len(result)} measures in the PDF"
+            if result.unplaced:
+                message += f"; {result.unplaced} more measures of the MusicXML are past its last page"
+            self.statusBar().showMessage(message, 5000)
+        elif name == self.page_hash_task:
+            self.page_hash_task = None
+            if result is not None:
+                if self.page_hashes is None:
+                    self.page_hashes = result  # What the pages on screen look like
+                else:
+                    self.reload_pages(result)
+        elif name == self.musicxml_reload_task:
+            self.musicxml_reload_task = None
+            self.apply_musicxml_reload(result)
+        elif name == self.timeline_task:
+            self.timeline_task = None
+            if result is None:
+                self.follow_action.setChecked(False)
+                return
+            self.timeline = result
+            if self.follow_action.isChecked():
+                self.start_following()
+
+    def go_to_measure(self):
+        """Ask for a measure number and show where it is in the PDF."""
+        if self.measure_map is None:
+            return
+        number, ok = QInputDialog.getText(self, "Go to Measure", "Measure number:")
+        if ok and number.strip():
+            self.show_measure(number)
+
+    def show_measure(self, number):
+        """Turn to the page of a measure and scroll it into view."""
+        location = self.measure_map.locate(number) if self.measure_map else None
+        if location is None:
+            message = f"Measure {number} not found"
+            if self.measure_map is not None and self.measure_map.unplaced:
+                message += f" ({self.measure_map.unplaced} measures are past the last page of the PDF)"
+            self.statusBar().showMessage(message, 5000)
+            return False
+        page_index, rect = location
+        if page_index >= len(self.pdf_document):
+            return False
+        self.current_page = page_index
+        self.render_page()
+        self.update_page_label()
+        if rect is not None:
+            self.show_region(page_index, rect)
+        return True
+
+    def show_region(self, page_index, rect):
+        """Scroll a page-space rectangle of the current page into view."""
+        self.pending_region = None
+        if page_index != self.current_page:
+            return
+        if self.view_mode == self.SINGLE_PAGE and self.tiled_zoom is None and (
+                self.page_item is None or self.page_item_key[0] != page_index):
+            # The page is still rendering; on_page_rendered comes back here
+            self.pending_region = (page_index, rect)
+            return
+        
+        self.view.ensureVisible(self.page_region(page_index, rect), 20, 20)
+    
+    def scene_zoom(self):
+        """Zoom the scene is laid out at; the view transform covers any difference from zoom_factor."""
+        if self.view_mode != self.SINGLE_PAGE and self.page_rects and self.layout_key:
+            return self.layout_key[1]
+        if self.view_mode == self.SINGLE_PAGE and self.tiled_zoom is not None:
+            return self.tiled_zoom
+        return self.zoom_factor
+    
+    def page_region(self, page_index, rect):
+        """Scene rectangle of a page-space rectangle of a displayed page."""
+        # Map the rectangle through the same matrix the page is rendered with
+        x0, y0, x1, y1 = region_rect(self.pdf_document[page_index], rect, self.scene_zoom(), self.rotation)
+        scene_rect = QRectF(x0, y0, x1 - x0, y1 - y0)
+        if self.view_mode != self.SINGLE_PAGE and self.page_rects:
+            scene_rect.translate(self.page_rects[page_index].topLeft())
+        return scene_rect
+    
+    def toggle_follow(self, checked):
+        """Start following the score from the current page, or pause."""
+        if not checked:
+            if self.follower is not None:
+                self.follower.stop()
+            return
+        if self.timeline is None:
+            # Reading tempo and measure lengths streams the whole first part
+            self.timeline_task = f"timeline of {self.musicxml_file}"
+            self.render_pool.run_task(self.timeline_task, score_timeline.load_timeline, self.musicxml_file)
+            return
+        self.start_following()
+    
+    def start_following(self):
+        if self.follower is None:
+            self.follower = ScoreFollower(self.timeline, parent=self)
+            self.follower.position_changed.connect(self.on_follow_position)
+            self.follower.finished.connect(self.on_follow_finished)
+            self.follow_locations = self.measure_map.locate_all(self.timeline.numbers)
+            self.follow_measure = None
+        # Carry on where the cursor is if it is on screen, else from the top of the page
+        if self.follow_measure is None or not self.follow_page_shown(self.follow_locations[self.follow_measure]):
+            for index, location in enumerate(self.follow_locations):
+                if location is not None and location[0] == self.current_page:
+                    self.follower.seek_measure(index)
+                    break
+        self.follower.start()
+    
+    def stop_following(self):
+        """Stop following and forget the timeline, e.g. because another score is shown."""
+        if self.follower is not None:
+            self.follower.stop()
+            self.follower.deleteLater()
+            self.follower = None
+        self.timeline = None
+        self.timeline_task = None
+        self.follow_locations = None
+        self.follow_measure = None
+        self.follow_rect = None
+        self.follow_cursor.hide()
+        self.follow_action.setChecked(False)
+    
+    def on_follow_finished(self):
+        self.follow_action.setChecked(False)
+        self.follow_cursor.hide()
+    
+    def follow_page_shown(self, location):
+        """Whether the page of a measure location is among the pages on screen."""
+        if location is None:
+            return False
+        page_index = location[0]
+        if self.view_mode == self.SINGLE_PAGE:
+            return page_index == self.current_page
+        if self.view_mode == self.TWO_PAGES:
+            return page_index - page_index % 2 == self.current_page
+        return True  # Continuous: scrolling brings every page into view
+    
+    def on_follow_position(self, index, fraction):
+        """Move the cursor; only turning to another page redraws anything underneath."""
+        if self.pdf_document is None or self.pdf_document.is_closed:
+            return  # The score was closed since the follower's last frame
+        location = self.follow_locations[index]
+        if location is None or location[1] is None or location[0] >= len(self.pdf_document):
+            self.follow_cursor.hide()  # The measure map does not know where this measure is
+            return
+        page_index, rect = location
+        new_measure = index != self.follow_measure
+        if new_measure:
+            self.follow_measure = index
+            if not self.follow_page_shown(location):
+                self.current_page = page_index
+                if self.view_mode == self.TWO_PAGES:
+                    self.current_page -= page_index % 2
+                self.render_page()
+                self.update_page_label()
+            self.prefetch_follow_page(index)
+        
+        # The scene rect of the measure only changes with the layout
+        state = (self.view_mode, self.zoom_factor, self.rotation, self.layout_key, self.page_item_key)
+        if self.follow_rect is None or self.follow_rect[:2] != (index, state):
+            if (self.view_mode == self.SINGLE_PAGE and self.tiled_zoom is None
+                    and (self.page_item is None or self.page_item_key[0] != page_index)):
+                self.follow_cursor.hide()  # The page is still rendering
+                return
+            self.follow_rect = (index, state, self.page_region(page_index, rect))
+            new_measure = True
+        scene_rect = self.follow_rect[2]
+        if self.follow_cursor.scene() is None:
+            self.scene.addItem(self.follow_cursor)
+        self.follow_cursor.show_measure(scene_rect, fraction)
+        if new_measure:
+            self.view.ensureVisible(scene_rect, 20, 20)
+    
+    def prefetch_follow_page(self, index):
+        """Render the page the cursor goes to next before it gets there."""
+        page_index = self.follow_locations[index][0]
+        for location in self.follow_locations[index + 1:]:
+            if location is not None and location[0] != page_index:
+                next_page = location[0]
+                break
+        else:
+            return
+        if next_page >= len(self.pdf_document) or self.zoom_factor >= self.TILE_ZOOM_THRESHOLD:
+            return
+        key = PageCache.make_key(next_page, self.zoom_factor, self.rotation)
+        if key not in self.page_cache:
+            self.render_pool.request(key, next_page, self.zoom_factor, self.rotation)
+
+    def on_musicxml_failed(self, path, message):
+        if path != self.musicxml_file:
+            return
+        print(f"Error parsing MusicXML file: {message}")
+        self.musicxml_loader = None
+        self.musicxml_file = None
+        self.musicxml_toolbar_action.setEnabled(False)
+        self.statusBar().showMessage(f"Error parsing MusicXML file: {message}", 5000)
     
     def render_page(self):
         if not self.pdf_document or self.current_page >= len(self.pdf_document):
             return
         
-        # Clear the previous rendering
-        self.scene.clear()
-        
-        # Get the current page
-        page = self.pdf_document[self.current_page]
+        if self.view_mode != self.SINGLE_PAGE:
+            # Multi-page modes keep one layout per zoom/rotation and just scroll
+            layout_key = (self.view_mode, round(self.zoom_factor, 4), self.rotation)
+            if layout_key != self.layout_key:
+                # show_layout_page times the 'scene' stage of each page it places
+                self.layout_pages()
+            self.scroll_to_page(self.current_page)
+            return
         
-        # Render the page to a pixmap with zoom
-        zoom_matrix = fitz.Matrix(self.zoom_factor, self.zoom_factor)
+        if self.zoom_factor >= self.TILE_ZOOM_THRESHOLD:
+            self.render_tiled_page()
+            return
         
-        # Apply rotation if needed
-        if self.rotation != 0:
-            # PyMuPDF rotation is in 90-degree increments (0, 90, 180, 270)
-            # Map our rotation to the nearest valid rotation
-            mupdf_rotation = int(self.rotation / 90) % 4 * 90
-            zoom_matrix = zoom_matrix * fitz.Matrix(mupdf_rotation)
+        # Reuse a previously rendered pixmap for this page, zoom and rotation
+        cache_key = PageCache.make_key(self.current_page, self.zoom_factor, self.rotation)
+        page_pixmap = self.page_cache.get(cache_key)
+        if page_pixmap is None and self.render_pool.is_pending(cache_key):
+            # A prefetch of this page is already running; keep the current
+            # picture until on_page_rendered displays it, rather than
+            # rendering it twice
+            self.prefetch_neighbours()
+            return
+        if page_pixmap is None:
+            page_pixmap = self.rasterize_page(self.current_page)
+            self.page_cache.put(cache_key, page_pixmap)
         
-        pixmap = page.get_pixmap(matrix=zoom_matrix)
+        with perf.measure('scene', page=self.current_page + 1):
+            # Clear the previous rendering
+            self.clear_scene()
+            
+            pixmap_item = QGraphicsPixmapItem(page_pixmap)
+            self.page_item = pixmap_item
+            self.page_item_key = cache_key
+            
+            # For rotations that aren't multiples of 90, we need to apply additional rotation
+            if self.rotation % 90 != 0:
+                transform = QTransform().rotate(self.rotation % 90)
+                pixmap_item.setTransform(transform)
+            
+            self.scene.addItem(pixmap_item)
+            
+            # Set the scene rectangle to the size of the pixmap
+            self.scene.setSceneRect(QRectF(0, 0, page_pixmap.width(), page_pixmap.height()))
+            
+            # Update the view
+            self.view.setSceneRect(self.scene.sceneRect())
         
-        # Convert pixmap to QImage
-        img = QImage(pixmap.samples, pixmap.width, pixmap.height,
-                    pixmap.stride, QImage.Format_RGB888)
+        self.prefetch_neighbours()
+    
+    def clear_scene(self):
+        """Remove every item from the scene and forget the display state."""
+        # Reset the bookkeeping first: clearing the scene and the view
+        # transform can scroll, which re-enters update_visible_pages
+        self.page_item = None
+        self.layout_key = None
+        self.page_rects = []
+        self.row_spans = []
+        self.page_pixmap_items = {}
+        self.preview_pages = set()
+        self.tiled_zoom = None
+        self.tile_items = {}
+        self.follow_rect = None
+        if self.follow_cursor.scene() is not None:
+            # Taken out first, so scene.clear() does not delete it
+            self.scene.removeItem(self.follow_cursor)
+        self.scene.clear()
+        self.view.resetTransform()
+    
+    def render_tiled_page(self):
+        """
+        Show the current page at high zoom as a grid of tiles. Only tiles near
+        the viewport are rasterized (see update_visible_tiles); the last
+        whole-page render of this page is stretched underneath as a preview.
+        """
+        backdrop = None
+        if self.page_item is not None and self.page_item_key[0::2] == (self.current_page, self.rotation):
+            backdrop = (self.page_item.pixmap(), self.page_item_key)
         
-        # Create QPixmap from QImage
-        pixmap_item = QGraphicsPixmapItem(QPixmap.fromImage(img))
+        self.clear_scene()
+        self.tiled_zoom = self.zoom_factor
         
-        # For rotations that aren't multiples of 90, we need to apply additional rotation
-        if self.rotation % 90 != 0:
-            transform = QTransform().rotate(self.rotation % 90)
-            pixmap_item.setTransform(transform)
+        page = self.pdf_document[self.current_page]
+        pixel_rect = page_pixel_rect(page, self.zoom_factor, self.rotation)
+        page_rect = QRectF(0, 0, pixel_rect.width, pixel_rect.height)
+        placeholder = QGraphicsRectItem(page_rect)
+        placeholder.setPen(QPen(Qt.lightGray))
+        placeholder.setBrush(QBrush(Qt.white))
+        self.scene.addItem(placeholder)
+        
+        if backdrop:
+            # Keep it as page_item so zooming back out can preview from it
+            backdrop_pixmap, backdrop_key = backdrop
+            scale = self.zoom_factor / backdrop_key[1]
+            self.page_item = QGraphicsPixmapItem(backdrop_pixmap)
+            self.page_item.setTransform(QTransform.fromScale(scale, scale))
+            self.page_item_key = backdrop_key
+            self.scene.addItem(self.page_item)
+        
+        self.scene.setSceneRect(page_rect)
+        self.view.setSceneRect(page_rect)
+        self.update_visible_tiles()
+    
+    def tiles_near_viewport(self, margin_tiles):
+        """(column, row) of the tiles of the tiled page within margin_tiles of the visible area."""
+        columns, rows = tile_grid(self.pdf_document[self.current_page], self.tiled_zoom, self.rotation)
+        visible = self.view.mapToScene(self.view.viewport().rect()).boundingRect()
+        
+        def tile_range(low, high, count):
+            first = max(0, int(low // TILE_SIZE) - margin_tiles)
+            last = min(count, int(high // TILE_SIZE) + 1 + margin_tiles)
+            return range(first, last)
+        
+        return [(column, row) for column in tile_range(visible.left(), visible.right(), columns)
+                for row in tile_range(visible.top(), visible.bottom(), rows)]
+    
+    def update_visible_tiles(self):
+        """Rasterize tiles that intersect the viewport and drop far away ones."""
+        if self.tiled_zoom is None or not self.view.transform().isIdentity():
+            return
+        page = self.pdf_document[self.current_page]
+        center = self.view.mapToScene(self.view.viewport().rect()).boundingRect().center()
+        
+        # Request visible tiles plus a one-tile border, nearest first, so
+        # panning with ScrollHandDrag finds its neighbours ready
+        wanted_tiles = sorted(
+            self.tiles_near_viewport(1),
+            key=lambda tile: abs((tile[0] + 0.5) * TILE_SIZE - center.x())
+                             + abs((tile[1] + 0.5) * TILE_SIZE - center.y()))
+        wanted = set()
+        for column, row in wanted_tiles:
+            key = self.tile_key(column, row)
+            wanted.add(key)
+            if (column, row) in self.tile_items:
+                continue
+            tile_pixmap = self.page_cache.get(key)
+            if tile_pixmap is None:
+                clip = tile_clip(page, self.zoom_factor, self.rotation, column, row)
+                self.render_pool.request(key, self.current_page, self.zoom_factor, self.rotation, clip)
+            else:
+                self.show_tile(column, row, tile_pixmap)
+        self.render_pool.retain(wanted)
+        
+        keep = set(self.tiles_near_viewport(3))
+        for column, row in list(self.tile_items):
+            if (column, row) not in keep:
+                self.scene.removeItem(self.tile_items.pop((column, row)))
+    
+    def tile_key(self, column, row):
+        """Cache key of a tile of the current page at the current zoom and rotation."""
+        return PageCache.make_key(self.current_page, self.zoom_factor, self.rotation) + (column, row)
+    
+    def show_tile(self, column, row, tile_pixmap):
+        tile_item = QGraphicsPixmapItem(tile_pixmap)
+        tile_item.setPos(column * TILE_SIZE, row * TILE_SIZE)
+        tile_item.setZValue(1)
+        self.scene.addItem(tile_item)
+        self.tile_items[(column, row)] = tile_item
+    
+    def page_size(self, page_index):
+        """Size of a page in scene units at the current zoom and rotation."""
+        if self.page_sizes is None:
+            # Only page.rect is needed for the layout, nothing is rasterized
+            self.page_sizes = [(page.rect.width, page.rect.height) for page in self.pdf_document]
+        width, height = self.page_sizes[page_index]
+        if self.rotation % 180 == 90:
+            width, height = height, width
+        return width * self.zoom_factor, height * self.zoom_factor
+    
+    def layout_pages(self):
+        """
+        Lay out a placeholder for every page for the Two Pages and Continuous
+        view modes. Pages are only rasterized once they come near the viewport
+        (see update_visible_pages), so long scores cost no more than short ones.
+        """
+        # Pages on screen at another zoom level serve as previews until their
+        # sharp renders arrive
+        previews = {}
+        if self.layout_key and self.layout_key[0::2] == (self.view_mode, self.rotation):
+            previous_zoom = self.layout_key[1]
+            # Previews are scaled to the old layout, so their pixmaps are at yet another zoom
+            previews = {index: (item.pixmap(), previous_zoom / item.transform().m11())
+                        for index, item in self.page_pixmap_items.items()}
+        
+        self.clear_scene()
+        self.layout_key = (self.view_mode, round(self.zoom_factor, 4), self.rotation)
+        
+        pages_per_row = 2 if self.view_mode == self.TWO_PAGES else 1
+        page_count = len(self.pdf_document)
+        placeholder_pen = QPen(Qt.lightGray)
+        placeholder_brush = QBrush(Qt.white)
+        y = 0
+        scene_width = 0
+        for row_start in range(0, page_count, pages_per_row):
+            row_pages = range(row_start, min(row_start + pages_per_row, page_count))
+            x = 0
+            row_height = 0
+            for page_index in row_pages:
+                width, height = self.page_size(page_index)
+                rect = QRectF(x, y, width, height)
+                self.page_rects.append(rect)
+                placeholder = QGraphicsRectItem(rect)
+                placeholder.setPen(placeholder_pen)
+                placeholder.setBrush(placeholder_brush)
+                self.scene.addItem(placeholder)
+                x += width + self.PAGE_GAP
+                row_height = max(row_height, height)
+            scene_width = max(scene_width, x - self.PAGE_GAP)
+            self.row_spans.extend([(y, y + row_height)] * len(row_pages))
+            y += row_height + self.PAGE_GAP
+        
+        self.scene.setSceneRect(QRectF(0, 0, scene_width, max(0, y - self.PAGE_GAP)))
+        self.view.setSceneRect(self.scene.sceneRect())
         
-        self.scene.addItem(pixmap_item)
+        for page_index, (page_pixmap, pixmap_zoom) in previews.items():
+            self.show_layout_page(page_index, page_pixmap, self.zoom_factor / pixmap_zoom)
+    
+    def pages_between(self, top, bottom):
+        """Range of page indices whose rows intersect the scene span [top, bottom]."""
+        first = bisect_left([span[1] for span in self.row_spans], top)
+        last = bisect_right([span[0] for span in self.row_spans], bottom)
+        return range(first, last)
+    
+    def pages_near_viewport(self, margin_screens):
+        """Pages within margin_screens viewport heights of the visible area."""
+        visible = self.view.mapToScene(self.view.viewport().rect()).boundingRect()
+        margin = visible.height() * margin_screens
+        return self.pages_between(visible.top() - margin, visible.bottom() + margin)
+    
+    def scroll_to_page(self, page_index):
+        """Scroll a multi-page layout so that the given page is at the top."""
+        if not self.page_rects:
+            return
+        rect = self.page_rects[page_index]
+        self.scrolling_to_page = True
+        try:
+            self.view.verticalScrollBar().setValue(int(rect.top()))
+            self.view.horizontalScrollBar().setValue(int(rect.left()))
+        finally:
+            self.scrolling_to_page = False
+        self.update_visible_pages()
+    
+    def update_visible_pages(self):
+        """
+        Rasterize pages that intersect the viewport plus a margin and release
+        pixmaps of pages that have scrolled far away.
+        """
+        if self.tiled_zoom is not None:
+            self.update_visible_tiles()
+            return
+        if (self.view_mode == self.SINGLE_PAGE or not self.page_rects or not self.layout_key
+                or not self.pdf_document):
+            return
+        visible = self.view.mapToScene(self.view.viewport().rect()).boundingRect()
+        # Until refine_zoom rebuilds it, the layout stays at the zoom it was
+        # built at and the view transform makes up the difference
+        layout_zoom = self.layout_key[1]
+        zoom = round(self.zoom_factor, 4)
+        
+        # Track the page at the top of the viewport while the user scrolls
+        if not self.scrolling_to_page:
+            top_pages = self.pages_between(visible.top() + 1, visible.top() + 1)
+            if top_pages and top_pages[0] != self.current_page:
+                self.current_page = top_pages[0]
+                self.update_page_label()
         
-        # Set the scene rectangle to the size of the pixmap
-        self.scene.setSceneRect(QRectF(0, 0, pixmap.width, pixmap.height))
+        # Request nearby pages, closest to the viewport centre first
+        center = visible.center().y()
+        nearby = sorted(self.pages_near_viewport(1),
+                        key=lambda index: abs(self.page_rects[index].center().y() - center))
+        wanted = set()
+        for page_index in nearby:
+            key = PageCache.make_key(page_index, self.zoom_factor, self.rotation)
+            wanted.add(key)
+            if page_index in self.page_pixmap_items and (page_index not in self.preview_pages
+                                                         or layout_zoom != zoom):
+                continue
+            page_pixmap = self.page_cache.get(key)
+            if page_pixmap is None:
+                self.render_pool.request(key, page_index, self.zoom_factor, self.rotation)
+            else:
+                self.show_layout_page(page_index, page_pixmap, layout_zoom / zoom)
+        self.render_pool.retain(wanted)
+        
+        # Pages far outside the viewport give their pixmaps back; the page
+        # cache alone decides how many rendered pages stay in memory
+        keep = self.pages_near_viewport(3)
+        for page_index in [index for index in self.page_pixmap_items if index not in keep]:
+            self.scene.removeItem(self.page_pixmap_items.pop(page_index))
+            self.preview_pages.discard(page_index)
+    
+    def show_layout_page(self, page_index, page_pixmap, scale=1.0):
+        """
+        Put a rasterized page on top of its placeholder in the layout.
+        A scale other than 1 marks a preview rendered at another zoom level.
+        """
+        with perf.measure('scene', page=page_index + 1):
+            if page_index in self.page_pixmap_items:
+                self.scene.removeItem(self.page_pixmap_items.pop(page_index))
+            pixmap_item = QGraphicsPixmapItem(page_pixmap)
+            pixmap_item.setPos(self.page_rects[page_index].topLeft())
+            if scale != 1.0:
+                pixmap_item.setTransform(QTransform.fromScale(scale, scale))
+                self.preview_pages.add(page_index)
+            else:
+                self.preview_pages.discard(page_index)
+            self.scene.addItem(pixmap_item)
+            self.page_pixmap_items[page_index] = pixmap_item
+    
+    def prefetch_neighbours(self):
+        """Render pages around the current one in the background."""
+        wanted = set()
+        for distance in range(1, self.prefetch_distance + 1):
+            # Alternate ahead/behind so the next page is always queued first
+            for page_index in (self.current_page + distance, self.current_page - distance):
+                if not 0 <= page_index < len(self.pdf_document):
+                    continue
+                key = PageCache.make_key(page_index, self.zoom_factor, self.rotation)
+                wanted.add(key)
+                if key not in self.page_cache:
+                    self.render_pool.request(key, page_index, self.zoom_factor, self.rotation)
+        
+        # Jobs for pages we jumped away from or an old zoom level are stale
+        current_key = PageCache.make_key(self.current_page, self.zoom_factor, self.rotation)
+        wanted.add(current_key)
+        self.render_pool.retain(wanted)
+    
+    def on_page_rendered(self, key, page_pixmap):
+        """Store a page rendered in the background and show it if it is current."""
+        if not self.pdf_document:
+            return
+        page_index, zoom_factor, rotation = key[:3]
+        if PageCache.make_key(0, self.zoom_factor, self.rotation)[1:] != (zoom_factor, rotation):
+            return  # Finished after a zoom or rotation change
+        self.page_cache.put(key, page_pixmap)
+        if len(key) > 3:
+            # A tile: show it if it belongs to the tiled page on screen
+            tile = key[3:]
+            if (self.tiled_zoom is not None and page_index == self.current_page
+                    and tile not in self.tile_items and self.view.transform().isIdentity()):
+                self.show_tile(*tile, page_pixmap)
+            return
+        if self.view_mode != self.SINGLE_PAGE:
+            if not self.page_rects or not self.layout_key:
+                return
+            # A layout still at the previous zoom only takes pages as previews
+            layout_zoom = self.layout_key[1]
+            needs_pixmap = (page_index not in self.page_pixmap_items
+                            or (page_index in self.preview_pages and layout_zoom == zoom_factor))
+            # Skip pages the user has already scrolled away from
+            if needs_pixmap and page_index in self.pages_near_viewport(1):
+                self.show_layout_page(page_index, page_pixmap, layout_zoom / zoom_factor)
+        elif page_index == self.current_page:
+            self.render_page()
+            if self.pending_region is not None:
+                self.show_region(*self.pending_region)
+    
+    def rasterize_page(self, page_index):
+        """Render a page at the current zoom and rotation into a QPixmap."""
+        page = page_index + 1
+        with perf.measure('render', page=page, zoom=round(self.zoom_factor, 4)):
+            pixmap = render_pixmap(self.pdf_document[page_index], self.zoom_factor, self.rotation, gray=self.gray)
         
-        # Update the view
-        self.view.setSceneRect(self.scene.sceneRect())
+        # samples_mv exposes MuPDF's buffer without copying it out first
+        with perf.measure('convert', page=page, zoom=round(self.zoom_factor, 4)):
+            return pixmap_from_samples(pixmap.width, pixmap.height, pixmap.stride, pixmap.n, pixmap.samples_mv)
         
     def update_page_label(self):
         total_pages = len(self.pdf_document) if self.pdf_document else 0
         self.page_label.setText(f'Page: {self.current_page + 1} / {total_pages}')
-        
+        if self.current_page < self.thumbnail_view.model().rowCount():
+            index = self.thumbnail_view.model().index(self.current_page)
+            self.thumbnail_view.setCurrentIndex(index)
+            self.thumbnail_view.scrollTo(index)
+        
+    def page_step(self):
+        # Two Pages mode turns a whole spread at a time
+        return 2 if self.view_mode == self.TWO_PAGES else 1
+    
     def previous_page(self):
         if self.pdf_document and self.current_page > 0:
-            self.current_page -= 1
+            self.current_page = max(0, self.current_page - self.page_step())
             self.render_page()
             self.update_page_label()
         
     def next_page(self):
         if self.pdf_document and self.current_page < len(self.pdf_document) - 1:
-            self.current_page += 1
+            self.current_page = min(len(self.pdf_document) - 1, self.current_page + self.page_step())
             self.render_page()
             self.update_page_label()
     
     def zoom_in(self):
         self.zoom_factor *= 1.25
-        self.update_zoom_label()
-        self.render_page()
+        self.apply_zoom()
     
     def zoom_out(self):
         self.zoom_factor /= 1.25
+        self.apply_zoom()
+    
+    def apply_zoom(self):
+        """
+        Show a new zoom level immediately by scaling what is already on screen,
+        then swap in sharp renders once zooming has settled.
+        """
         self.update_zoom_label()
-        self.render_page()
+        if not self.pdf_document:
+            return
+        
+        if self.view_mode == self.SINGLE_PAGE and self.tiled_zoom is not None:
+            # Scale the tiles on screen; they are re-requested on refine
+            scale = self.zoom_factor / self.tiled_zoom
+            self.view.setTransform(QTransform.fromScale(scale, scale))
+        elif self.view_mode == self.SINGLE_PAGE:
+            cache_key = PageCache.make_key(self.current_page, self.zoom_factor, self.rotation)
+            if cache_key in self.page_cache or self.page_item is None:
+                self.zoom_timer.stop()
+                self.render_page()
+                return
+            scale = self.zoom_factor / self.page_item_key[1]
+            self.page_item.setTransform(QTransform.fromScale(scale, scale))
+            self.scene.setSceneRect(self.page_item.sceneBoundingRect())
+            self.view.setSceneRect(self.scene.sceneRect())
+        elif self.layout_key:
+            # Scale the whole layout; it is rebuilt at the new zoom on refine
+            scale = self.zoom_factor / self.layout_key[1]
+            self.view.setTransform(QTransform.fromScale(scale, scale))
+        
+        self.zoom_timer.start()
+    
+    def refine_zoom(self):
+        """Replace the scaled preview with pages rendered at the new zoom."""
+        if not self.pdf_document:
+            return
+        if self.view_mode != self.SINGLE_PAGE or self.zoom_factor >= self.TILE_ZOOM_THRESHOLD:
+            # Layouts and tiled pages already render in the background
+            self.render_page()
+            return
+        cache_key = PageCache.make_key(self.current_page, self.zoom_factor, self.rotation)
+        if cache_key not in self.page_cache:
+            # on_page_rendered swaps the page in when the background job lands
+            self.render_pool.request(cache_key, self.current_page, self.zoom_factor, self.rotation)
+        if not self.render_pool.is_pending(cache_key):
+            self.render_page()
     
     def update_zoom_label(self):
         zoom_percentage = int(self.zoom_factor * 100)
@@ -433,22 +1733,13 @@ class PDFViewer(QMainWindow):
         if not self.pdf_document:
             return
         
-        # Get the current page
-        page = self.pdf_document[self.current_page]
-        
-        # Calculate the zoom factor to fit the width
-        # Get page dimensions
-        rect = page.rect
-        page_width = rect.width
-        
         # Get view width
         view_width = self.view.viewport().width() - 20  # Subtract some padding
         
-        # Calculate zoom factor
-        self.zoom_factor = view_width / page_width
+        # Calculate the zoom factor to fit the width of the (rotated) current page
+        self.zoom_factor = fit_width_zoom(self.pdf_document[self.current_page], view_width, self.rotation)
         
-        self.update_zoom_label()
-        self.render_page()
+        self.apply_zoom()
     
     def rotate_left(self):
         self.rotation = (self.rotation - 90) % 360
@@ -458,22 +1749,54 @@ class PDFViewer(QMainWindow):
         self.rotation = (self.rotation + 90) % 360
         self.render_page()
     
+    def change_color_mode(self, index):
+        gray = index == 1
+        if gray == self.gray:
+            return
+        self.gray = gray
+        self.render_pool.gray = gray
+        # Pages cached or in flight have the other pixel format
+        self.render_pool.cancel_pending()
+        self.page_cache.clear()
+        self.layout_key = None
+        self.render_page()
+    
     def change_view_mode(self, index):
-        # This would be implemented to handle different view modes for music scores
-        # For now, we'll just re-render the current page
+        self.view_mode = index
+        if self.view_mode == self.TWO_PAGES:
+            # Spreads start on even pages
+            self.current_page -= self.current_page % 2
+            self.update_page_label()
         self.render_page()
 
+    def closeEvent(self, event):
+        # A pending refine or reload, or the follower's next frame, would use documents closed below
+        self.zoom_timer.stop()
+        self.reload_timer.stop()
+        self.stop_following()
+        self.render_pool.shutdown()
+        self.documents.close_all()
+        perf.recorder.close()
+        if self.musicxml_loader is not None:
+            self.musicxml_loader.requestInterruption()
+            self.musicxml_loader.wait()
+        if self.musicxml_dock is not None:
+            self.musicxml_text.clear()
+            self.clear_musicxml_tree()
+        super().closeEvent(event)
+
     def resizeEvent(self, event):
         # When the window is resized, adjust the view if in fit-to-width mode
         super().resizeEvent(event)
+        # A larger viewport may uncover pages that are not rasterized yet
+        self.update_visible_pages()
         # In a real implementation, we might check if we're in fit-to-width mode
         # and recalculate the zoom factor
 
     def reset_zoom(self):
         if self.pdf_document:
             self.zoom_factor = 1.0
-            self.update_zoom_label()
-            self.render_page()
+            self.apply_zoom()
     
     def first_page(self):
         if self.pdf_document and self.current_page != 0:
@@ -491,53 +1814,80 @@ class PDFViewer(QMainWindow):
         """Update the MusicXML information display in the dock widget."""
         if not self.musicxml_data:
             return
-            
-        self.musicxml_tree.clear()
-        
-        # Add basic info
-        title_item = QTreeWidgetItem(["Title", self.musicxml_data['title']])
-        self.musicxml_tree.addTopLevelItem(title_item)
-        
-        composer_item = QTreeWidgetItem(["Composer", self.musicxml_data['composer']])
-        self.musicxml_tree.addTopLevelItem(composer_item)
-        
-        measures_item = QTreeWidgetItem(["Measures", str(self.musicxml_data['measures'])])
-        self.musicxml_tree.addTopLevelItem(measures_item)
-        
-        # Add parts information
-        parts_item = QTreeWidgetItem(["Parts", f"{len(self.musicxml_data['parts'])} part(s)"])
-        self.musicxml_tree.addTopLevelItem(parts_item)
-        
-        for part in self.musicxml_data['parts']:
-            part_item = QTreeWidgetItem([part['id'], part['name']])
-            parts_item.addChild(part_item)
-            
-        # Expand all items
-        self.musicxml_tree.expandAll()
+
+        import score_tree
         
-        # Load raw XML into text browser
-        if self.musicxml_file:
-            try:
-                with open(self.musicxml_file, 'r', encoding='utf-8') as f:
-                    xml_content = f.read()
-                    self.musicxml_text.setText(xml_content)
-            except Exception as e:
-                self.musicxml_text.setText(f"Error loading XML content: {e}")
+        # Parts, measures and notes are only read as their rows are expanded
+        self.clear_musicxml_tree()
+        model = score_tree.ScoreTreeModel(self.musicxml_file, self.musicxml_data, self)
+        self.musicxml_tree.setModel(model)
+        self.musicxml_tree.setColumnWidth(0, 150)
+        self.musicxml_tree.expand(model.index(model.parts_node.row, 0))
+
+    def clear_musicxml_tree(self):
+        model = self.musicxml_tree.model()
+        if model is not None:
+            self.musicxml_tree.setModel(None)
+            model.close()
+            model.deleteLater()
+
+    def load_musicxml_source(self):
+        """Map the raw XML into the details view if it is not already there."""
+        if not self.musicxml_file or self.musicxml_text.is_loaded(self.musicxml_file):
+            return True
+        try:
+            self.musicxml_text.load(self.musicxml_file)
+            return True
+        except Exception as e:
+            print(f"Error loading XML content: {e}")
+            self.statusBar().showMessage(f"Error loading XML content: {e}", 5000)
+            return False
 
     def toggle_musicxml_details(self):
         """Toggle visibility of detailed MusicXML content."""
         if self.musicxml_text.isVisible():
             self.musicxml_text.setVisible(False)
             self.detail_button.setText("View MusicXML Details")
-        else:
+        elif self.load_musicxml_source():
             self.musicxml_text.setVisible(True)
             self.detail_button.setText("Hide MusicXML Details")
 
-def main():
-    app = QApplication(sys.argv)
+    def show_musicxml_source(self, part_id, measure=None):
+        """Open the details view at a part, or at one of its measures."""
+        if not self.musicxml_text.isVisible():
+            self.toggle_musicxml_details()
+        if self.musicxml_text.isVisible():
+            self.musicxml_text.show_part(part_id, measure)
+
+    def on_musicxml_item_activated(self, index):
+        """Jump to the raw XML of a part or measure when its row is double-clicked."""
+        location = self.musicxml_tree.model().location(index)
+        if location is not None:
+            self.show_musicxml_source(*location)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Music score PDF viewer with MusicXML integration.")
+    parser.add_argument('pdf', nargs='*', help="PDF files to open, each in a tab of its own")
+    parser.add_argument('--page', type=int, default=1, help="page to open at, counting from 1 (default: 1)")
+    parser.add_argument('--zoom', type=float, default=1.0, help="zoom factor, e.g. 1.5 for 150%% (default: 1.0)")
+    parser.add_argument('--timing', action='store_true', help="print how long startup took")
+    # Anything else (e.g. -style) is left to Qt
+    args, qt_args = parser.parse_known_args(argv)
+    if args.zoom <= 0:
+        parser.error("--zoom must be positive")
+    imported = time.perf_counter()
+
+    app = QApplication(sys.argv[:1] + qt_args)
     viewer = PDFViewer()
+    if args.timing:
+        viewer.startup_report = StartupReport(viewer)
+        viewer.startup_report.mark("modules imported", imported)
     viewer.show()
+    if args.timing:
+        viewer.startup_report.mark("window shown")
+    for pdf_path in args.pdf:
+        viewer.open_document(pdf_path, args.page - 1, args.zoom)
     sys.exit(app.exec_())
 
 if __name__ == '__main__':
-    main() 
\ No newline at end of file
+    main()
\ No newline at end of file
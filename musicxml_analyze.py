@@ -1,70 +1,54 @@
-from music21 import converter, note, chord
-
-# MusicXML 파일 경로 (파일명 수정 필요)
-score = converter.parse("./data/La Gazza ladra Overture_완판(20250202).musicxml")
-note_data = []
-
-for i, part in enumerate(score.parts):
-    part_name = part.partName if part.partName else f"Part {i+1}"
-    instrument_number = i + 1
-
-    for element in part.recurse():
-        if isinstance(element, note.Note):
-            note_data.append({
-                "instrument_number": instrument_number,
-                "instrument": part_name,
-                "type": "note",
-                "pitch": element.pitch.nameWithOctave,
-                "offset": element.offset,
-                "duration": element.duration.quarterLength,
-                "measure": element.getContextByClass("Measure").number if element.getContextByClass("Measure") else None,
-                "pitches": None
-            })
-        elif isinstance(element, chord.Chord):
-            note_data.append({
-                "instrument_number": instrument_number,
-                "instrument": part_name,
-                "type": "chord",
-                "pitch": None,
-                "offset": element.offset,
-                "duration": element.duration.quarterLength,
-                "measure": element.getContextByClass("Measure").number if element.getContextByClass("Measure") else None,
-                "pitches": [p.nameWithOctave for p in element.pitches]
-            })
-
-
-# Pandas로 보기 좋게 출력 (선택)
-import pandas as pd
-df = pd.DataFrame(note_data)
-
-# 첫 4마디만 필터링
-filtered = [n for n in note_data if n["measure"] in [1, 2, 3, 4]]
-
-# 마디별로 그룹화
+import argparse
 from collections import defaultdict
 
-measures = defaultdict(list)
-for entry in filtered:
-    measures[entry["measure"]].append(entry)
-
-# 마디별로 출력
-for measure_number in sorted(measures.keys()):
-    print(f"\n🎼 Measure {measure_number}")
-    for entry in measures[measure_number]:
-        pitch_info = entry["pitch"] if entry["type"] == "note" else f"Chord: {entry['pitches']}"
-        print(f"  ▶ {entry['instrument_number']:>2}. {entry['instrument']:<20} | {pitch_info:<10} | duration: {entry['duration']} | offset: {entry['offset']}")
+import score_cache
+from note_table import extract_note_table
 
-exit()            
-# Pandas로 보기 좋게 출력 (선택)
-import pandas as pd
-df = pd.DataFrame(note_data)
-print(df.head(100))
-
-exit()
-for index, row in df.iterrows():
-    # print one row as one row
-    #print(row)
-    # print one row as one row
-    print(f"index: {index}, instrument_number: {row['instrument_number']}, instrument: {row['instrument']}, type: {row['type']}, pitch: {row['pitch']}, offset: {row['offset']}, measure: {row['measure']}, pitches: {row['pitches']}")
-    if index > 100: 
-        break
+# MusicXML 파일 경로 (파일명 수정 필요)
+SCORE_PATH = "./data/La Gazza ladra Overture_완판(20250202).musicxml"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="MusicXML 악보의 음표를 추출하고 첫 4마디를 출력")
+    parser.add_argument("score", nargs="?", default=SCORE_PATH, help="MusicXML(.xml/.musicxml/.mxl) 파일")
+    parser.add_argument("--parquet", help="음표 테이블을 Parquet 파일로 저장")
+    parser.add_argument("--feather", help="음표 테이블을 Feather 파일로 저장")
+    parser.add_argument("--workers", type=int, help="파트별 병렬 추출에 쓸 프로세스 수 (기본: 코어 수, 1이면 순차 추출)")
+    args = parser.parse_args(argv)
+
+    # 이전에 추출한 결과가 캐시에 있으면 파싱을 건너뜀
+    table = score_cache.load(args.score, "note-table")
+    if table is None:
+        # 큰 악보는 파트마다 별도 프로세스에서 추출 (작은 파일은 자동으로 순차 처리)
+        table = extract_note_table(args.score, workers=args.workers)
+        score_cache.store(args.score, "note-table", table)
+
+    if args.parquet:
+        table.to_parquet(args.parquet)
+    if args.feather:
+        table.to_feather(args.feather)
+
+    # 첫 4마디만 필터링 - 마디 인덱스로 전체 음표를 훑지 않고 잘라냄
+    filtered = table.select_measures(1, 4)
+    event_measures = filtered.measure[filtered.event_offsets[:-1]]
+
+    # 마디별로 그룹화 (음표/화음 단위)
+    measures = defaultdict(list)
+    for event, measure_number in enumerate(event_measures.tolist()):
+        measures[measure_number].append(event)
+
+    # 마디별로 출력
+    for measure_number in sorted(measures.keys()):
+        print(f"\n🎼 Measure {measure_number}")
+        for event in measures[measure_number]:
+            rows = range(filtered.event_offsets[event], filtered.event_offsets[event + 1])
+            first = rows.start
+            part = int(filtered.part[first])
+            names = filtered.pitch_names(rows)
+            pitch_info = names[0] if len(names) == 1 else f"Chord: {names}"
+            print(f"  ▶ {part + 1:>2}. {filtered.part_names[part]:<20} | {pitch_info:<10} | duration: {filtered.duration[first]} | offset: {filtered.offset[first]}")
+
+
+# 병렬 추출의 워커 프로세스가 이 모듈을 다시 import해도 실행되지 않도록 함
+if __name__ == "__main__":
+    main()
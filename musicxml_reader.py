@@ -0,0 +1,157 @@
+"""
+Streaming MusicXML reader.
+
+Scores are read with ElementTree's iterparse and every element is cleared as
+soon as it has been looked at, so memory use stays flat however large the
+file is. Compressed .mxl archives are decompressed on the fly.
+"""
+import os
+import posixpath
+import xml.etree.ElementTree as ET
+import zipfile
+
+# Extensions of MusicXML siblings, in the order they are looked for
+MUSICXML_EXTENSIONS = ('.xml', '.musicxml', '.mxl')
+
+MUSICXML_MEDIA_TYPES = ('application/vnd.recordare.musicxml+xml', 'application/vnd.recordare.musicxml')
+
+
+class _ProgressReader:
+    """File wrapper that reports how far iterparse has read."""
+
+    def __init__(self, f, total_bytes, progress):
+        self.f = f
+        self.total_bytes = max(total_bytes, 1)
+        self.progress = progress
+        self.bytes_read = 0
+        self.last_percent = -1
+
+    def read(self, size=-1):
+        data = self.f.read(size)
+        self.bytes_read += len(data)
+        percent = min(100, self.bytes_read * 100 // self.total_bytes)
+        if percent != self.last_percent:
+            self.last_percent = percent
+            self.progress(percent)
+        return data
+
+
+def mxl_rootfile(archive):
+    """
+    Name of the score inside a compressed MusicXML archive, as declared by
+    META-INF/container.xml.
+    """
+    try:
+        container = ET.fromstring(archive.read('META-INF/container.xml'))
+    except KeyError:
+        container = None
+    if container is not None:
+        rootfiles = [rootfile for rootfile in container.iter()
+                     if rootfile.tag.rsplit('}', 1)[-1] == 'rootfile' and rootfile.get('full-path')]
+        # The first MusicXML rootfile is the score; others may be PDFs or images
+        for rootfile in rootfiles:
+            if rootfile.get('media-type', MUSICXML_MEDIA_TYPES[0]) in MUSICXML_MEDIA_TYPES:
+                return rootfile.get('full-path')
+
+    # Archives without a usable container: take the first score-like member
+    for name in archive.namelist():
+        if not name.startswith('META-INF/') and posixpath.splitext(name)[1].lower() in ('.xml', '.musicxml'):
+            return name
+    raise ValueError("No MusicXML rootfile found in compressed MusicXML archive")
+
+
+def _open_source(path):
+    """Open a MusicXML file for streaming; returns (binary file, uncompressed size)."""
+    if os.path.splitext(path)[1].lower() != '.mxl':
+        f = open(path, 'rb')
+        return f, os.fstat(f.fileno()).st_size
+
+    archive = zipfile.ZipFile(path)
+    try:
+        info = archive.getinfo(mxl_rootfile(archive))
+        # The member decompresses as it is read, so neither a temp file nor
+        # the whole decompressed score is ever needed. It keeps the archive's
+        # file handle open until it is closed itself.
+        return archive.open(info), info.file_size
+    finally:
+        archive.close()
+
+
+def open_musicxml(path):
+    """
+    Open a .xml, .musicxml or compressed .mxl score as a binary stream of
+    MusicXML, suitable for iterparse or read().
+    """
+    return _open_source(path)[0]
+
+
+def read_summary(path, progress=None):
+    """
+    Extract title, composer, part list and per-part measure counts in a
+    single pass over a MusicXML file.
+    progress, if given, is called with the percentage of the file read.
+    Returns a dict with 'title', 'composer', 'parts', 'measures' (the measure
+    count of the first part) and 'part_measures' (part id -> measure count).
+    """
+    f, total_bytes = _open_source(path)
+    with f:
+        source = f
+        if progress is not None:
+            source = _ProgressReader(f, total_bytes, progress)
+        return _summarize(source)
+
+
+def _summarize(source):
+    work_title = None
+    movement_title = None
+    composer = None
+    parts = []
+    part_measures = {}
+    root_tag = None
+    current_part = None
+    depth = 0
+
+    for event, elem in ET.iterparse(source, events=('start', 'end')):
+        if event == 'start':
+            depth += 1
+            if root_tag is None:
+                root_tag = elem.tag
+            elif elem.tag == 'part' and depth == 2:
+                current_part = elem.get('id')
+                part_measures[current_part] = 0
+            continue
+
+        depth -= 1
+        tag = elem.tag
+        if tag == 'measure':
+            if root_tag == 'score-partwise' and current_part is not None:
+                part_measures[current_part] += 1
+            elif root_tag == 'score-timewise' and depth == 1:
+                # Timewise scores nest parts inside measures
+                for part in elem.findall('part'):
+                    part_id = part.get('id')
+                    part_measures[part_id] = part_measures.get(part_id, 0) + 1
+            elem.clear()
+        elif tag == 'part' and depth == 1:
+            current_part = None
+            elem.clear()
+        elif tag == 'work-title' and work_title is None:
+            work_title = elem.text
+        elif tag == 'movement-title' and movement_title is None:
+            movement_title = elem.text
+        elif tag == 'creator' and elem.get('type') == 'composer' and composer is None:
+            composer = elem.text
+        elif tag == 'score-part':
+            part_name = elem.find('part-name')
+            name = part_name.text if part_name is not None and part_name.text else "Unknown"
+            parts.append({'id': elem.get('id'), 'name': name})
+            elem.clear()
+
+    first_part = parts[0]['id'] if parts else next(iter(part_measures), None)
+    return {
+        'title': work_title or movement_title or "Unknown Title",
+        'composer': composer or "Unknown Composer",
+        'parts': parts,
+        'measures': part_measures.get(first_part, 0),
+        'part_measures': part_measures,
+    }
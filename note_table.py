@@ -0,0 +1,482 @@
+"""
+Columnar note table extracted from MusicXML.
+
+Every pitched note is one row of a set of typed NumPy columns instead of a
+Python dict, which keeps large scores compact and hands the data to pandas
+or Arrow without copying it. Notes sounding together in a chord are
+consecutive rows; event_offsets marks where each note or chord starts.
+"""
+import io
+import multiprocessing
+import os
+import re
+import xml.etree.ElementTree as ET
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import musicxml_reader
+
+# Semitones above C of each diatonic step, indexed by step number
+STEP_NAMES = 'CDEFGAB'
+STEP_SEMITONES = (0, 2, 4, 5, 7, 9, 11)
+
+# Smaller scores are extracted in one pass: starting worker processes costs more
+PARALLEL_MIN_BYTES = 8 * 1024 * 1024
+
+_MEASURE_NUMBER = re.compile(r'-?\d+')
+_XML_ENCODING = re.compile(rb'<\?xml[^>]*\bencoding=["\']([^"\']+)')
+
+
+def pitch_name(pitch, step, alter):
+    """Spelled pitch name in music21 style, e.g. 'C#4' or 'B-3'."""
+    octave = (pitch - alter - STEP_SEMITONES[step]) // 12 - 1
+    accidental = '#' * alter if alter > 0 else '-' * -alter
+    return f"{STEP_NAMES[step]}{accidental}{octave}"
+
+
+def measure_number(text):
+    """Numeric part of a MusicXML measure number ('12a' -> 12), or -1."""
+    match = _MEASURE_NUMBER.match(text or '')
+    return int(match.group()) if match else -1
+
+
+class NoteTable:
+    """
+    Notes of a score as parallel typed columns.
+
+    part      int16    index into part_ids / part_names
+    pitch     int16    MIDI note number
+    step      int8     diatonic step, 0 (C) to 6 (B)
+    alter     int8     chromatic alteration in semitones
+    offset    float64  start in quarter notes from the start of the measure
+    duration  float64  length in quarter notes (0 for grace notes)
+    measure   int32    measure number
+
+    event_offsets (int64, one longer than the number of events) gives the
+    first row of each note or chord event: event i spans rows
+    event_offsets[i]:event_offsets[i + 1].
+
+    Rows are stored part by part in score order, so the notes of a run of
+    measures in one part are a contiguous slice; measure_slices finds those
+    slices through an index instead of scanning the measure column.
+    """
+
+    COLUMNS = ('part', 'pitch', 'step', 'alter', 'offset', 'duration', 'measure')
+
+    def __init__(self, part_ids, part_names, columns, event_offsets):
+        self.part_ids = list(part_ids)
+        self.part_names = list(part_names)
+        for name in self.COLUMNS:
+            setattr(self, name, columns[name])
+        self.event_offsets = event_offsets
+        self._measure_index = None
+
+    def __getstate__(self):
+        # The measure index is cheap to rebuild, so it is not pickled
+        state = self.__dict__.copy()
+        state['_measure_index'] = None
+        return state
+
+    def __setstate__(self, state):
+        state.setdefault('_measure_index', None)
+        self.__dict__.update(state)
+
+    def __len__(self):
+        return len(self.pitch)
+
+    def __repr__(self):
+        return f"NoteTable({len(self)} notes, {self.event_count()} events, {len(self.part_ids)} parts)"
+
+    def columns(self):
+        return {name: getattr(self, name) for name in self.COLUMNS}
+
+    def event_count(self):
+        return len(self.event_offsets) - 1
+
+    def chord_sizes(self):
+        """Number of notes in each event (1 for single notes)."""
+        return np.diff(self.event_offsets)
+
+    def event_index(self):
+        """Event number of every row."""
+        sizes = self.chord_sizes()
+        return np.repeat(np.arange(len(sizes)), sizes)
+
+    def in_chord(self):
+        """Boolean column: True for rows that belong to a chord."""
+        sizes = self.chord_sizes()
+        return np.repeat(sizes > 1, sizes)
+
+    def measure_index(self):
+        """
+        Index of the row range of every (part, measure) run, sorted by measure
+        number and then part. Returns a dict of arrays 'measure', 'part',
+        'start' and 'stop'. Built with a few vectorized passes on first use.
+        """
+        if self._measure_index is None:
+            if len(self) == 0:
+                empty = np.zeros(0, dtype=np.int64)
+                self._measure_index = {'measure': empty, 'part': empty, 'start': empty, 'stop': empty}
+                return self._measure_index
+            # A new run starts wherever the part or the measure number changes
+            boundaries = np.flatnonzero((np.diff(self.part) != 0) | (np.diff(self.measure) != 0)) + 1
+            starts = np.concatenate(([0], boundaries))
+            stops = np.concatenate((boundaries, [len(self)]))
+            measures = self.measure[starts]
+            parts = self.part[starts]
+            order = np.lexsort((starts, parts, measures))
+            self._measure_index = {'measure': measures[order], 'part': parts[order],
+                                   'start': starts[order], 'stop': stops[order]}
+        return self._measure_index
+
+    def measure_slices(self, first, last=None, parts=None):
+        """
+        Row slices holding measures first..last (inclusive) of the given part
+        indices (all parts by default), one slice per contiguous run, ordered
+        by part. Costs a binary search plus the size of the answer.
+        """
+        last = first if last is None else last
+        index = self.measure_index()
+        lo = np.searchsorted(index['measure'], first, side='left')
+        hi = np.searchsorted(index['measure'], last, side='right')
+        runs = sorted(zip(index['part'][lo:hi].tolist(), index['start'][lo:hi].tolist(),
+                          index['stop'][lo:hi].tolist()))
+        slices = []
+        previous_part = None
+        for part, start, stop in runs:
+            if parts is not None and part not in parts:
+                continue
+            if slices and part == previous_part and slices[-1].stop == start:
+                # Consecutive measures of one part merge into a single slice
+                slices[-1] = slice(slices[-1].start, stop)
+            else:
+                slices.append(slice(start, stop))
+            previous_part = part
+        return slices
+
+    def take(self, slices):
+        """New NoteTable holding only the rows of the given measure-aligned slices."""
+        columns = {name: np.concatenate([column[s] for s in slices]) if slices else column[:0]
+                   for name, column in self.columns().items()}
+        event_offsets = []
+        position = 0
+        for s in slices:
+            first_event = np.searchsorted(self.event_offsets, s.start, side='left')
+            last_event = np.searchsorted(self.event_offsets, s.stop, side='left')
+            event_offsets.append(self.event_offsets[first_event:last_event] - s.start + position)
+            position += s.stop - s.start
+        event_offsets.append([position])
+        return NoteTable(self.part_ids, self.part_names, columns,
+                         np.concatenate(event_offsets).astype(np.int64))
+
+    def select_measures(self, first, last=None, parts=None):
+        """NoteTable of measures first..last (inclusive), e.g. select_measures(120, 140)."""
+        return self.take(self.measure_slices(first, last, parts))
+
+    def pitch_names(self, rows=None):
+        """Spelled names of the given rows (all rows by default)."""
+        rows = range(len(self)) if rows is None else rows
+        return [pitch_name(int(self.pitch[row]), int(self.step[row]), int(self.alter[row]))
+                for row in rows]
+
+    def to_dataframe(self):
+        """
+        pandas DataFrame over the same buffers. The numeric columns are not
+        copied; 'part_id' is a categorical over the part column (part names
+        need not be unique, so they stay in part_names).
+        """
+        import pandas as pd
+
+        data = self.columns()
+        data['part_id'] = pd.Categorical.from_codes(self.part, categories=self.part_ids)
+        return pd.DataFrame(data, copy=False)
+
+    def to_arrow(self):
+        """pyarrow Table over the same buffers, with the part names as metadata."""
+        import pyarrow as pa
+
+        table = pa.table(self.columns())
+        metadata = {'part_ids': '\x1f'.join(self.part_ids), 'part_names': '\x1f'.join(self.part_names)}
+        return table.replace_schema_metadata(metadata)
+
+    def to_parquet(self, path):
+        import pyarrow.parquet as pq
+
+        pq.write_table(self.to_arrow(), path)
+
+    def to_feather(self, path):
+        import pyarrow.feather as feather
+
+        feather.write_feather(self.to_arrow(), path)
+
+    def save(self, path):
+        """Save as an uncompressed .npz archive (needs only NumPy to read back)."""
+        np.savez(path, part_ids=np.array(self.part_ids), part_names=np.array(self.part_names),
+                 event_offsets=self.event_offsets, **self.columns())
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            columns = {name: data[name] for name in cls.COLUMNS}
+            return cls(data['part_ids'].tolist(), data['part_names'].tolist(),
+                       columns, data['event_offsets'])
+
+
+class _TableBuilder:
+    """Appends notes to typed arrays that NumPy can adopt without copying."""
+
+    def __init__(self):
+        self.part = array('h')
+        self.pitch = array('h')
+        self.step = array('b')
+        self.alter = array('b')
+        self.offset = array('d')
+        self.duration = array('d')
+        self.measure = array('i')
+        self.event_offsets = array('q')
+
+    def add_measure(self, part_index, measure, state):
+        """
+        Append the pitched notes of one <measure> element. state carries
+        the part's current divisions per quarter note between measures.
+        """
+        number = measure_number(measure.get('number'))
+        position = 0  # Current time in divisions from the start of the measure
+        chord_start = 0
+        previous_pitched = False
+
+        for child in measure:
+            tag = child.tag
+            if tag == 'attributes':
+                divisions = child.findtext('divisions')
+                if divisions:
+                    state['divisions'] = float(divisions)
+            elif tag == 'backup':
+                position -= float(child.findtext('duration') or 0)
+            elif tag == 'forward':
+                position += float(child.findtext('duration') or 0)
+            elif tag == 'note':
+                duration = 0.0 if child.find('grace') is not None else float(child.findtext('duration') or 0)
+                is_chord = child.find('chord') is not None
+                if is_chord:
+                    start = chord_start
+                else:
+                    start = chord_start = position
+                    position += duration
+
+                pitch = child.find('pitch')
+                if pitch is None:
+                    # Rests and unpitched percussion advance time only
+                    previous_pitched = False
+                    continue
+                step = STEP_NAMES.find(pitch.findtext('step', 'C'))
+                alter = int(round(float(pitch.findtext('alter') or 0)))
+                octave = int(pitch.findtext('octave') or 4)
+
+                if not (is_chord and previous_pitched):
+                    self.event_offsets.append(len(self.pitch))
+                previous_pitched = True
+
+                divisions = state['divisions']
+                self.part.append(part_index)
+                self.pitch.append((octave + 1) * 12 + STEP_SEMITONES[step] + alter)
+                self.step.append(step)
+                self.alter.append(alter)
+                self.offset.append(start / divisions)
+                self.duration.append(duration / divisions)
+                self.measure.append(number)
+
+    def extend(self, other):
+        """Append the notes collected by another builder after this one's."""
+        base = len(self.pitch)
+        for name in NoteTable.COLUMNS:
+            getattr(self, name).extend(getattr(other, name))
+        self.event_offsets.frombytes((np.frombuffer(other.event_offsets, dtype=np.int64) + base).tobytes())
+
+    def extend_rows(self, table, start, stop):
+        """Append rows start:stop of a NoteTable; both must fall on event boundaries."""
+        base = len(self.pitch)
+        for name in NoteTable.COLUMNS:
+            getattr(self, name).frombytes(getattr(table, name)[start:stop].tobytes())
+        first_event = np.searchsorted(table.event_offsets, start, side='left')
+        last_event = np.searchsorted(table.event_offsets, stop, side='left')
+        offsets = table.event_offsets[first_event:last_event] - start + base
+        self.event_offsets.frombytes(offsets.astype(np.int64).tobytes())
+
+    def build(self, part_ids, part_names):
+        self.event_offsets.append(len(self.pitch))
+        columns = {name: np.frombuffer(getattr(self, name), dtype=array_dtype)
+                   for name, array_dtype in (('part', np.int16), ('pitch', np.int16),
+                                             ('step', np.int8), ('alter', np.int8),
+                                             ('offset', np.float64), ('duration', np.float64),
+                                             ('measure', np.int32))}
+        return NoteTable(part_ids, part_names, columns,
+                         np.frombuffer(self.event_offsets, dtype=np.int64))
+
+
+def extract_measure(xml, divisions=1.0, part_id='P1', part_name='Part 1'):
+    """
+    NoteTable of a single <measure> element given as XML bytes, with the
+    divisions per quarter note in effect where the measure starts.
+    """
+    builder = _TableBuilder()
+    builder.add_measure(0, ET.fromstring(xml), {'divisions': divisions})
+    return builder.build([part_id], [part_name])
+
+
+def extract_note_table(path, workers=None):
+    """
+    Build a NoteTable from a .xml, .musicxml or .mxl partwise score.
+
+    Uncompressed scores of PARALLEL_MIN_BYTES or more with several parts
+    have their parts extracted in parallel by up to workers processes (one
+    per core if None), each parsing only the bytes of its own <part>. Other
+    scores, or workers=1, take a single streaming pass. Both give the same
+    table.
+    """
+    if (workers != 1 and not path.lower().endswith('.mxl')
+            and os.path.getsize(path) >= PARALLEL_MIN_BYTES):
+        # score_tree builds on this module, so it is imported here
+        import score_tree
+
+        try:
+            parts = score_tree.index_file(path)
+        except ValueError:
+            parts = None  # The serial pass reports what is wrong with the file
+        if parts and len(parts) > 1:
+            with open(path, 'rb') as f:
+                header = f.read(parts[0]['start'])
+            # Parts are parsed as fragments without the XML declaration,
+            # which only works if they are UTF-8
+            encoding = _XML_ENCODING.search(header)
+            if encoding is None or encoding.group(1).lower() in (b'utf-8', b'utf8'):
+                return _extract_parts(path, header, parts, workers)
+    return _extract_serial(path)
+
+
+def update_note_table(table, path, parts, changed):
+    """
+    NoteTable of a score that has been written again, from the table of its
+    previous version: only the parts whose ids are in changed are extracted
+    from the file, the rows of the others are copied. parts is the
+    score_tree index of the new file. When parts were added, removed or
+    reordered, the whole score is extracted again.
+    """
+    part_ids = [part['id'] for part in parts]
+    if path.lower().endswith('.mxl') or not parts or part_ids != table.part_ids:
+        return extract_note_table(path)
+    with open(path, 'rb') as f:
+        header = f.read(parts[0]['start'])
+    encoding = _XML_ENCODING.search(header)
+    if encoding is not None and encoding.group(1).lower() not in (b'utf-8', b'utf8'):
+        return extract_note_table(path)
+    # Part names live in the header, which may have changed too
+    listed_ids, part_names = _part_list(header)
+    if listed_ids != part_ids:
+        return extract_note_table(path)
+
+    builder = _TableBuilder()
+    for part_index, part in enumerate(parts):
+        if part['id'] in changed:
+            builder.extend(_extract_part(path, part_index, part['start'], part['end']))
+        else:
+            # Rows are stored part by part, so a part's rows are one slice
+            start = np.searchsorted(table.part, part_index, side='left')
+            stop = np.searchsorted(table.part, part_index, side='right')
+            builder.extend_rows(table, start, stop)
+    return builder.build(part_ids, part_names)
+
+
+def _extract_serial(path):
+    """Single streaming pass; each measure is cleared as soon as its notes are stored."""
+    builder = _TableBuilder()
+    part_ids = []
+    part_names = []
+    part_index = {}
+    state = None
+    current_part = None
+    depth = 0
+
+    with musicxml_reader.open_musicxml(path) as f:
+        for event, elem in ET.iterparse(f, events=('start', 'end')):
+            if event == 'start':
+                depth += 1
+                if depth == 1 and elem.tag != 'score-partwise':
+                    raise ValueError(f"Only partwise MusicXML is supported, not <{elem.tag}>")
+                if depth == 2 and elem.tag == 'part':
+                    part_id = elem.get('id')
+                    if part_id not in part_index:
+                        part_index[part_id] = len(part_ids)
+                        part_ids.append(part_id)
+                        part_names.append(part_id)
+                    current_part = part_index[part_id]
+                    state = {'divisions': 1.0}
+                continue
+
+            depth -= 1
+            if elem.tag == 'measure' and current_part is not None:
+                builder.add_measure(current_part, elem, state)
+                elem.clear()
+            elif elem.tag == 'part' and depth == 1:
+                current_part = None
+                elem.clear()
+            elif elem.tag == 'score-part':
+                # The part list precedes the parts, so names are known in time
+                part_id = elem.get('id')
+                part_index[part_id] = len(part_ids)
+                part_ids.append(part_id)
+                part_names.append(elem.findtext('part-name') or f"Part {len(part_ids)}")
+                elem.clear()
+
+    return builder.build(part_ids, part_names)
+
+
+def _part_list(header):
+    """Part ids and names from the <part-list> in the bytes before the first <part>."""
+    part_ids = []
+    part_names = []
+    parser = ET.XMLPullParser(events=('end',))
+    parser.feed(header)
+    for _, elem in parser.read_events():
+        if elem.tag == 'score-part':
+            part_ids.append(elem.get('id'))
+            part_names.append(elem.findtext('part-name') or f"Part {len(part_ids)}")
+    return part_ids, part_names
+
+
+def _extract_parts(path, header, parts, workers):
+    """Extract the <part> byte ranges of parts in worker processes and merge them in score order."""
+    part_ids, part_names = _part_list(header)
+    part_index = {part_id: index for index, part_id in enumerate(part_ids)}
+    jobs = []
+    for part in parts:
+        if part['id'] not in part_index:
+            part_index[part['id']] = len(part_ids)
+            part_ids.append(part['id'])
+            part_names.append(part['id'])
+        jobs.append((part_index[part['id']], part['start'], part['end']))
+
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    # Spawn rather than fork, as this may run inside the viewer
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+        results = executor.map(_extract_part, [path] * len(jobs), *zip(*jobs))
+        builder = _TableBuilder()
+        for part_builder in results:
+            builder.extend(part_builder)
+    return builder.build(part_ids, part_names)
+
+
+def _extract_part(path, part_index, start, end):
+    """Notes of the <part> element at bytes start:end of path; runs in a worker process."""
+    with open(path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    builder = _TableBuilder()
+    state = {'divisions': 1.0}
+    for _, elem in ET.iterparse(io.BytesIO(data)):
+        if elem.tag == 'measure':
+            builder.add_measure(part_index, elem, state)
+            elem.clear()
+    return builder
@@ -0,0 +1,122 @@
+"""
+Memory-budgeted LRU cache for rendered PDF pages.
+"""
+from collections import OrderedDict
+
+
+class PageCache:
+    """
+    LRU cache of rendered page pixmaps keyed by (page index, zoom, rotation).
+
+    The cache is bounded by the total byte size of the stored pixmaps rather
+    than by entry count, because a page rendered at 400% costs sixteen times
+    as much memory as the same page at 100%.
+
+    Pages of several documents share the budget. Lookups refer to the
+    document chosen with set_document; when memory runs out, the pages of
+    the other documents go first, those shown longest ago first.
+    """
+
+    def __init__(self, max_bytes=256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.document = None
+        self._entries = OrderedDict()  # key -> (pixmap, size in bytes) of the current document
+        # Document -> its entries, the current document last
+        self._documents = OrderedDict([(None, self._entries)])
+
+    @staticmethod
+    def make_key(page_index, zoom_factor, rotation):
+        """Build a cache key for a page rendered at the given zoom and rotation."""
+        # Zoom factors are produced by repeated multiplication, so round them
+        # to make 1.25 * 0.8 land on the same key as 1.0
+        return (page_index, round(zoom_factor, 4), rotation % 360)
+
+    @staticmethod
+    def pixmap_bytes(pixmap):
+        """Approximate memory used by a QPixmap or QImage."""
+        return pixmap.width() * pixmap.height() * max(pixmap.depth(), 8) // 8
+
+    def set_document(self, document):
+        """Make get, put and invalidate refer to the pages of document (e.g. its path)."""
+        entries = self._documents.get(document)
+        if entries is None:
+            entries = self._documents[document] = OrderedDict()
+        self._documents.move_to_end(document)
+        self.document = document
+        self._entries = entries
+
+    def discard_document(self, document):
+        """Drop every page of a document that will not be shown again."""
+        entries = self._documents.get(document)
+        if entries is None:
+            return
+        self.total_bytes -= sum(size for _, size in entries.values())
+        entries.clear()
+        if document != self.document:
+            del self._documents[document]
+
+    def get(self, key):
+        """Return the cached pixmap for key, or None on a miss."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key, pixmap):
+        """Store a pixmap, evicting least recently used pages over budget."""
+        size = self.pixmap_bytes(pixmap)
+        if key in self._entries:
+            self.total_bytes -= self._entries.pop(key)[1]
+        if size > self.max_bytes:
+            # A single page larger than the whole budget is never worth keeping
+            return
+        self._entries[key] = (pixmap, size)
+        self.total_bytes += size
+        self._evict()
+
+    def _evict(self):
+        # Documents are ordered from least recently shown to the current
+        # one, so background documents empty before the current one
+        for entries in self._documents.values():
+            while self.total_bytes > self.max_bytes and entries:
+                _, (_, size) = entries.popitem(last=False)
+                self.total_bytes -= size
+            if self.total_bytes <= self.max_bytes:
+                return
+
+    def invalidate(self, page_index=None):
+        """Drop all entries of the current document, or only those belonging to one page."""
+        if page_index is None:
+            self.total_bytes -= sum(size for _, size in self._entries.values())
+            self._entries.clear()
+            return
+        for key in [k for k in self._entries if k[0] == page_index]:
+            self.total_bytes -= self._entries.pop(key)[1]
+
+    def clear(self):
+        """Drop the entries of every document and reset the hit/miss counters."""
+        for entries in self._documents.values():
+            entries.clear()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __len__(self):
+        return sum(len(entries) for entries in self._documents.values())
+
+    def __repr__(self):
+        return (f"PageCache({len(self)} pages, {self.total_bytes / 1048576:.1f} / "
+                f"{self.max_bytes / 1048576:.0f} MB, hit rate {self.hit_rate():.0%})")
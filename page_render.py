@@ -0,0 +1,116 @@
+"""
+GUI-free page rasterization shared by the viewer and its render workers.
+"""
+import time
+
+import fitz  # PyMuPDF
+
+from document_pool import DocumentPool
+
+TILE_SIZE = 512  # Edge length of a render tile in device pixels
+
+
+def page_matrix(zoom_factor, rotation):
+    """Build the MuPDF transformation matrix for a zoom factor and rotation."""
+    zoom_matrix = fitz.Matrix(zoom_factor, zoom_factor)
+
+    # Apply rotation if needed
+    if rotation != 0:
+        # PyMuPDF rotation is in 90-degree increments (0, 90, 180, 270)
+        # Map our rotation to the nearest valid rotation
+        mupdf_rotation = int(rotation / 90) % 4 * 90
+        zoom_matrix = zoom_matrix * fitz.Matrix(mupdf_rotation)
+
+    return zoom_matrix
+
+
+def page_pixel_rect(page, zoom_factor, rotation):
+    """Device-space bounding box of a whole page rendered at zoom and rotation."""
+    return (page.rect * page_matrix(zoom_factor, rotation)).irect
+
+
+def fit_width_zoom(page, width, rotation):
+    """Zoom factor at which the rotated page is width device pixels wide."""
+    page_width = page.rect.height if rotation % 180 == 90 else page.rect.width
+    return width / page_width
+
+
+def region_rect(page, rect, zoom_factor, rotation):
+    """
+    Where a page-space rectangle ends up in a page rendered at zoom and
+    rotation, as (x0, y0, x1, y1) relative to the top-left of the pixmap.
+    """
+    matrix = page_matrix(zoom_factor, rotation)
+    origin = (page.rect * matrix).irect
+    device = fitz.Rect(rect) * matrix
+    return (device.x0 - origin.x0, device.y0 - origin.y0, device.x1 - origin.x0, device.y1 - origin.y0)
+
+
+def tile_grid(page, zoom_factor, rotation, tile_size=TILE_SIZE):
+    """Number of (columns, rows) of tiles covering the rendered page."""
+    pixel_rect = page_pixel_rect(page, zoom_factor, rotation)
+    return (-(-pixel_rect.width // tile_size), -(-pixel_rect.height // tile_size))
+
+
+def tile_clip(page, zoom_factor, rotation, column, row, tile_size=TILE_SIZE):
+    """
+    Page-space clip rectangle of one tile, for the clip argument of
+    get_pixmap. Tiles are counted from the top-left of the rendered page.
+    """
+    matrix = page_matrix(zoom_factor, rotation)
+    pixel_rect = (page.rect * matrix).irect
+    device_rect = fitz.Rect(pixel_rect.x0 + column * tile_size,
+                            pixel_rect.y0 + row * tile_size,
+                            min(pixel_rect.x0 + (column + 1) * tile_size, pixel_rect.x1),
+                            min(pixel_rect.y0 + (row + 1) * tile_size, pixel_rect.y1))
+    return tuple(device_rect * ~matrix)
+
+
+def render_pixmap(page, zoom_factor, rotation, clip=None, gray=False):
+    """
+    Rasterize a page, or only the clip part of it, to a fitz Pixmap: RGB, or
+    8-bit grayscale when gray is set (a third of the memory, and plenty for
+    black and white scores).
+    """
+    colorspace = fitz.csGRAY if gray else fitz.csRGB
+    return page.get_pixmap(matrix=page_matrix(zoom_factor, rotation), clip=clip,
+                           colorspace=colorspace, alpha=False)
+
+
+def render_samples(page, zoom_factor, rotation, clip=None, gray=False):
+    """
+    Rasterize a page like render_pixmap, as a (width, height, stride,
+    components, samples) tuple that can be pickled across process
+    boundaries and wrapped in a QImage on the GUI side.
+    """
+    pixmap = render_pixmap(page, zoom_factor, rotation, clip, gray)
+    return pixmap.width, pixmap.height, pixmap.stride, pixmap.n, pixmap.samples
+
+
+# fitz documents are not thread-safe, so every render worker process keeps
+# its own handles, opened on first use and reused for later jobs. A few stay
+# open so that switching between the viewer's tabs does not reopen them.
+WORKER_DOCUMENTS = 4
+_worker_documents = DocumentPool(max_open=WORKER_DOCUMENTS)
+
+
+def worker_document(path):
+    """The calling worker process's own handle on the document at path."""
+    return _worker_documents.get(path)
+
+
+def worker_render(path, page_index, zoom_factor, rotation, clip=None, gray=False):
+    """
+    Render a page or tile inside a worker process using its own document
+    handle. Returns the render_samples tuple and the seconds spent in the
+    'open' (only when the document had to be opened) and 'render' stages.
+    """
+    start = time.perf_counter()
+    opening = not _worker_documents.is_current(path)
+    document = worker_document(path)
+    opened = time.perf_counter()
+    samples = render_samples(document[page_index], zoom_factor, rotation, clip, gray)
+    timings = {'render': time.perf_counter() - opened}
+    if opening:
+        timings['open'] = opened - start
+    return samples, timings
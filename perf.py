@@ -0,0 +1,121 @@
+"""
+Timing of the viewer's stages, to find out what makes a page turn slow.
+
+Each stage keeps its most recent durations in memory for the on-screen
+HUD (see perf_hud). When MRVIEWER_PERF_LOG names a file, every measurement
+is also appended to it as one JSON object per line, e.g.
+
+    {"time": 1760781234.56, "stage": "render", "ms": 41.7, "page": 3, "zoom": 2.0}
+
+Stages measured by the viewer:
+    open      fitz.open of a PDF (in the viewer or in a render worker)
+    render    get_pixmap of a page or tile
+    convert   turning rendered samples into a QPixmap
+    scene     putting pages on the QGraphicsScene
+    musicxml  parsing or indexing a MusicXML file
+"""
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+
+STAGES = ('open', 'render', 'convert', 'scene', 'musicxml')
+HISTORY = 200  # Durations kept per stage for the statistics
+
+
+class PerfRecorder:
+    """Rolling per-stage timings, optionally logged as JSON lines. Thread-safe."""
+
+    def __init__(self, history=HISTORY, log_path=None):
+        self.history = history
+        self._durations = {}  # Stage -> deque of seconds
+        self._lock = threading.Lock()
+        self._log_path = log_path
+        self._log = None
+
+    def set_log(self, path):
+        """Append measurements to the file at path, or stop logging if path is None."""
+        with self._lock:
+            if self._log is not None:
+                self._log.close()
+                self._log = None
+            self._log_path = path
+
+    def _write_log(self, entry):
+        # Opened on the first measurement, so processes that import this
+        # module without measuring anything (render workers) leave it alone
+        if self._log is None:
+            try:
+                self._log = open(self._log_path, 'a', encoding='utf-8', buffering=1)
+            except OSError as e:
+                print(f"Error opening performance log {self._log_path}: {e}")
+                self._log_path = None
+                return
+        self._log.write(json.dumps(entry, ensure_ascii=False) + '\n')
+
+    def record(self, stage, seconds, **fields):
+        """Add one duration of stage; fields (page, zoom, ...) only go to the log."""
+        with self._lock:
+            durations = self._durations.get(stage)
+            if durations is None:
+                durations = self._durations[stage] = deque(maxlen=self.history)
+            durations.append(seconds)
+            if self._log_path:
+                entry = {'time': round(time.time(), 3), 'stage': stage, 'ms': round(seconds * 1000, 2)}
+                entry.update(fields)
+                self._write_log(entry)
+
+    def measure(self, stage, **fields):
+        """Context manager timing its block as one duration of stage."""
+        return _Measurement(self, stage, fields)
+
+    def stats(self, stage):
+        """
+        Statistics of the recent durations of stage in seconds, as a dict
+        with count, last, median and p95, or None if it was never measured.
+        """
+        with self._lock:
+            durations = list(self._durations.get(stage, ()))
+        if not durations:
+            return None
+        ordered = sorted(durations)
+        count = len(ordered)
+        middle = count // 2
+        median = ordered[middle] if count % 2 else (ordered[middle - 1] + ordered[middle]) / 2
+        return {'count': count, 'last': durations[-1], 'median': median,
+                'p95': ordered[math.ceil(0.95 * count) - 1]}
+
+    def reset(self):
+        with self._lock:
+            self._durations = {}
+
+    def close(self):
+        self.set_log(None)
+
+
+class _Measurement:
+    __slots__ = ('recorder', 'stage', 'fields', 'start')
+
+    def __init__(self, recorder, stage, fields):
+        self.recorder = recorder
+        self.stage = stage
+        self.fields = fields
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # A stage that failed says nothing about how long it normally takes
+        if exc_type is None:
+            self.recorder.record(self.stage, time.perf_counter() - self.start, **self.fields)
+        return False
+
+
+# The recorder shared by the whole viewer
+recorder = PerfRecorder(log_path=os.environ.get('MRVIEWER_PERF_LOG'))
+measure = recorder.measure
+record = recorder.record
+stats = recorder.stats
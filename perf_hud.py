@@ -0,0 +1,61 @@
+"""
+On-screen overlay with the viewer's stage timings and page cache usage.
+"""
+from PyQt5.QtCore import Qt, QTimer
+from PyQt5.QtGui import QFontDatabase
+from PyQt5.QtWidgets import QLabel
+
+import perf
+
+
+class PerfHud(QLabel):
+    """
+    Semi-transparent panel in the top left corner of a view showing the
+    last, median and 95th percentile time of every stage, the page cache
+    hit rate and the memory held by cached pixmaps. It refreshes itself
+    twice a second while visible and ignores the mouse.
+    """
+
+    MARGIN = 8
+
+    def __init__(self, view, page_cache):
+        # A child of the view rather than of its viewport, which scrolls its children
+        super().__init__(view)
+        self.view = view
+        self.page_cache = page_cache
+        self.setFont(QFontDatabase.systemFont(QFontDatabase.FixedFont))
+        self.setStyleSheet("background-color: rgba(0, 0, 0, 170); color: white; padding: 6px;")
+        self.setAttribute(Qt.WA_TransparentForMouseEvents)
+        self.timer = QTimer(self)
+        self.timer.setInterval(500)
+        self.timer.timeout.connect(self.refresh)
+        self.hide()
+
+    def toggle(self):
+        self.setVisible(not self.isVisible())
+
+    def setVisible(self, visible):
+        super().setVisible(visible)
+        if visible:
+            self.refresh()
+            self.timer.start()
+        else:
+            self.timer.stop()
+
+    def refresh(self):
+        lines = [f"{'ms':<9}{'last':>8}{'median':>8}{'p95':>8}{'n':>5}"]
+        for stage in perf.STAGES:
+            stats = perf.stats(stage)
+            if stats is None:
+                lines.append(f"{stage:<9}{'-':>8}{'-':>8}{'-':>8}{0:>5}")
+            else:
+                lines.append(f"{stage:<9}{stats['last'] * 1000:>8.1f}{stats['median'] * 1000:>8.1f}"
+                             f"{stats['p95'] * 1000:>8.1f}{stats['count']:>5}")
+        cache = self.page_cache
+        lines.append(f"cache hits {cache.hit_rate():.0%}, {len(cache)} pixmaps, "
+                     f"{cache.total_bytes / 1048576:.1f} / {cache.max_bytes / 1048576:.0f} MB")
+        self.setText('\n'.join(lines))
+        self.adjustSize()
+        viewport = self.view.viewport().geometry()
+        self.move(viewport.left() + self.MARGIN, viewport.top() + self.MARGIN)
+        self.raise_()
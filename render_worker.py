@@ -0,0 +1,163 @@
+"""
+Background page rendering on a pool of worker processes.
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from PyQt5.QtCore import QObject, Qt, pyqtSignal
+from PyQt5.QtGui import QImage, QPixmap
+
+import page_render
+import perf
+
+# QImage formats matching the sample layout of fitz pixmaps, by component count
+IMAGE_FORMATS = {1: QImage.Format_Grayscale8, 3: QImage.Format_RGB888}
+
+
+def pixmap_from_samples(width, height, stride, components, samples):
+    """
+    Turn rendered samples (bytes or a memoryview) into a QPixmap with a
+    single copy and no pixel conversion. A QImage over samples only borrows
+    the buffer, so it is copied once into memory Qt owns; the pixmap keeps
+    that format instead of expanding it to 32 bits per pixel.
+    """
+    image = QImage(samples, width, height, stride, IMAGE_FORMATS[components]).copy()
+    return QPixmap.fromImage(image, Qt.NoFormatConversion)
+
+
+class RenderPool(QObject):
+    """
+    Renders pages off the GUI thread and delivers them as QPixmaps.
+
+    Jobs run in separate processes, each holding its own fitz document, and
+    finished samples are handed back to the GUI thread through a queued Qt
+    signal before being converted to a QPixmap.
+    """
+
+    page_ready = pyqtSignal(object, object)  # cache key, QPixmap of a page or tile
+    task_done = pyqtSignal(str, object)  # task name, result of run_task (None if it failed)
+
+    # Emitted from the executor's callback thread; Qt queues it onto the
+    # thread that owns the pool
+    _job_done = pyqtSignal(int, object, object)  # generation, cache key, future
+    _task_finished = pyqtSignal(str, object)  # task name, future
+
+    def __init__(self, max_workers=None, parent=None):
+        super().__init__(parent)
+        self.max_workers = max_workers or max(1, min(4, (os.cpu_count() or 2) - 1))
+        self.path = None
+        self.gray = False  # Render 8-bit grayscale instead of RGB
+        self._executor = None
+        self._pending = {}  # cache key -> future
+        self._generation = 0
+        self._closed = False
+        self._job_done.connect(self._on_job_done)
+        self._task_finished.connect(self._on_task_finished)
+
+    def set_document(self, path):
+        """Point the pool at a new PDF, dropping jobs for the previous one."""
+        self.cancel_pending()
+        self.path = path
+
+    def request(self, key, page_index, zoom_factor, rotation, clip=None):
+        """
+        Queue a page render unless the same key is already in flight.
+        Pass a page-space clip rectangle to render a single tile.
+        """
+        if self.path is None or key in self._pending:
+            return
+        future = self._submit(page_render.worker_render, self.path, page_index, zoom_factor, rotation,
+                              clip, self.gray)
+        if future is None:
+            return
+        self._pending[key] = future
+        generation = self._generation
+        future.add_done_callback(
+            lambda f, key=key, generation=generation: self._emit('_job_done', generation, key, f))
+
+    def run_task(self, name, function, *args):
+        """
+        Run a picklable module-level function in a worker process, for work
+        that needs its own fitz document. task_done delivers the result.
+        """
+        future = self._submit(function, *args)
+        if future is not None:
+            future.add_done_callback(lambda f, name=name: self._emit('_task_finished', name, f))
+
+    def _submit(self, function, *args):
+        if self._closed:
+            return None
+        if self._executor is None:
+            # Spawn rather than fork so workers never inherit Qt's threads
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"))
+        try:
+            return self._executor.submit(function, *args)
+        except BrokenProcessPool as e:
+            # A worker crashed (e.g. on a malformed page); start fresh next time
+            print(f"Render pool stopped: {e}")
+            self._executor = None
+            return None
+
+    def is_pending(self, key):
+        return key in self._pending
+
+    def retain(self, keys):
+        """Cancel queued jobs whose keys are not in keys."""
+        for key in [k for k in self._pending if k not in keys]:
+            self._pending.pop(key).cancel()
+
+    def cancel_pending(self):
+        """Cancel every queued job and ignore results of running ones."""
+        self._generation += 1
+        pending, self._pending = self._pending, {}
+        for future in pending.values():
+            future.cancel()
+
+    def shutdown(self):
+        """Stop for good: cancel queued jobs and drop the results of running ones."""
+        self._closed = True
+        self.cancel_pending()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _emit(self, signal, *args):
+        # Done-callbacks run on the executor's thread, and a job that was
+        # already running at shutdown finishes after the viewer has gone
+        if self._closed:
+            return
+        try:
+            getattr(self, signal).emit(*args)
+        except RuntimeError:
+            pass  # The pool was deleted in the meantime
+
+    def _on_job_done(self, generation, key, future):
+        if self._pending.get(key) is future:
+            del self._pending[key]
+        if generation != self._generation or future.cancelled():
+            return
+        try:
+            samples, timings = future.result()
+        except Exception as e:
+            print(f"Error rendering page in background: {e}")
+            return
+        page = key[0] + 1
+        for stage, seconds in timings.items():
+            perf.record(stage, seconds, page=page, zoom=key[1], worker=True)
+        with perf.measure('convert', page=page, zoom=key[1]):
+            pixmap = pixmap_from_samples(*samples)
+        self.page_ready.emit(key, pixmap)
+
+    def _on_task_finished(self, name, future):
+        if future.cancelled():
+            return
+        try:
+            result = future.result()
+        except Exception as e:
+            print(f"Error running {name} in background: {e}")
+            result = None
+        self.task_done.emit(name, result)
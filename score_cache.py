@@ -0,0 +1,198 @@
+"""
+Persistent on-disk cache of data extracted from scores.
+
+Entries are keyed by the score's absolute path, size and modification time,
+so re-exporting or replacing a file invalidates its entries automatically.
+Payloads are pickled and zlib-compressed. The cache directory is capped in
+size and evicts the least recently used entries first; files other modules
+keep in subdirectories of it (the thumbnail store) count towards the cap
+and are evicted with the rest. A process walks the directory once to learn
+its size and after that only adds up what it writes, so the directory is
+walked again only when it has to be pruned.
+
+Usage:
+    python score_cache.py stats
+    python score_cache.py prune [--max-size 128M]
+    python score_cache.py clear
+"""
+import argparse
+import hashlib
+import os
+import pickle
+import sys
+import tempfile
+import zlib
+
+CACHE_FORMAT = 1  # Bump to invalidate every existing entry
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+ENTRY_SUFFIX = '.cache'
+
+_sizes = {}  # Cache directory -> its size in bytes as far as this process knows
+
+
+def cache_dir():
+    """Directory holding the cache entries (MRVIEWER_CACHE_DIR overrides it)."""
+    directory = os.environ.get('MRVIEWER_CACHE_DIR')
+    if not directory:
+        base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+        directory = os.path.join(base, 'mrviewer', 'scores')
+    return directory
+
+
+def entry_key(path, kind, stat=None):
+    """
+    Cache key for one kind of data extracted from the score at path, as it
+    is now or as it was when os.stat returned stat.
+    """
+    st = stat or os.stat(path)
+    identity = f"{os.path.abspath(path)}\0{st.st_size}\0{st.st_mtime_ns}\0{kind}\0{CACHE_FORMAT}"
+    return hashlib.sha1(identity.encode('utf-8')).hexdigest()
+
+
+def _entry_path(path, kind, stat=None):
+    return os.path.join(cache_dir(), entry_key(path, kind, stat) + ENTRY_SUFFIX)
+
+
+def load(path, kind, stat=None):
+    """
+    Return the cached payload of this kind for the score at path, or None.
+    With stat (an os.stat result), return the payload of the version of the
+    file it describes, e.g. one that has been overwritten since.
+    """
+    try:
+        entry_path = _entry_path(path, kind, stat)
+        with open(entry_path, 'rb') as f:
+            payload = pickle.loads(zlib.decompress(f.read()))
+        # The modification time of an entry doubles as its last-used time
+        os.utime(entry_path)
+        return payload
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"Ignoring unreadable score cache entry for {path}: {e}")
+        return None
+
+
+def store(path, kind, payload, max_bytes=DEFAULT_MAX_BYTES):
+    """Cache a payload for the score at path, trimming the cache to max_bytes if it grew past it."""
+    try:
+        entry_path = _entry_path(path, kind)
+        data = zlib.compress(pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL))
+        os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+        # Write to a temporary file first so readers never see half an entry
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(entry_path), suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, entry_path)
+    except OSError as e:
+        print(f"Could not write score cache entry for {path}: {e}")
+        return
+    count_written(len(data), max_bytes)
+
+
+def count_written(size, max_bytes=DEFAULT_MAX_BYTES):
+    """
+    Add a file of size bytes just written to the cache directory to its
+    size, and prune the cache if that takes it over max_bytes.
+    """
+    directory = cache_dir()
+    if directory in _sizes:
+        # Overwritten entries are counted twice; that only prunes a little early
+        _sizes[directory] += size
+    else:
+        _sizes[directory] = sum(entry_size for _, entry_size, _ in entries())
+    if _sizes[directory] > max_bytes:
+        prune(max_bytes)
+
+
+def entries():
+    """
+    List cache entries as (file path, size in bytes, last used time),
+    including the files in subdirectories, such as stored thumbnails.
+    """
+    result = []
+    for directory, _, names in os.walk(cache_dir()):
+        for name in names:
+            if name.endswith('.tmp'):
+                continue  # Still being written
+            entry_path = os.path.join(directory, name)
+            try:
+                st = os.stat(entry_path)
+            except FileNotFoundError:
+                continue
+            result.append((entry_path, st.st_size, st.st_mtime))
+    return result
+
+
+def prune(max_bytes=DEFAULT_MAX_BYTES):
+    """
+    Delete least recently used entries until the cache fits in max_bytes.
+    Returns (entries removed, bytes freed).
+    """
+    all_entries = sorted(entries(), key=lambda entry: entry[2])
+    total = sum(size for _, size, _ in all_entries)
+    removed = 0
+    freed = 0
+    for entry_path, size, _ in all_entries:
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(entry_path)
+            _remove_empty_dirs(os.path.dirname(entry_path))
+        except FileNotFoundError:
+            pass
+        total -= size
+        removed += 1
+        freed += size
+    _sizes[cache_dir()] = total
+    return removed, freed
+
+
+def _remove_empty_dirs(directory):
+    """Remove directory and its parents up to the cache directory while they are empty."""
+    root = os.path.abspath(cache_dir())
+    directory = os.path.abspath(directory)
+    while directory != root and directory.startswith(root + os.sep):
+        try:
+            os.rmdir(directory)
+        except OSError:
+            return  # Not empty, or already gone
+        directory = os.path.dirname(directory)
+
+
+def clear():
+    """Delete every cache entry."""
+    return prune(0)
+
+
+def parse_size(text):
+    """Parse a byte count such as 512K, 128M or 2G."""
+    units = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+    text = text.strip().upper().rstrip('B')
+    if text and text[-1] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(text)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage the MusicXML score cache.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('stats', help="show cache location and size")
+    prune_parser = subparsers.add_parser('prune', help="evict least recently used entries")
+    prune_parser.add_argument('--max-size', type=parse_size, default=DEFAULT_MAX_BYTES,
+                              help="size to trim the cache to, e.g. 128M (default: 256M)")
+    subparsers.add_parser('clear', help="delete every entry")
+    args = parser.parse_args(argv)
+
+    if args.command == 'stats':
+        all_entries = entries()
+        total = sum(size for _, size, _ in all_entries)
+        print(f"{cache_dir()}: {len(all_entries)} entries, {total / 1048576:.1f} MB")
+    else:
+        removed, freed = clear() if args.command == 'clear' else prune(args.max_size)
+        print(f"Removed {removed} entries, freed {freed / 1048576:.1f} MB")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,143 @@
+"""
+What changed when a score's PDF or MusicXML file is written again.
+
+PDF pages are compared by hashes of what they draw: their content streams,
+the form XObjects, images and fonts they use, their size and rotation.
+Pages whose hash is unchanged keep their rendered pixmaps.
+
+MusicXML files are compared by hashes of the bytes of their header (up to
+the first <part>), of every part and of every measure, located with the
+byte-offset index of score_tree. Only the parts whose hash changed have to
+be read again. The functions here run in render worker processes.
+"""
+import hashlib
+import os
+
+import fitz  # PyMuPDF
+
+import measure_map
+import musicxml_reader
+import score_cache
+
+
+def page_hashes(path):
+    """Hash of the drawing of every page of a PDF, in page order."""
+    resources = {}  # xref -> digest of a resource shared between pages
+
+    def resource_digest(xref, read):
+        digest = resources.get(xref)
+        if digest is None:
+            digest = resources[xref] = hashlib.sha1(read(xref) or b'').digest()
+        return digest
+
+    hashes = []
+    with fitz.open(path) as document:
+        for page in document:
+            digest = hashlib.sha1(page.read_contents())
+            digest.update(repr((tuple(page.rect), page.rotation)).encode('ascii'))
+            for xref, *_ in page.get_xobjects():
+                digest.update(resource_digest(xref, document.xref_stream))
+            for image in page.get_images():
+                digest.update(resource_digest(image[0], document.xref_stream_raw))
+            for font in page.get_fonts():
+                digest.update(resource_digest(font[0], lambda xref: document.extract_font(xref)[3]))
+            hashes.append(digest.hexdigest())
+    return hashes
+
+
+def changed_pages(old_hashes, new_hashes):
+    """Indices of the pages that are new or draw something else, and of those that are gone."""
+    changed = [index for index, digest in enumerate(new_hashes)
+               if index >= len(old_hashes) or old_hashes[index] != digest]
+    return changed, list(range(len(new_hashes), len(old_hashes)))
+
+
+def index_score(path):
+    """
+    score_tree index of a MusicXML file and its fingerprint: a dict with
+    'stat' (the os.stat result of the file read), 'header' (hash of the
+    bytes before the first part) and 'parts' (part id -> (hash of the part,
+    list of the hashes of its measures)).
+    """
+    import score_tree
+    from xml_view import XmlSource
+
+    stat = os.stat(path)
+    source = XmlSource(path)
+    try:
+        data = source.data
+        structure = score_tree.index_structure(data)
+        first = structure[0]['start'] if structure else len(data)
+        parts = {}
+        for part in structure:
+            measures = [hashlib.sha1(data[start:end]).digest()
+                        for start, end in zip(part['starts'].tolist(), part['ends'].tolist())]
+            parts[part['id']] = (hashlib.sha1(data[part['start']:part['end']]).digest(), measures)
+        fingerprint = {'stat': stat, 'header': hashlib.sha1(data[:first]).digest(), 'parts': parts}
+    finally:
+        source.close()
+    return structure, fingerprint
+
+
+def compare_scores(old, new):
+    """
+    Differences between two fingerprints from index_score, as a dict with
+    'header' (whether it changed), 'parts' (ids of the parts added or
+    changed, in score order), 'removed' (ids of the parts gone) and
+    'measures' (part id -> indices of the measures added or changed).
+    """
+    changed_parts = []
+    measures = {}
+    for part_id, (digest, measure_digests) in new['parts'].items():
+        previous = old['parts'].get(part_id)
+        if previous is not None and previous[0] == digest:
+            continue
+        changed_parts.append(part_id)
+        old_measures = previous[1] if previous is not None else []
+        measures[part_id] = [index for index, measure in enumerate(measure_digests)
+                             if index >= len(old_measures) or old_measures[index] != measure]
+    return {'header': old['header'] != new['header'], 'parts': changed_parts,
+            'removed': [part_id for part_id in old['parts'] if part_id not in new['parts']],
+            'measures': measures}
+
+
+def reload_score(path, fingerprint, summary, pdf_path=None):
+    """
+    Bring what the viewer knows of a rewritten MusicXML file up to date,
+    given the fingerprint and summary of its previous version. Returns
+    (summary, structure, fingerprint, changes), changes as from
+    compare_scores.
+
+    The summary is only read again if the header or the part list changed;
+    otherwise the new measure counts come from the index. A cached note
+    table of the previous version has only its changed parts extracted
+    again, and a saved measure map is kept if neither the header, the first
+    part nor the PDF (pdf_path) changed.
+    """
+    structure, new_fingerprint = index_score(path)
+    changes = compare_scores(fingerprint, new_fingerprint)
+    old_stat = fingerprint['stat']
+
+    if changes['header'] or changes['removed'] or len(structure) != len(fingerprint['parts']):
+        summary = musicxml_reader.read_summary(path)
+    else:
+        part_measures = {part['id']: len(part['starts']) for part in structure}
+        summary = dict(summary, part_measures=part_measures,
+                       measures=len(structure[0]['starts']) if structure else 0)
+    score_cache.store(path, 'summary', summary)
+    score_cache.store(path, 'structure', structure)
+    score_cache.store(path, 'fingerprint', new_fingerprint)
+
+    table = score_cache.load(path, 'note-table', stat=old_stat)
+    if table is not None:
+        from note_table import update_note_table
+
+        score_cache.store(path, 'note-table', update_note_table(table, path, structure, set(changes['parts'])))
+
+    if (pdf_path is not None and not changes['header'] and structure
+            and structure[0]['id'] not in changes['parts']):
+        # Measures are placed by the part list and the first part's layout, which are as before
+        old_map = measure_map.load(pdf_path, path, old_stat)
+        if old_map is not None:
+            measure_map.save(pdf_path, path, old_map)
+    return summary, structure, new_fingerprint, changes
@@ -0,0 +1,110 @@
+"""
+Score following: a clock playing back a Timeline and the cursor showing it.
+
+The cursor is a pair of graphics items laid over the page (a translucent
+box on the current measure and a line at the current position), so it can
+move sixty times a second without the page underneath being redrawn.
+"""
+import time
+
+from PyQt5.QtCore import QObject, Qt, QTimer, pyqtSignal
+from PyQt5.QtGui import QBrush, QColor, QPen
+from PyQt5.QtWidgets import QGraphicsLineItem, QGraphicsRectItem
+
+
+class ScoreFollower(QObject):
+    """
+    Plays a Timeline against a clock, reporting the measure being played
+    and how far into it the clock is at about 60 frames per second.
+
+    The clock is time.perf_counter by default, scaled by speed. To follow
+    an external clock instead (a MIDI clock, a player's position), call
+    sync() with its score time whenever it reports one; the follower
+    carries on from there between reports.
+    """
+
+    position_changed = pyqtSignal(int, float)  # Measure index, fraction of the measure played
+    finished = pyqtSignal()
+
+    FRAME_INTERVAL = 16  # Milliseconds between cursor updates
+
+    def __init__(self, timeline, clock=time.perf_counter, parent=None):
+        super().__init__(parent)
+        self.timeline = timeline
+        self.clock = clock
+        self.speed = 1.0  # Score seconds per clock second
+        self._origin = None  # Clock reading at score time zero, while running
+        self._stopped_at = 0.0  # Score time while stopped
+        self.timer = QTimer(self)
+        self.timer.setTimerType(Qt.PreciseTimer)
+        self.timer.setInterval(self.FRAME_INTERVAL)
+        self.timer.timeout.connect(self.tick)
+
+    def position(self):
+        """Current score time in seconds."""
+        if self._origin is None:
+            return self._stopped_at
+        return (self.clock() - self._origin) * self.speed
+
+    def is_running(self):
+        return self._origin is not None
+
+    def start(self):
+        if self._stopped_at >= self.timeline.duration:
+            self._stopped_at = 0.0  # Start over after the end
+        self._origin = self.clock() - self._stopped_at / self.speed
+        self.timer.start()
+        self.tick()
+
+    def stop(self):
+        self._stopped_at = self.position()
+        self._origin = None
+        self.timer.stop()
+
+    def seek(self, seconds):
+        """Continue from a score time, running or not."""
+        seconds = min(max(seconds, 0.0), self.timeline.duration)
+        if self._origin is None:
+            self._stopped_at = seconds
+        else:
+            self._origin = self.clock() - seconds / self.speed
+        self.tick()
+
+    def seek_measure(self, index):
+        self.seek(self.timeline.starts[index])
+
+    def sync(self, seconds):
+        """Align with an external clock that is at score time seconds now."""
+        self.seek(seconds)
+
+    def tick(self):
+        seconds = self.position()
+        if seconds >= self.timeline.duration and self.is_running():
+            self.stop()
+            self.finished.emit()
+            return
+        location = self.timeline.locate(seconds)
+        if location is not None:
+            self.position_changed.emit(*location)
+
+
+class FollowCursor(QGraphicsRectItem):
+    """Highlight of the measure being played, with a line at the current position."""
+
+    def __init__(self):
+        super().__init__()
+        self.setBrush(QBrush(QColor(255, 200, 0, 60)))
+        self.setPen(QPen(Qt.NoPen))
+        self.setZValue(10)  # Above page pixmaps, previews and tiles
+        self.line = QGraphicsLineItem(self)
+        pen = QPen(QColor(220, 60, 0, 200), 2)
+        pen.setCosmetic(True)  # Two pixels wide at any zoom
+        self.line.setPen(pen)
+
+    def show_measure(self, scene_rect, fraction):
+        """Cover scene_rect and put the line fraction of the way across it."""
+        if scene_rect != self.rect():
+            self.setRect(scene_rect)
+        x = scene_rect.left() + fraction * scene_rect.width()
+        self.line.setLine(x, scene_rect.top(), x, scene_rect.bottom())
+        self.show()
@@ -0,0 +1,316 @@
+"""
+Inverted index over a NoteTable for questions such as "every B-flat 4 in
+the horns", "the measures where the violins play sixteenth-note runs" or
+"where does this four-note motif occur".
+
+Pitches (MIDI numbers), parts and durations map to posting lists of note
+rows, from which the part, measure and offset of every note follow. Motifs
+are looked up in an index of melodic interval n-grams. The melody of a part
+is its highest note at each onset, so voices and chord notes below the top
+do not break up a line; rests are not part of the table, so a motif may
+span one.
+
+Building the index takes a few vectorized passes over the table, and
+queries only touch their posting lists, so both take milliseconds.
+
+Usage:
+    python score_index.py score.musicxml --pitch Bb4 --part horn
+    python score_index.py score.musicxml --run 16th --part violin
+    python score_index.py score.musicxml --motif "G4 A4 B4 C5"
+"""
+import argparse
+import re
+import sys
+import time
+
+import numpy as np
+
+import score_cache
+from note_table import STEP_NAMES, STEP_SEMITONES, extract_note_table
+
+NGRAM = 3  # Longest interval n-gram in the index; longer motifs are verified note by note
+CACHE_KIND = 'score-index-1'  # Bump the number when the index layout changes
+
+DURATION_NAMES = {'whole': 4.0, 'half': 2.0, 'quarter': 1.0, 'eighth': 0.5, '8th': 0.5,
+                  '16th': 0.25, 'sixteenth': 0.25, '32nd': 0.125, '64th': 0.0625}
+
+_PITCH = re.compile(r'([A-Ga-g])([#b\-♯♭]*)(-?\d+)$')
+_ACCIDENTALS = {'#': 1, '♯': 1, 'b': -1, '-': -1, '♭': -1}
+
+
+def parse_pitch(text):
+    """MIDI note number of a pitch name such as 'C4', 'F#5', 'Bb3' or 'B-3'."""
+    match = _PITCH.match(text.strip())
+    if match is None:
+        raise ValueError(f"Not a pitch: {text!r}")
+    step, accidentals, octave = match.groups()
+    alter = sum(_ACCIDENTALS[accidental] for accidental in accidentals)
+    return (int(octave) + 1) * 12 + STEP_SEMITONES[STEP_NAMES.index(step.upper())] + alter
+
+
+def parse_duration(text):
+    """Length in quarter notes of a duration given as a name ('16th') or a number ('0.25')."""
+    text = text.strip().lower()
+    if text in DURATION_NAMES:
+        return DURATION_NAMES[text]
+    try:
+        return float(text)
+    except ValueError:
+        raise ValueError(f"Not a duration: {text!r}") from None
+
+
+def _postings(keys):
+    """
+    Group positions by key: {key: sorted int64 positions}. The lists are
+    views of one array sorted by key, so they cost no more than the keys.
+    """
+    if len(keys) == 0:
+        return {}
+    order = np.argsort(keys, kind='stable')
+    sorted_keys = keys[order]
+    boundaries = np.flatnonzero(sorted_keys[1:] != sorted_keys[:-1]) + 1
+    starts = np.concatenate(([0], boundaries))
+    stops = np.concatenate((boundaries, [len(order)]))
+    return {sorted_keys[start].item(): order[start:stop] for start, stop in zip(starts, stops)}
+
+
+class ScoreIndex:
+    """
+    Posting lists over the rows of a NoteTable.
+
+    pitch, part and duration map each value to the sorted table rows that
+    have it. The melody of every part (its top note at each onset, grace
+    notes left out) is kept as arrays of table rows and pitches, and
+    intervals maps every run of 1 to NGRAM consecutive intervals (in
+    semitones, as a tuple) to the melody positions where it starts.
+    """
+
+    def __init__(self, table):
+        self.table = table
+        self.pitch = _postings(table.pitch)
+        self.part = _postings(table.part)
+        self.duration = _postings(table.duration)
+        self._build_melody()
+        self.intervals = self._interval_ngrams()
+
+    def __repr__(self):
+        return (f"ScoreIndex({len(self.table)} notes, {len(self.pitch)} pitches, "
+                f"{len(self.melody_rows)} melody notes, {len(self.intervals)} interval n-grams)")
+
+    def _build_melody(self):
+        table = self.table
+        if table.event_count() == 0:
+            self.melody_rows = np.zeros(0, dtype=np.int64)
+            self.melody_pitch = np.zeros(0, dtype=np.int16)
+            self.melody_run = np.zeros(0, dtype=np.int64)
+            return
+        starts = table.event_offsets[:-1]
+        top = np.maximum.reduceat(table.pitch, starts)
+        # Rows run part by part and measure by measure; number those runs so
+        # that voices of one measure sort together by onset
+        changes = (np.diff(table.part) != 0) | (np.diff(table.measure) != 0)
+        run = np.concatenate(([0], np.cumsum(changes)))[starts]
+        offset = table.offset[starts]
+        keep = table.duration[starts] > 0  # Grace notes are ornaments, not melody
+        starts, top, run, offset = starts[keep], top[keep], run[keep], offset[keep]
+
+        order = np.lexsort((-top, offset, run))
+        starts, top, run, offset = starts[order], top[order], run[order], offset[order]
+        # The highest note of every onset is the first of its (run, offset) group
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = (run[1:] != run[:-1]) | (offset[1:] != offset[:-1])
+        self.melody_rows = starts[first]
+        self.melody_pitch = top[first].astype(np.int16)
+        self.melody_run = run[first]
+
+    def _interval_ngrams(self):
+        part = self.table.part[self.melody_rows]
+        steps = np.diff(self.melody_pitch.astype(np.int64))
+        ngrams = {}
+        for n in range(1, NGRAM + 1):
+            if len(steps) < n:
+                break
+            windows = np.lib.stride_tricks.sliding_window_view(steps, n)
+            # An n-gram must not cross from one part into the next
+            positions = np.flatnonzero(part[:len(windows)] == part[n:])
+            if len(positions) == 0:
+                continue
+            keys, inverse = np.unique(windows[positions], axis=0, return_inverse=True)
+            for key, group in _postings(inverse.ravel()).items():
+                ngrams[tuple(keys[key].tolist())] = positions[group]
+        return ngrams
+
+    def part_indices(self, spec):
+        """
+        Indices of the parts matching spec: a 1-based part number, a part id
+        such as 'P3', or a case-insensitive piece of a part name ('horn').
+        """
+        table = self.table
+        if spec.isdigit() and 1 <= int(spec) <= len(table.part_ids):
+            return [int(spec) - 1]
+        if spec in table.part_ids:
+            return [table.part_ids.index(spec)]
+        spec = spec.lower()
+        return [index for index, name in enumerate(table.part_names) if spec in name.lower()]
+
+    def notes(self, pitch=None, parts=None, duration=None):
+        """
+        Sorted table rows of the notes with the given MIDI pitch, in any of
+        the given part indices and with the given duration in quarter notes.
+        Criteria left as None match everything.
+        """
+        empty = np.zeros(0, dtype=np.int64)
+        postings = []
+        if pitch is not None:
+            postings.append(self.pitch.get(pitch, empty))
+        if duration is not None:
+            # Triplet durations such as 1/3 are not exact in binary
+            keys = [key for key in self.duration if np.isclose(key, duration)]
+            postings.append(self.duration[keys[0]] if keys else empty)
+        if parts is not None:
+            postings.append(np.sort(np.concatenate([empty] + [self.part.get(part, empty) for part in parts])))
+        if not postings:
+            return np.arange(len(self.table))
+        # Intersect the shortest lists first
+        postings.sort(key=len)
+        rows = postings[0]
+        for other in postings[1:]:
+            rows = np.intersect1d(rows, other, assume_unique=True)
+        return rows
+
+    def find_motif(self, pitches, parts=None, transpose=True):
+        """
+        Table rows of the first notes of every occurrence of a motif given
+        as MIDI pitches. Occurrences at any transposition match unless
+        transpose is False.
+        """
+        if len(pitches) < 2:
+            raise ValueError("A motif needs at least two notes")
+        steps = tuple(int(b) - int(a) for a, b in zip(pitches, pitches[1:]))
+        positions = self.intervals.get(steps[:NGRAM], np.zeros(0, dtype=np.int64))
+        if len(steps) > NGRAM:
+            # Check the intervals beyond the indexed n-gram note by note
+            positions = positions[positions + len(steps) < len(self.melody_pitch)]
+            melody = self.melody_pitch.astype(np.int64)
+            part = self.table.part[self.melody_rows]
+            for i in range(NGRAM, len(steps)):
+                following = positions + i + 1
+                positions = positions[(melody[following] - melody[following - 1] == steps[i])
+                                      & (part[following] == part[positions])]
+        rows = self.melody_rows[positions]
+        if not transpose:
+            rows = rows[self.table.pitch[rows] == pitches[0]]
+        if parts is not None:
+            rows = rows[np.isin(self.table.part[rows], parts)]
+        return np.sort(rows)
+
+    def runs(self, duration, min_length=4, parts=None):
+        """
+        Runs of at least min_length melody notes of the given duration that
+        follow each other without a gap (across barlines too). Returns a
+        list of (first table row, number of notes).
+        """
+        table = self.table
+        rows = self.melody_rows
+        if len(rows) < 2:
+            return []
+        part = table.part[rows]
+        offset = table.offset[rows]
+        length = table.duration[rows]
+        run = self.melody_run
+        matches = np.isclose(length, duration)
+        # Notes join up when the next one starts where this one ends, or
+        # opens the next measure of the same part
+        joined = (part[1:] == part[:-1]) & (
+            ((run[1:] == run[:-1]) & np.isclose(offset[1:], offset[:-1] + length[:-1]))
+            | ((run[1:] == run[:-1] + 1) & (offset[1:] == 0)))
+        linked = np.concatenate((matches[:-1] & matches[1:] & joined, [False]))
+        # Runs are stretches of linked notes: find where they start and stop
+        edges = np.diff(np.concatenate(([0], linked.astype(np.int8), [0])))
+        starts = np.flatnonzero(edges == 1)
+        stops = np.flatnonzero(edges == -1) + 1  # Include the last note of the run
+        found = []
+        for start, stop in zip(starts.tolist(), stops.tolist()):
+            if stop - start >= min_length and (parts is None or int(part[start]) in parts):
+                found.append((int(rows[start]), stop - start))
+        return found
+
+    def locations(self, rows):
+        """(part name, measure, offset, pitch name) of the given table rows."""
+        table = self.table
+        names = table.pitch_names(rows)
+        return [(table.part_names[int(table.part[row])], int(table.measure[row]),
+                 float(table.offset[row]), name) for row, name in zip(rows, names)]
+
+
+def load_index(path):
+    """ScoreIndex of the score at path, from the score cache if it was built before."""
+    index = score_cache.load(path, CACHE_KIND)
+    if index is None:
+        table = score_cache.load(path, 'note-table')
+        if table is None:
+            table = extract_note_table(path)
+            score_cache.store(path, 'note-table', table)
+        index = ScoreIndex(table)
+        score_cache.store(path, CACHE_KIND, index)
+    return index
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Find pitches, rhythms and motifs in a MusicXML score.")
+    parser.add_argument('score', help="MusicXML (.xml, .musicxml or .mxl) file")
+    parser.add_argument('--part', help="part number, id or part of a name, e.g. 'horn'")
+    parser.add_argument('--pitch', help="notes of this pitch, e.g. Bb4 or F#5")
+    parser.add_argument('--duration', help="notes of this duration, e.g. 16th, quarter or 0.75")
+    parser.add_argument('--run', metavar='DURATION', help="runs of notes of this duration, e.g. 16th")
+    parser.add_argument('--min-length', type=int, default=4, help="shortest run to report (default: 4)")
+    parser.add_argument('--motif', help="pitches of a motif, e.g. 'G4 A4 B4 C5'")
+    parser.add_argument('--exact', action='store_true', help="match the motif only at its written pitch")
+    parser.add_argument('--limit', type=int, default=50, help="matches to list (default: 50, 0 for all)")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    index = load_index(args.score)
+    loaded = time.perf_counter()
+
+    try:
+        parts = None
+        if args.part:
+            parts = index.part_indices(args.part)
+            if not parts:
+                parser.error(f"No part matches {args.part!r}; parts are: {', '.join(index.table.part_names)}")
+        if args.run:
+            found = index.runs(parse_duration(args.run), args.min_length, parts)
+            rows = [row for row, _ in found]
+            lengths = [length for _, length in found]
+        elif args.motif:
+            rows = index.find_motif([parse_pitch(name) for name in args.motif.replace(',', ' ').split()],
+                                    parts, transpose=not args.exact)
+            lengths = None
+        else:
+            rows = index.notes(parse_pitch(args.pitch) if args.pitch else None, parts,
+                               parse_duration(args.duration) if args.duration else None)
+            lengths = None
+    except ValueError as e:
+        parser.error(str(e))
+    answered = time.perf_counter()
+
+    shown = rows if args.limit == 0 else rows[:args.limit]
+    for i, (part_name, measure, offset, pitch) in enumerate(index.locations(shown)):
+        extra = f"  {lengths[i]} notes" if lengths else ''
+        print(f"{part_name:<20} measure {measure:>4}  offset {offset:<7g} {pitch:<5}{extra}")
+    if len(shown) < len(rows):
+        print(f"... {len(rows) - len(shown)} more")
+    table = index.table
+    measures = len(set(zip(table.part[rows].tolist(), table.measure[rows].tolist())))
+    print(f"{len(rows)} matches in {measures} measures of a part; "
+          f"index ready in {(loaded - start) * 1000:.0f} ms, query took {(answered - loaded) * 1000:.1f} ms")
+    return 0
+
+
+if __name__ == '__main__':
+    # Run from the importable module, so that cached indexes are pickled as
+    # score_index.ScoreIndex rather than __main__.ScoreIndex
+    import score_index
+
+    sys.exit(score_index.main())
@@ -0,0 +1,151 @@
+"""
+Playback timeline of a score: when each measure starts, in seconds.
+
+Measure lengths come from the note, backup and forward durations of the
+first part (divided by its divisions per quarter note), or from the time
+signature for measures without notes. Tempo comes from <sound tempo>,
+or from <metronome> marks without one, and may change within a measure;
+scores without either are played at 120 quarter notes per minute, the
+MusicXML default. Repeats are not unfolded: measures play in written order.
+"""
+import xml.etree.ElementTree as ET
+from bisect import bisect_right
+
+import musicxml_reader
+import score_cache
+
+CACHE_KIND = 'timeline-1'  # Bump the number when the Timeline layout changes
+DEFAULT_TEMPO = 120.0  # Quarter notes per minute
+
+# Length in quarter notes of the beat units of <metronome> marks
+BEAT_UNITS = {'whole': 4.0, 'half': 2.0, 'quarter': 1.0, 'eighth': 0.5,
+              '16th': 0.25, '32nd': 0.125}
+
+
+class Timeline:
+    """Start and length in seconds of every measure, in score order."""
+
+    def __init__(self, measures):
+        # (measure number, start, length) in score order
+        self.numbers = [number for number, _, _ in measures]
+        self.starts = [start for _, start, _ in measures]
+        self.lengths = [length for _, _, length in measures]
+
+    def __len__(self):
+        return len(self.numbers)
+
+    def __repr__(self):
+        return f"Timeline({len(self)} measures, {self.duration:.1f} s)"
+
+    @property
+    def duration(self):
+        return self.starts[-1] + self.lengths[-1] if self.starts else 0.0
+
+    def locate(self, seconds):
+        """(measure index, fraction of the measure played) at a time, clamped to the score."""
+        if not self.starts:
+            return None
+        index = max(bisect_right(self.starts, seconds) - 1, 0)
+        length = self.lengths[index]
+        fraction = (seconds - self.starts[index]) / length if length > 0 else 0.0
+        return index, min(max(fraction, 0.0), 1.0)
+
+
+def _metronome_tempo(metronome):
+    """Quarter notes per minute of a <metronome> mark, or None for marks like 'quarter = half'."""
+    unit = BEAT_UNITS.get(metronome.findtext('beat-unit'))
+    per_minute = metronome.findtext('per-minute')
+    if unit is None or not per_minute:
+        return None
+    try:
+        rate = float(per_minute)
+    except ValueError:
+        return None  # Text such as "c. 120"
+    if metronome.find('beat-unit-dot') is not None:
+        unit *= 1.5
+    return rate * unit
+
+
+def _direction_tempo(direction):
+    sound = direction.find('sound')
+    if sound is not None and sound.get('tempo'):
+        return float(sound.get('tempo'))
+    metronome = direction.find('direction-type/metronome')
+    return _metronome_tempo(metronome) if metronome is not None else None
+
+
+def _measure_seconds(changes, length, tempo):
+    """
+    Seconds a measure of length quarter notes lasts when it starts at tempo
+    and changes tempo at the (position, tempo) pairs of changes.
+    """
+    seconds = 0.0
+    position = 0.0
+    for change_position, change_tempo in sorted(changes):
+        change_position = min(max(change_position, 0.0), length)
+        seconds += (change_position - position) * 60.0 / tempo
+        position, tempo = change_position, change_tempo
+    return seconds + (length - position) * 60.0 / tempo, tempo
+
+
+def build_timeline(path):
+    """Timeline of the MusicXML (or compressed .mxl) score at path."""
+    measures = []
+    divisions = 1.0
+    time_signature = 4.0  # Length of a full measure in quarter notes
+    tempo = DEFAULT_TEMPO
+    start = 0.0
+    depth = 0
+    with musicxml_reader.open_musicxml(path) as f:
+        for event, elem in ET.iterparse(f, events=('start', 'end')):
+            if event == 'start':
+                depth += 1
+                continue
+            depth -= 1
+            if elem.tag == 'measure':
+                position = 0.0  # In divisions from the start of the measure
+                end = 0.0
+                changes = []  # (position in quarter notes, tempo)
+                for child in elem:
+                    tag = child.tag
+                    if tag == 'attributes':
+                        if child.findtext('divisions'):
+                            divisions = float(child.findtext('divisions'))
+                        beats = child.findtext('time/beats')
+                        beat_type = child.findtext('time/beat-type')
+                        if beats and beat_type:
+                            try:
+                                # Compound signatures such as 3+2/8
+                                time_signature = sum(float(b) for b in beats.split('+')) * 4.0 / float(beat_type)
+                            except ValueError:
+                                pass
+                    elif tag == 'note':
+                        if child.find('chord') is None and child.find('grace') is None:
+                            position += float(child.findtext('duration') or 0)
+                    elif tag == 'backup':
+                        position -= float(child.findtext('duration') or 0)
+                    elif tag == 'forward':
+                        position += float(child.findtext('duration') or 0)
+                    elif tag in ('direction', 'sound'):
+                        change = _direction_tempo(child) if tag == 'direction' else (
+                            float(child.get('tempo')) if child.get('tempo') else None)
+                        if change:
+                            changes.append((position / divisions, change))
+                    end = max(end, position)
+                length = end / divisions if end > 0 else time_signature
+                seconds, tempo = _measure_seconds(changes, length, tempo)
+                measures.append((elem.get('number', ''), start, seconds))
+                start += seconds
+                elem.clear()
+            elif elem.tag == 'part' and depth == 1:
+                break  # Every part has the same measures
+    return Timeline(measures)
+
+
+def load_timeline(path):
+    """Timeline of the score at path, from the score cache if it was built before."""
+    timeline = score_cache.load(path, CACHE_KIND)
+    if timeline is None:
+        timeline = build_timeline(path)
+        score_cache.store(path, CACHE_KIND, timeline)
+    return timeline
@@ -0,0 +1,286 @@
+"""
+Lazily populated tree model of a MusicXML score: parts, measures and notes.
+
+The structure comes from a byte-offset index of every <part> and <measure>
+element, found with one regular expression pass over the memory-mapped
+file. Measures are only parsed when their row is shown, and rows are only
+created when their parent is expanded (canFetchMore/fetchMore), so a large
+score costs memory only for what has been looked at.
+"""
+import re
+
+import numpy as np
+from PyQt5.QtCore import QAbstractItemModel, QModelIndex, Qt
+
+from note_table import extract_measure
+from xml_view import XmlSource
+
+_STRUCTURE_TAGS = re.compile(rb'<(/?)(part|measure|divisions)(?=[\s/>])([^>]*)>')
+_ID_ATTRIBUTE = re.compile(rb'\bid\s*=\s*(?:"([^"]*)"|\'([^\']*)\')')
+_NUMBER_ATTRIBUTE = re.compile(rb'\bnumber\s*=\s*(?:"([^"]*)"|\'([^\']*)\')')
+_DIVISIONS_TEXT = re.compile(rb'\s*([0-9.]+)')
+
+# Node kinds
+INFO, GROUP, PART, MEASURE, EVENT = range(5)
+
+
+def _attribute(pattern, attributes):
+    match = pattern.search(attributes)
+    if match is None:
+        return ''
+    return (match.group(1) if match.group(1) is not None else match.group(2)).decode('utf-8', 'replace')
+
+
+def index_structure(data):
+    """
+    Byte-offset index of the parts and measures of a partwise score held in
+    a bytes-like object (e.g. an mmap). Returns a list with one dict per
+    <part>: 'id', 'start', 'end', 'numbers' (measure numbers as written),
+    'starts' and 'ends' (int64 byte offsets of each <measure> element) and
+    'divisions' (float64 divisions per quarter note in effect at each
+    measure start).
+    """
+    if re.search(rb'<score-partwise[\s>]', data) is None:
+        raise ValueError("Only partwise MusicXML is supported")
+
+    parts = []
+    part = None
+    measure_start = None
+    divisions = 1.0
+    for match in _STRUCTURE_TAGS.finditer(data):
+        closing, tag, attributes = match.groups()
+        if tag == b'divisions':
+            if not closing:
+                value = _DIVISIONS_TEXT.match(data, match.end())
+                if value is not None:
+                    divisions = float(value.group(1))
+        elif tag == b'part':
+            if closing:
+                if part is not None:
+                    part['end'] = match.end()
+                    parts.append(part)
+                part = None
+            else:
+                part = {'id': _attribute(_ID_ATTRIBUTE, attributes), 'start': match.start(),
+                        'end': match.end(), 'numbers': [], 'starts': [], 'ends': [], 'divisions': []}
+                divisions = 1.0
+        elif part is not None:
+            if closing:
+                if measure_start is not None:
+                    part['ends'].append(match.end())
+                    measure_start = None
+            else:
+                measure_start = match.start()
+                part['numbers'].append(_attribute(_NUMBER_ATTRIBUTE, attributes))
+                part['starts'].append(measure_start)
+                part['divisions'].append(divisions)
+                if attributes.endswith(b'/'):
+                    part['ends'].append(match.end())
+                    measure_start = None
+
+    for part in parts:
+        part['starts'] = np.array(part['starts'], dtype=np.int64)
+        part['ends'] = np.array(part['ends'], dtype=np.int64)
+        part['divisions'] = np.array(part['divisions'], dtype=np.float64)
+    return parts
+
+
+def index_file(path):
+    """index_structure for a .xml, .musicxml or .mxl file."""
+    source = XmlSource(path)
+    try:
+        return index_structure(source.data)
+    finally:
+        source.close()
+
+
+class _Node:
+    __slots__ = ('parent', 'row', 'kind', 'label', 'value', 'tooltip', 'ref', 'children', 'fetched', 'notes')
+
+    def __init__(self, parent, kind, label='', value='', ref=None):
+        self.parent = parent
+        self.row = len(parent.children) if parent is not None else 0
+        self.kind = kind
+        self.label = label
+        self.value = value
+        self.tooltip = None
+        self.ref = ref
+        self.children = []
+        self.fetched = kind in (INFO, GROUP, EVENT)
+        self.notes = None
+
+
+class ScoreTreeModel(QAbstractItemModel):
+    """
+    Title, composer, measure count and parts of a score, with the measures
+    of each part and the notes and chords of each measure loaded on expand.
+    """
+
+    HEADERS = ("Property", "Value")
+
+    def __init__(self, path, summary, parent=None):
+        super().__init__(parent)
+        self.path = path
+        self.parts = {}  # Part id -> structure index entry
+        self.source = None
+        self.root = _Node(None, GROUP)
+        for label, value in (("Title", summary['title']), ("Composer", summary['composer']),
+                             ("Measures", str(summary['measures']))):
+            self.root.children.append(_Node(self.root, INFO, label, value))
+
+        self.parts_node = _Node(self.root, GROUP, "Parts", f"{len(summary['parts'])} part(s)")
+        self.root.children.append(self.parts_node)
+        part_measures = summary.get('part_measures', {})
+        for part in summary['parts']:
+            node = _Node(self.parts_node, PART, part['id'], part['name'], ref=part['id'])
+            node.tooltip = f"{part_measures.get(part['id'], 0)} measures"
+            self.parts_node.children.append(node)
+
+    def set_structure(self, structure):
+        """Attach the index from index_structure, making parts expandable."""
+        self.layoutAboutToBeChanged.emit()
+        self.parts = {part['id']: part for part in structure}
+        self.layoutChanged.emit()
+
+    def close(self):
+        if self.source is not None:
+            self.source.close()
+            self.source = None
+
+    def node(self, index):
+        return index.internalPointer() if index.isValid() else self.root
+
+    def location(self, index):
+        """(part id, measure number or None) of a part, measure or note row, or None."""
+        node = self.node(index)
+        while node is not None and node.kind == EVENT:
+            node = node.parent
+        if node is None or node.kind not in (PART, MEASURE):
+            return None
+        if node.kind == PART:
+            return node.ref, None
+        part_id, measure = node.ref
+        return part_id, self.parts[part_id]['numbers'][measure]
+
+    # Model interface
+
+    def index(self, row, column, parent=QModelIndex()):
+        node = self.node(parent)
+        if not 0 <= row < len(node.children) or not 0 <= column < len(self.HEADERS):
+            return QModelIndex()
+        return self.createIndex(row, column, node.children[row])
+
+    def parent(self, index):
+        if not index.isValid():
+            return QModelIndex()
+        node = index.internalPointer().parent
+        if node is None or node is self.root:
+            return QModelIndex()
+        return self.createIndex(node.row, 0, node)
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.column() > 0:
+            return 0
+        return len(self.node(parent).children)
+
+    def columnCount(self, parent=QModelIndex()):
+        return len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.HEADERS[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        node = index.internalPointer()
+        if role == Qt.DisplayRole:
+            if index.column() == 0:
+                return node.label
+            if node.kind == MEASURE and not node.value:
+                node.value = self._measure_summary(node)
+            return node.value
+        if role == Qt.ToolTipRole:
+            return node.tooltip
+        return None
+
+    def hasChildren(self, parent=QModelIndex()):
+        node = self.node(parent)
+        if node.fetched:
+            return bool(node.children)
+        if node.kind == PART:
+            part = self.parts.get(node.ref)
+            return part is not None and len(part['starts']) > 0
+        return self._measure_notes(node).event_count() > 0
+
+    def canFetchMore(self, parent):
+        node = self.node(parent)
+        if node.fetched:
+            return False
+        return node.kind == MEASURE or node.ref in self.parts
+
+    def fetchMore(self, parent):
+        node = self.node(parent)
+        if node.fetched:
+            return
+        if node.kind == PART:
+            children = self._measure_nodes(node)
+        else:
+            children = self._event_nodes(node)
+        node.fetched = True
+        if children:
+            self.beginInsertRows(parent, 0, len(children) - 1)
+            node.children = children
+            self.endInsertRows()
+
+    # Lazy loading
+
+    def _measure_nodes(self, node):
+        part = self.parts[node.ref]
+        children = []
+        for measure, number in enumerate(part['numbers']):
+            child = _Node(node, MEASURE, f"Measure {number}", ref=(node.ref, measure))
+            child.row = measure
+            children.append(child)
+        return children
+
+    def _measure_notes(self, node):
+        """NoteTable of a measure node, parsed from its bytes on first use."""
+        if node.notes is None:
+            if self.source is None:
+                self.source = XmlSource(self.path)
+            part_id, measure = node.ref
+            part = self.parts[part_id]
+            start, end = int(part['starts'][measure]), int(part['ends'][measure])
+            try:
+                node.notes = extract_measure(self.source.data[start:end], float(part['divisions'][measure]),
+                                             part_id, node.parent.value)
+            except Exception as e:
+                print(f"Error reading measure {node.label} of part {part_id}: {e}")
+                node.notes = extract_measure(b'<measure/>')
+        return node.notes
+
+    def _measure_summary(self, node):
+        notes = self._measure_notes(node)
+        chords = int(np.count_nonzero(notes.chord_sizes() > 1))
+        if len(notes) == 0:
+            return "no notes"
+        summary = f"{len(notes)} note{'s' if len(notes) != 1 else ''}"
+        if chords:
+            summary += f", {chords} chord{'s' if chords != 1 else ''}"
+        return summary
+
+    def _event_nodes(self, node):
+        notes = self._measure_notes(node)
+        children = []
+        for event in range(notes.event_count()):
+            rows = range(notes.event_offsets[event], notes.event_offsets[event + 1])
+            names = notes.pitch_names(rows)
+            first = rows.start
+            kind = "Chord" if len(names) > 1 else "Note"
+            child = _Node(node, EVENT, f"{kind} at {notes.offset[first]:g}",
+                          f"{' '.join(names)} ({notes.duration[first]:g} quarters)")
+            child.row = event
+            children.append(child)
+        return children
@@ -0,0 +1,62 @@
+import os
+
+import fitz  # PyMuPDF
+import pytest
+
+import batch_render
+from conftest import make_pdf
+
+
+@pytest.fixture
+def scores(tmp_path):
+    """A directory of two PDFs, one of them in a subdirectory, next to a file that is not a PDF."""
+    root = tmp_path / 'scores'
+    (root / 'opera').mkdir(parents=True)
+    make_pdf(root / 'a.pdf', 3)
+    make_pdf(root / 'opera' / 'b.PDF', 2)
+    (root / 'notes.txt').write_text('not a score')
+    return root
+
+
+def test_find_pdfs(scores):
+    found = batch_render.find_pdfs([str(scores), str(scores / 'a.pdf')])
+    assert sorted(found) == sorted([(str(scores / 'a.pdf'), str(scores)),
+                                    (str(scores / 'opera' / 'b.PDF'), str(scores)),
+                                    (str(scores / 'a.pdf'), str(scores))])
+
+
+@pytest.mark.parametrize('text, pages', [
+    ('', [0, 1, 2, 3, 4]),
+    ('2', [1]),
+    ('1-2,4', [0, 1, 3]),
+    ('4-', [3, 4]),
+    ('-2', [0, 1]),
+    ('3-9', [2, 3, 4]),
+])
+def test_parse_pages(text, pages):
+    assert list(batch_render.parse_pages(text, 5)) == pages
+
+
+def test_output_path_keeps_the_directory_layout(scores):
+    output = batch_render.output_path('out', str(scores / 'opera' / 'b.PDF'), str(scores), 0, 'png')
+    assert output == os.path.join('out', 'opera', 'b', 'page-0001.png')
+
+
+def test_render_page_file_to_a_width(scores, tmp_path):
+    output = str(tmp_path / 'out' / 'page-0001.png')
+    batch_render.render_page_file(str(scores / 'a.pdf'), 0, output, 1.0, 100, 0, 'png')
+    assert fitz.Pixmap(output).width == 100
+    assert [name for name in os.listdir(tmp_path / 'out')] == ['page-0001.png']
+
+
+def test_main_renders_and_then_skips_what_is_up_to_date(scores, tmp_path, capsys):
+    output = tmp_path / 'out'
+    assert batch_render.main([str(scores), '-o', str(output), '--width', '60', '--workers', '1']) == 0
+    assert 'Rendered 5 pages, skipped 0' in capsys.readouterr().out
+    assert sorted(os.listdir(output / 'a')) == ['page-0001.png', 'page-0002.png', 'page-0003.png']
+    assert sorted(os.listdir(output / 'opera' / 'b')) == ['page-0001.png', 'page-0002.png']
+
+    assert batch_render.main([str(scores), '-o', str(output), '--pages', '1', '--workers', '1']) == 0
+    assert 'Rendered 0 pages, skipped 2' in capsys.readouterr().out
+    assert batch_render.main([str(scores), '-o', str(output), '--pages', '1', '--workers', '1', '--force']) == 0
+    assert 'Rendered 2 pages, skipped 0' in capsys.readouterr().out
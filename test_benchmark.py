@@ -0,0 +1,24 @@
+import benchmark
+from conftest import make_pdf
+
+
+def test_flatten():
+    assert benchmark.flatten({'a': {'b': 1, 'c': {'d': 2}}, 'e': 3}) == {'a/b': 1, 'a/c/d': 2, 'e': 3}
+
+
+def test_compare_flags_slower_times_and_lower_throughputs():
+    baseline = {'scores': {'x1': {'open_ms': 100, 'scroll_pages_per_s': 10, 'peak_rss_mb': 0}}}
+    results = {'scores': {'x1': {'open_ms': 130, 'scroll_pages_per_s': 7, 'peak_rss_mb': 50}}}
+    assert benchmark.compare(results, baseline, 0.2) == ['x1/open_ms', 'x1/scroll_pages_per_s']
+
+
+def test_compare_passes_improvements():
+    baseline = {'scores': {'x1': {'open_ms': 100, 'scroll_pages_per_s': 10}}}
+    results = {'scores': {'x1': {'open_ms': 50, 'scroll_pages_per_s': 20}}}
+    assert benchmark.compare(results, baseline, 0.2) == []
+
+
+def test_bench_viewer_turns_tiled_pages(qapp, tmp_path):
+    results = benchmark.bench_viewer(make_pdf(tmp_path / 'score.pdf', 4), [1, 4.5], 2, 0.0)
+    assert results['page_turn_ms']['4.5']['median'] > 0
+    assert results['scroll_pages_per_s'] > 0
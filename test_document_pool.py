@@ -0,0 +1,61 @@
+import pytest
+
+import document_pool
+from conftest import make_pdf
+from document_pool import DocumentPool
+
+
+@pytest.fixture
+def pdfs(tmp_path):
+    return [make_pdf(tmp_path / f'score{number}.pdf', number + 1) for number in range(3)]
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A monotonic clock that only moves when a test sets clock.now."""
+    class Clock:
+        now = 1000.0
+
+    monkeypatch.setattr(document_pool.time, 'monotonic', lambda: Clock.now)
+    return Clock
+
+
+def test_get_keeps_documents_open(pdfs):
+    pool = DocumentPool()
+    document = pool.get(pdfs[0])
+    assert pool.get(pdfs[0]) is document
+    assert pdfs[0] in pool and pool.is_current(pdfs[0])
+    pool.close_all()
+    assert document.is_closed and len(pool) == 0
+
+
+def test_rewritten_files_are_opened_again(pdfs):
+    pool = DocumentPool()
+    document = pool.get(pdfs[0])
+    make_pdf(pdfs[0], 5)
+    assert not pool.is_current(pdfs[0])
+    reopened = pool.get(pdfs[0])
+    assert document.is_closed
+    assert len(reopened) == 5
+
+
+def test_least_recently_used_documents_are_closed_past_max_open(pdfs):
+    pool = DocumentPool(max_open=2)
+    first = pool.get(pdfs[0])
+    pool.get(pdfs[1])
+    pool.get(pdfs[0])
+    pool.get(pdfs[2])
+    assert pdfs[1] not in pool
+    assert pdfs[0] in pool and pdfs[2] in pool and not first.is_closed
+
+
+def test_close_idle(pdfs, clock):
+    pool = DocumentPool(idle_seconds=600)
+    for path in pdfs:
+        pool.get(path)
+    clock.now += 500
+    pool.get(pdfs[1])
+    clock.now += 200
+    pool.close_idle(keep={pdfs[2]})
+    assert pdfs[0] not in pool
+    assert pdfs[1] in pool and pdfs[2] in pool
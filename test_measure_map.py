@@ -0,0 +1,126 @@
+import os
+
+import fitz  # PyMuPDF
+import pytest
+
+import measure_map
+from measure_map import MeasureMap
+
+
+def score_xml(measure_count, new_systems=(), new_pages=()):
+    """A one-part score of whole-measure rests, with breaks before the measures numbered in the arguments."""
+    measures = []
+    for number in range(1, measure_count + 1):
+        prints = ''
+        if number in new_pages:
+            prints = '<print new-page="yes"/>'
+        elif number in new_systems:
+            prints = '<print new-system="yes"/>'
+        measures.append(f'<measure number="{number}" width="100">{prints}'
+                        f'<note><rest/><duration>4</duration></note></measure>')
+    return (f'<score-partwise><part-list><score-part id="P1"><part-name>Flute</part-name></score-part>'
+            f'</part-list><part id="P1">{"".join(measures)}</part></score-partwise>').encode()
+
+
+def score_pdf(path, pages):
+    """A PDF whose pages hold one-staff systems; pages lists the measure count of each system."""
+    with fitz.open() as document:
+        for systems in pages:
+            page = document.new_page(width=595, height=842)
+            for system, measures in enumerate(systems):
+                top = 100 + system * 120
+                for line in range(5):
+                    page.draw_line((50, top + line * 6), (545, top + line * 6))
+                for k in range(measures + 1):
+                    x = 50 + k * 495 / measures
+                    page.draw_line((x, top), (x, top + 24))
+        document.save(path)
+    return str(path)
+
+
+@pytest.fixture
+def score(tmp_path):
+    """Paths of a PDF of two pages of two three-measure systems and a MusicXML file beside it."""
+    pdf_path = score_pdf(tmp_path / 'score.pdf', [[3, 3], [3, 3]])
+    return pdf_path, str(tmp_path / 'score.musicxml')
+
+
+def test_locate():
+    m = MeasureMap([('1', 0, (0, 0, 10, 10)), ('2', 0, None), ('1', 1, [5, 5, 9, 9])])
+    assert m.locate(2) == (0, None)
+    assert m.locate(' 1') == (0, (0, 0, 10, 10))  # The first measure of that number
+    assert m.locate('7') is None
+    # Matched by position when the numbers are the same, so the repeated 1 is found on page 1
+    assert m.locate_all(['1', '2', '1']) == [(0, (0, 0, 10, 10)), (0, None), (1, (5, 5, 9, 9))]
+    assert m.locate_all(['2', '1']) == [(0, None), (0, (0, 0, 10, 10))]
+
+
+def test_page_systems(score):
+    with fitz.open(score[0]) as document:
+        systems = measure_map.page_systems(document[0])
+    assert [system['rect'] for system in systems] == [(50, 100, 545, 124), (50, 220, 545, 244)]
+    assert systems[0]['bounds'] == pytest.approx([50, 215, 380, 545])
+
+
+def test_build_from_barlines(score):
+    pdf_path, musicxml_path = score
+    with open(musicxml_path, 'wb') as f:
+        f.write(score_xml(14))
+    m = measure_map.build(pdf_path, musicxml_path)
+    assert len(m) == 12
+    assert m.unplaced == 2
+    assert m.locate('1') == (0, pytest.approx((50, 100, 215, 124)))
+    assert m.locate('7')[0] == 1
+    assert m.locate('13') is None
+
+
+def test_build_from_layout_breaks(score):
+    pdf_path, musicxml_path = score
+    with open(musicxml_path, 'wb') as f:
+        f.write(score_xml(18, new_systems=(4, 10, 16), new_pages=(7, 13)))
+    m = measure_map.build(pdf_path, musicxml_path)
+    # The third page of the MusicXML is not in the PDF
+    assert len(m) == 12 and m.unplaced == 6
+    page, rect = m.locate('5')
+    assert page == 0
+    # Measures reach above and below their staff, for the notes outside it
+    assert rect[0] == pytest.approx(215) and rect[2] == pytest.approx(380)
+    assert rect[1] < 220 and rect[3] > 244
+    assert m.locate('10')[0] == 1
+
+
+def test_pages_that_do_not_match_the_layout_have_no_regions(tmp_path):
+    pdf_path = score_pdf(tmp_path / 'score.pdf', [[6]])
+    musicxml_path = tmp_path / 'score.musicxml'
+    musicxml_path.write_bytes(score_xml(6, new_systems=(4,)))
+    m = measure_map.build(pdf_path, str(musicxml_path))
+    assert m.locate_all([str(number) for number in range(1, 7)]) == [(0, None)] * 6
+
+
+def test_save_and_load(score):
+    pdf_path, musicxml_path = score
+    with open(musicxml_path, 'wb') as f:
+        f.write(score_xml(14))
+    assert measure_map.load(pdf_path, musicxml_path) is None
+    built = measure_map.build_and_save(pdf_path, musicxml_path)
+    loaded = measure_map.load(pdf_path, musicxml_path)
+    assert loaded.measures == built.measures
+    assert loaded.unplaced == 2
+
+    stat = os.stat(musicxml_path)
+    with open(musicxml_path, 'wb') as f:
+        f.write(score_xml(15))
+    assert measure_map.load(pdf_path, musicxml_path) is None
+    # The map still describes the MusicXML file as it was
+    assert measure_map.load(pdf_path, musicxml_path, stat).measures == built.measures
+
+
+def test_score_layout_counts_the_staves_of_the_first_part(tmp_path):
+    path = tmp_path / 'score.musicxml'
+    path.write_bytes(b'<score-partwise><part-list><score-part id="P1"/><score-part id="P2"/></part-list>'
+                     b'<part id="P1"><measure number="1" width="80"><attributes><staves>2</staves></attributes>'
+                     b'</measure><measure number="2"><print new-page="yes"/></measure></part>'
+                     b'<part id="P2"><measure number="1"/><measure number="2"/></part></score-partwise>')
+    measures, staves = measure_map.score_layout(str(path))
+    assert measures == [('1', 80.0, False, False), ('2', None, True, True)]
+    assert staves == 3
@@ -0,0 +1,169 @@
+import pytest
+
+from conftest import TEST_SCORE, make_mxl, make_pdf, wait_until
+
+
+@pytest.fixture
+def viewer(qapp):
+    from music_pdf_viewer import PDFViewer
+
+    viewer = PDFViewer()
+    viewer.resize(1000, 800)
+    viewer.show()
+    yield viewer
+    viewer.close()
+    qapp.processEvents()
+
+
+def pages_sharp(viewer):
+    return all(page in viewer.page_pixmap_items and page not in viewer.preview_pages
+               for page in viewer.pages_near_viewport(0))
+
+
+def misplaced_pages(viewer):
+    """Pages whose pixmap does not cover its placeholder in the layout."""
+    return [page for page, item in viewer.page_pixmap_items.items()
+            if abs(item.sceneBoundingRect().width() - viewer.page_rects[page].width()) > 2]
+
+
+def test_pages_shown_before_refine_zoom_fit_the_layout(qapp, viewer, tmp_path):
+    viewer.load_pdf(make_pdf(tmp_path / 'score.pdf', 12))
+    viewer.view_mode_combo.setCurrentIndex(viewer.CONTINUOUS)
+    scroll_bar = viewer.view.verticalScrollBar()
+    # Render every page at zoom 1, so they are all in the page cache
+    while True:
+        wait_until(qapp, lambda: pages_sharp(viewer))
+        if scroll_bar.value() >= scroll_bar.maximum():
+            break
+        scroll_bar.setValue(scroll_bar.value() + viewer.view.viewport().height())
+    scroll_bar.setValue(0)
+    viewer.zoom_in()
+    wait_until(qapp, lambda: viewer.layout_key[1] == 1.25 and pages_sharp(viewer))
+
+    # The layout stays at 1.25 until refine_zoom; cached pages at 1.0 turn up while scrolling
+    viewer.zoom_out()
+    layout_zoom = viewer.layout_key[1]
+    assert layout_zoom == 1.25
+    region = viewer.page_region(2, (0, 0, 100, 100))
+    assert region.width() == pytest.approx(100 * layout_zoom)
+    for value in range(0, scroll_bar.maximum(), 200):
+        scroll_bar.setValue(value)
+        qapp.processEvents()
+        if viewer.layout_key[1] != layout_zoom:
+            break  # refine_zoom has run
+        assert misplaced_pages(viewer) == []
+
+    wait_until(qapp, lambda: viewer.layout_key[1] == 1.0 and pages_sharp(viewer))
+    assert misplaced_pages(viewer) == []
+
+
+def test_closing_with_a_zoom_refine_pending(qapp, viewer, pdf_path):
+    viewer.load_pdf(pdf_path)
+    wait_until(qapp, lambda: viewer.page_item is not None)
+    viewer.zoom_in()
+    assert viewer.zoom_timer.isActive()
+    viewer.close()
+    # A refine would run against the documents closed with the window
+    assert not viewer.zoom_timer.isActive()
+
+
+def test_scene_time_is_recorded_once_per_page_placed(qapp, viewer, pdf_path, monkeypatch):
+    import perf
+
+    viewer.load_pdf(pdf_path)
+    wait_until(qapp, lambda: viewer.page_item is not None)
+    placed = []
+    show_layout_page = viewer.show_layout_page
+    monkeypatch.setattr(viewer, 'show_layout_page', lambda *args: placed.append(args[0]) or show_layout_page(*args))
+    perf.recorder.reset()
+    viewer.view_mode_combo.setCurrentIndex(viewer.CONTINUOUS)
+    wait_until(qapp, lambda: pages_sharp(viewer))
+    assert placed
+    assert perf.stats('scene')['count'] == len(placed)
+
+
+def test_single_page_turns_and_zoom(qapp, viewer, pdf_path):
+    viewer.load_pdf(pdf_path)
+    wait_until(qapp, lambda: viewer.page_item is not None)
+    viewer.next_page()
+    assert viewer.current_page == 1
+    wait_until(qapp, lambda: viewer.page_item_key[0] == 1)
+    viewer.zoom_in()
+    wait_until(qapp, lambda: viewer.page_item_key[1] == 1.25 and not viewer.zoom_timer.isActive())
+    assert viewer.page_item.sceneBoundingRect().width() == pytest.approx(595 * 1.25, abs=2)
+
+
+def test_turning_back_shows_the_cached_page_at_once(qapp, viewer, pdf_path):
+    viewer.load_pdf(pdf_path)
+    wait_until(qapp, lambda: viewer.page_item_key == (0, 1.0, 0))
+    viewer.next_page()
+    wait_until(qapp, lambda: viewer.page_item_key == (1, 1.0, 0))
+    hits = viewer.page_cache.hits
+    viewer.previous_page()
+    assert viewer.page_item_key == (0, 1.0, 0)
+    assert viewer.page_cache.hits > hits
+
+
+
+def test_tiled_zoom_shows_the_tiles_on_screen(qapp, viewer, pdf_path):
+    viewer.load_pdf(pdf_path)
+    viewer.zoom_factor = 4.5
+    viewer.apply_zoom()
+    wait_until(qapp, lambda: viewer.tiled_zoom == 4.5 and not viewer.zoom_timer.isActive()
+               and all(tile in viewer.tile_items for tile in viewer.tiles_near_viewport(0)))
+    assert viewer.tiles_near_viewport(0)
+
+
+def test_compressed_musicxml_beside_the_pdf_is_loaded(qapp, viewer, tmp_path):
+    pdf_path = make_pdf(tmp_path / 'score.pdf', 2)
+    with open(TEST_SCORE, 'rb') as f:
+        make_mxl(tmp_path / 'score.mxl', {'score.musicxml': f.read()})
+    viewer.load_pdf(pdf_path)
+    wait_until(qapp, lambda: viewer.musicxml_data is not None)
+    assert viewer.musicxml_file == str(tmp_path / 'score.mxl')
+    assert viewer.musicxml_data['title'] == 'Test Music Score'
+
+
+def test_tabs_switch_without_reopening(qapp, viewer, tmp_path):
+    first = make_pdf(tmp_path / 'first.pdf', 4)
+    second = make_pdf(tmp_path / 'second.pdf', 2)
+    viewer.open_document(first)
+    viewer.next_page()
+    first_document = viewer.pdf_document
+    viewer.open_document(second)
+    assert viewer.tab_bar.count() == 2 and viewer.current_page == 0
+    wait_until(qapp, lambda: viewer.page_item_key == (0, 1.0, 0))
+
+    viewer.open_document(first)  # Selects its tab
+    assert viewer.tab_bar.count() == 2
+    assert viewer.pdf_document is first_document
+    assert viewer.current_page == 1
+
+    viewer.close_tab(0)
+    assert first_document.is_closed
+    assert viewer.pdf_path == second and viewer.tab_bar.count() == 1
+
+
+def test_closing_while_following(qapp, viewer, tmp_path):
+    from test_measure_map import score_pdf, score_xml
+
+    pdf_path = score_pdf(tmp_path / 'score.pdf', [[3, 3], [3, 3]])
+    (tmp_path / 'score.musicxml').write_bytes(score_xml(12))
+    viewer.load_pdf(pdf_path)
+    wait_until(qapp, lambda: viewer.follow_action.isEnabled())
+    viewer.follow_action.trigger()
+    wait_until(qapp, lambda: viewer.follower is not None and viewer.follower.is_running())
+    wait_until(qapp, lambda: viewer.follow_cursor.isVisible())
+    follower = viewer.follower
+    viewer.close()
+    assert not follower.timer.isActive()
+    # A frame that was already queued finds the score closed
+    viewer.on_follow_position(0, 0.5)
+
+
+def test_closing_right_after_opening(qapp, viewer, pdf_path):
+    viewer.load_pdf(pdf_path)
+    viewer.close()
+    # load_companions is still queued and must leave the closed document alone
+    qapp.processEvents()
+    assert viewer.pdf_document.is_closed
@@ -0,0 +1,107 @@
+import xml.etree.ElementTree as ET
+import zipfile
+
+import pytest
+
+from conftest import TEST_SCORE, make_mxl
+from musicxml_reader import mxl_rootfile, open_musicxml, read_summary
+
+TIMEWISE = b'''<?xml version="1.0" encoding="UTF-8"?>
+<score-timewise version="3.1">
+  <movement-title>Timewise</movement-title>
+  <part-list>
+    <score-part id="P1"><part-name>Flute</part-name></score-part>
+    <score-part id="P2"></score-part>
+  </part-list>
+  <measure number="1"><part id="P1"/><part id="P2"/></measure>
+  <measure number="2"><part id="P1"/><part id="P2"/></measure>
+  <measure number="3"><part id="P1"/><part id="P2"/></measure>
+</score-timewise>
+'''
+
+CONTAINER = '''<?xml version="1.0" encoding="UTF-8"?>
+<container>
+  <rootfiles>
+    <rootfile full-path="score.pdf" media-type="application/pdf"/>
+    <rootfile full-path="{name}"/>
+  </rootfiles>
+</container>
+'''
+
+
+def test_read_summary():
+    summary = read_summary(TEST_SCORE)
+    assert summary == {
+        'title': 'Test Music Score',
+        'composer': 'Test Composer',
+        'parts': [{'id': 'P1', 'name': 'Piano'}, {'id': 'P2', 'name': 'Violin'}],
+        'measures': 2,
+        'part_measures': {'P1': 2, 'P2': 2},
+    }
+
+
+def test_read_summary_of_a_timewise_score(tmp_path):
+    path = tmp_path / 'timewise.musicxml'
+    path.write_bytes(TIMEWISE)
+    summary = read_summary(str(path))
+    assert summary['title'] == 'Timewise'
+    assert summary['composer'] == 'Unknown Composer'
+    assert summary['parts'] == [{'id': 'P1', 'name': 'Flute'}, {'id': 'P2', 'name': 'Unknown'}]
+    assert summary['part_measures'] == {'P1': 3, 'P2': 3}
+    assert summary['measures'] == 3
+
+
+def test_read_summary_reports_progress():
+    percents = []
+    read_summary(TEST_SCORE, progress=percents.append)
+    assert percents == sorted(percents)
+    assert percents[-1] == 100
+
+
+def test_read_summary_of_a_broken_file(tmp_path):
+    path = tmp_path / 'broken.musicxml'
+    path.write_bytes(TIMEWISE[:300])
+    with pytest.raises(ET.ParseError):
+        read_summary(str(path))
+
+
+
+@pytest.fixture
+def score_bytes():
+    with open(TEST_SCORE, 'rb') as f:
+        return f.read()
+
+
+def test_mxl_rootfile_follows_the_container(tmp_path, score_bytes):
+    path = make_mxl(tmp_path / 'score.mxl', {
+        'META-INF/container.xml': CONTAINER.format(name='music/score.musicxml'),
+        'other.xml': b'<other/>',
+        'music/score.musicxml': score_bytes,
+    })
+    with zipfile.ZipFile(path) as archive:
+        assert mxl_rootfile(archive) == 'music/score.musicxml'
+
+
+def test_mxl_rootfile_without_a_container(tmp_path, score_bytes):
+    path = make_mxl(tmp_path / 'score.mxl', {'META-INF/manifest.xml': b'<manifest/>', 'score.xml': score_bytes})
+    with zipfile.ZipFile(path) as archive:
+        assert mxl_rootfile(archive) == 'score.xml'
+
+
+def test_mxl_rootfile_of_an_archive_without_a_score(tmp_path):
+    path = make_mxl(tmp_path / 'score.mxl', {'score.pdf': b'%PDF-1.7'})
+    with zipfile.ZipFile(path) as archive:
+        with pytest.raises(ValueError):
+            mxl_rootfile(archive)
+
+
+def test_compressed_scores_read_like_uncompressed_ones(tmp_path, score_bytes):
+    path = make_mxl(tmp_path / 'score.mxl', {
+        'META-INF/container.xml': CONTAINER.format(name='score.musicxml'),
+        'score.musicxml': score_bytes,
+    })
+    with open_musicxml(path) as f:
+        assert f.read() == score_bytes
+    percents = []
+    assert read_summary(path, progress=percents.append) == read_summary(TEST_SCORE)
+    assert percents[-1] == 100
@@ -0,0 +1,154 @@
+import pickle
+
+import numpy as np
+import pytest
+
+import musicxml_analyze
+import score_tree
+from conftest import TEST_SCORE
+from note_table import (NoteTable, extract_measure, extract_note_table, measure_number, pitch_name,
+                        update_note_table)
+
+
+def rows(table):
+    """(part id, measure, pitch name, offset, duration) of every row."""
+    return list(zip([table.part_ids[part] for part in table.part.tolist()], table.measure.tolist(),
+                    table.pitch_names(), table.offset.tolist(), table.duration.tolist()))
+
+
+def assert_same_table(a, b):
+    assert a.part_ids == b.part_ids
+    assert a.part_names == b.part_names
+    for name in NoteTable.COLUMNS:
+        assert np.array_equal(getattr(a, name), getattr(b, name)), name
+    assert np.array_equal(a.event_offsets, b.event_offsets)
+
+
+def rewrite(path, old, new, after=b''):
+    """Replace the first old after the first occurrence of after in the file at path."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    start = data.index(after)
+    index = data.index(old, start)
+    with open(path, 'wb') as f:
+        f.write(data[:index] + new + data[index + len(old):])
+
+
+def test_pitch_name():
+    assert pitch_name(61, 0, 1) == 'C#4'
+    assert pitch_name(58, 6, -1) == 'B-3'
+
+
+def test_measure_number():
+    assert measure_number('12') == 12
+    assert measure_number('12a') == 12
+    assert measure_number('X1') == -1
+    assert measure_number(None) == -1
+
+
+def test_extract_note_table():
+    table = extract_note_table(TEST_SCORE, workers=1)
+    assert table.part_ids == ['P1', 'P2']
+    assert table.part_names == ['Piano', 'Violin']
+    assert len(table) == 12
+    assert rows(table)[:2] == [('P1', 1, 'C4', 0.0, 1.0), ('P1', 1, 'D4', 1.0, 1.0)]
+    # The violin rests through the first measure
+    assert set(table.measure[table.part == 1].tolist()) == {2}
+
+
+def test_chords_share_an_event():
+    table = extract_measure(b'<measure number="7"><note><pitch><step>C</step><octave>4</octave></pitch>'
+                            b'<duration>2</duration></note><note><chord/><pitch><step>E</step>'
+                            b'<alter>-1</alter><octave>4</octave></pitch><duration>2</duration></note>'
+                            b'<note><pitch><step>G</step><octave>4</octave></pitch><duration>1</duration></note>'
+                            b'</measure>', divisions=2)
+    assert table.pitch_names() == ['C4', 'E-4', 'G4']
+    assert table.event_offsets.tolist() == [0, 2, 3]
+    assert table.chord_sizes().tolist() == [2, 1]
+    assert table.offset.tolist() == [0.0, 0.0, 1.0]
+    assert table.measure.tolist() == [7, 7, 7]
+
+
+def test_select_measures():
+    table = extract_note_table(TEST_SCORE, workers=1)
+    second = table.select_measures(2)
+    assert len(second) == 8
+    assert set(second.measure.tolist()) == {2}
+    assert second.event_offsets.tolist() == list(range(9))
+    assert rows(second)[4] == ('P2', 2, 'E5', 0.0, 1.0)
+
+    violin = table.select_measures(1, 2, parts=[1])
+    assert [row[2] for row in rows(violin)] == ['E5', 'D5', 'C5', 'B4']
+
+    assert len(table.select_measures(3, 9)) == 0
+    assert table.select_measures(3, 9).event_offsets.tolist() == [0]
+
+
+def test_select_measures_keeps_chords_whole():
+    table = extract_measure(b'<measure number="1"><note><pitch><step>C</step><octave>4</octave></pitch>'
+                            b'<duration>1</duration></note><note><chord/><pitch><step>E</step>'
+                            b'<octave>4</octave></pitch><duration>1</duration></note></measure>')
+    selected = table.select_measures(1)
+    assert selected.event_offsets.tolist() == [0, 2]
+
+
+def test_save_and_load(tmp_path):
+    table = extract_note_table(TEST_SCORE, workers=1)
+    table.save(tmp_path / 'notes.npz')
+    assert_same_table(NoteTable.load(tmp_path / 'notes.npz'), table)
+    assert_same_table(pickle.loads(pickle.dumps(table)), table)
+
+
+def test_to_dataframe_shares_the_columns():
+    pytest.importorskip('pandas')
+    table = extract_note_table(TEST_SCORE, workers=1)
+    df = table.to_dataframe()
+    assert len(df) == len(table)
+    assert df['part_id'].tolist()[-1] == 'P2'
+    assert np.shares_memory(df['pitch'].to_numpy(), table.pitch)
+
+
+def test_analyze_prints_the_first_measures(score_path, capsys):
+    musicxml_analyze.main([score_path])
+    out = capsys.readouterr().out
+    assert 'Measure 1' in out and 'Measure 2' in out
+    assert 'Violin' in out
+
+
+def test_update_note_table_extracts_only_the_changed_parts(score_path):
+    table = extract_note_table(score_path, workers=1)
+    rewrite(score_path, b'<step>E</step>', b'<step>F</step>', after=b'<part id="P2"')
+    parts = score_tree.index_file(score_path)
+    updated = update_note_table(table, score_path, parts, {'P2'})
+    assert_same_table(updated, extract_note_table(score_path, workers=1))
+    assert rows(updated)[8] == ('P2', 2, 'F5', 0.0, 1.0)
+
+
+def test_update_note_table_copies_the_parts_not_named(score_path):
+    table = extract_note_table(score_path, workers=1)
+    # Both parts change, but only P2 is said to: P1 keeps its old rows
+    rewrite(score_path, b'<step>C</step>', b'<step>D</step>', after=b'<part id="P1"')
+    rewrite(score_path, b'<step>E</step>', b'<step>F</step>', after=b'<part id="P2"')
+    updated = update_note_table(table, score_path, score_tree.index_file(score_path), {'P2'})
+    assert rows(updated)[0] == ('P1', 1, 'C4', 0.0, 1.0)
+    assert rows(updated)[8] == ('P2', 2, 'F5', 0.0, 1.0)
+
+
+def test_update_note_table_reads_everything_when_the_parts_change(score_path):
+    table = extract_note_table(score_path, workers=1)
+    with open(score_path, 'rb') as f:
+        data = f.read()
+    with open(score_path, 'wb') as f:
+        f.write(data.replace(b'"P2"', b'"P3"'))
+    updated = update_note_table(table, score_path, score_tree.index_file(score_path), set())
+    assert updated.part_ids == ['P1', 'P3']
+    assert_same_table(updated, extract_note_table(score_path, workers=1))
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_parallel_extraction_matches_serial(score_path, monkeypatch, workers):
+    import note_table
+
+    monkeypatch.setattr(note_table, 'PARALLEL_MIN_BYTES', 0)
+    assert_same_table(extract_note_table(score_path, workers=workers),
+                      extract_note_table(score_path, workers=1))
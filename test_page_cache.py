@@ -0,0 +1,142 @@
+from page_cache import PageCache
+
+
+class Pixmap:
+    """Stands in for a QPixmap: PageCache only asks for its size and depth."""
+
+    def __init__(self, width, height, depth=32):
+        self._width, self._height, self._depth = width, height, depth
+
+    def width(self):
+        return self._width
+
+    def height(self):
+        return self._height
+
+    def depth(self):
+        return self._depth
+
+
+def page(kilobytes):
+    return Pixmap(256, kilobytes)  # 256 pixels of 4 bytes per row: 1 KB per row
+
+
+def test_make_key_rounds_zoom_and_rotation():
+    assert PageCache.make_key(3, 1.25 * 0.8, 450) == PageCache.make_key(3, 1.0, 90)
+
+
+def test_pixmap_bytes_counts_gray_as_one_byte():
+    assert PageCache.pixmap_bytes(Pixmap(10, 10, 32)) == 400
+    assert PageCache.pixmap_bytes(Pixmap(10, 10, 8)) == 100
+
+
+def test_get_counts_hits_and_misses():
+    cache = PageCache()
+    cache.put('a', page(1))
+    assert cache.get('a') is not None
+    assert cache.get('b') is None
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert cache.hit_rate() == 0.5
+
+
+def test_least_recently_used_pages_go_first():
+    cache = PageCache(max_bytes=3 * 1024)
+    for key in 'abc':
+        cache.put(key, page(1))
+    cache.get('a')
+    cache.put('d', page(1))
+    assert 'b' not in cache
+    assert all(key in cache for key in 'acd')
+    assert cache.total_bytes == 3 * 1024
+
+
+def test_eviction_is_by_bytes_not_count():
+    cache = PageCache(max_bytes=4 * 1024)
+    for key in 'abcd':
+        cache.put(key, page(1))
+    cache.put('big', page(3))
+    assert [key for key in 'abcd' if key in cache] == ['d']
+    assert cache.total_bytes == 4 * 1024
+
+
+def test_page_larger_than_the_budget_is_not_kept():
+    cache = PageCache(max_bytes=1024)
+    cache.put('a', page(1))
+    cache.put('huge', page(2))
+    assert 'huge' not in cache
+    assert 'a' in cache
+
+
+def test_replacing_a_key_does_not_count_twice():
+    cache = PageCache()
+    cache.put('a', page(1))
+    cache.put('a', page(2))
+    assert len(cache) == 1
+    assert cache.total_bytes == 2 * 1024
+
+
+def test_invalidate_one_page_keeps_the_others_and_tiles_go_with_their_page():
+    cache = PageCache()
+    cache.put((1, 1.0, 0), page(1))
+    cache.put((1, 2.0, 0) + (0, 1), page(1))  # A tile of page 1
+    cache.put((2, 1.0, 0), page(1))
+    cache.invalidate(1)
+    assert len(cache) == 1
+    assert (2, 1.0, 0) in cache
+    assert cache.total_bytes == 1024
+
+
+def test_documents_have_separate_pages():
+    cache = PageCache()
+    cache.set_document('a.pdf')
+    cache.put((0, 1.0, 0), page(1))
+    cache.set_document('b.pdf')
+    assert (0, 1.0, 0) not in cache
+    cache.put((0, 1.0, 0), page(1))
+    cache.invalidate()
+    assert len(cache) == 1
+    cache.set_document('a.pdf')
+    assert (0, 1.0, 0) in cache
+
+
+def test_background_documents_are_evicted_before_the_current_one():
+    cache = PageCache(max_bytes=4 * 1024)
+    cache.set_document('a.pdf')
+    cache.put(('a', 0), page(1))
+    cache.put(('a', 1), page(1))
+    cache.set_document('b.pdf')
+    cache.put(('b', 0), page(1))
+    cache.put(('b', 1), page(1))
+    # b.pdf goes to the background, though its pages were used last
+    cache.set_document('a.pdf')
+    cache.put(('a', 2), page(1))
+    assert all(key in cache for key in (('a', 0), ('a', 1), ('a', 2)))
+    cache.put(('a', 3), page(1))
+    assert all(key in cache for key in (('a', 0), ('a', 1), ('a', 2), ('a', 3)))
+    assert len(cache) == 4
+    cache.set_document('b.pdf')
+    assert ('b', 0) not in cache and ('b', 1) not in cache
+
+
+def test_discard_document_gives_its_memory_back():
+    cache = PageCache()
+    cache.set_document('a.pdf')
+    cache.put((0, 1.0, 0), page(1))
+    cache.set_document('b.pdf')
+    cache.put((0, 1.0, 0), page(2))
+    cache.discard_document('a.pdf')
+    assert len(cache) == 1
+    assert cache.total_bytes == 2 * 1024
+
+
+def test_clear_empties_every_document_and_resets_counters():
+    cache = PageCache()
+    cache.set_document('a.pdf')
+    cache.put('x', page(1))
+    cache.get('x')
+    cache.set_document('b.pdf')
+    cache.put('y', page(1))
+    cache.clear()
+    assert len(cache) == 0
+    assert cache.total_bytes == 0
+    assert cache.hits == cache.misses == 0
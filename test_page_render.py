@@ -0,0 +1,61 @@
+import fitz  # PyMuPDF
+import pytest
+
+from page_render import (TILE_SIZE, fit_width_zoom, page_pixel_rect, region_rect, render_pixmap, tile_clip,
+                         tile_grid)
+
+
+@pytest.fixture
+def page():
+    document = fitz.open()
+    yield document.new_page(width=595, height=842)
+    document.close()
+
+
+@pytest.mark.parametrize('zoom, rotation, grid', [
+    (1.0, 0, (2, 2)),  # 595 x 842 pixels
+    (4.5, 0, (6, 8)),  # 2678 x 3789
+    (4.5, 90, (8, 6)),  # Rotated: 3789 x 2678
+    (0.5, 0, (1, 1)),
+])
+def test_tile_grid(page, zoom, rotation, grid):
+    assert tile_grid(page, zoom, rotation) == grid
+
+
+def test_tiles_cover_the_page_without_overlap(page):
+    zoom, rotation = 2.0, 0
+    columns, rows = tile_grid(page, zoom, rotation)
+    pixel_rect = page_pixel_rect(page, zoom, rotation)
+    area = 0
+    for column in range(columns):
+        for row in range(rows):
+            clip = fitz.Rect(tile_clip(page, zoom, rotation, column, row))
+            pixmap = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), clip=clip)
+            assert pixmap.width <= TILE_SIZE and pixmap.height <= TILE_SIZE
+            area += pixmap.width * pixmap.height
+    assert area == pixel_rect.width * pixel_rect.height
+
+
+def test_tile_clips_of_a_rotated_page_stay_on_the_page(page):
+    columns, rows = tile_grid(page, 2.0, 90)
+    for column in range(columns):
+        for row in range(rows):
+            clip = fitz.Rect(tile_clip(page, 2.0, 90, column, row))
+            assert page.rect.contains(clip)
+
+
+def test_fit_width_zoom(page):
+    assert fit_width_zoom(page, 595, 0) == 1.0
+    assert fit_width_zoom(page, 842, 90) == 1.0
+
+
+def test_region_rect_is_relative_to_the_pixmap(page):
+    assert region_rect(page, (0, 0, 100, 50), 2.0, 0) == (0, 0, 200, 100)
+    # Rotated a quarter turn clockwise, the top-left corner of the page goes to the top right
+    x0, y0, x1, y1 = region_rect(page, (0, 0, 100, 50), 1.0, 90)
+    assert (round(x0), round(y0), round(x1), round(y1)) == (792, 0, 842, 100)
+
+
+def test_render_pixmap_gray_has_one_channel(page):
+    assert render_pixmap(page, 0.5, 0).n == 3
+    assert render_pixmap(page, 0.5, 0, gray=True).n == 1
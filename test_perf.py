@@ -0,0 +1,58 @@
+import json
+
+import pytest
+
+from perf import PerfRecorder
+
+
+def test_stats():
+    recorder = PerfRecorder()
+    assert recorder.stats('render') is None
+    for ms in (10, 40, 20, 30):
+        recorder.record('render', ms / 1000)
+    stats = recorder.stats('render')
+    assert stats['count'] == 4
+    assert stats['last'] == 0.03
+    assert stats['median'] == pytest.approx(0.025)
+    assert stats['p95'] == 0.04
+
+
+def test_only_the_recent_durations_count():
+    recorder = PerfRecorder(history=3)
+    for seconds in (9.0, 1.0, 2.0, 3.0):
+        recorder.record('scene', seconds)
+    assert recorder.stats('scene')['count'] == 3
+    assert recorder.stats('scene')['p95'] == 3.0
+
+
+def test_measure_skips_blocks_that_fail():
+    recorder = PerfRecorder()
+    with recorder.measure('open'):
+        pass
+    with pytest.raises(OSError):
+        with recorder.measure('open'):
+            raise OSError("missing")
+    assert recorder.stats('open')['count'] == 1
+    recorder.reset()
+    assert recorder.stats('open') is None
+
+
+def test_log_is_written_as_json_lines(tmp_path):
+    log = tmp_path / 'perf.jsonl'
+    recorder = PerfRecorder(log_path=str(log))
+    recorder.record('render', 0.0417, page=3, zoom=2.0)
+    recorder.set_log(None)
+    recorder.record('render', 0.01)
+    recorder.close()
+    [line] = log.read_text(encoding='utf-8').splitlines()
+    entry = json.loads(line)
+    assert entry['stage'] == 'render' and entry['ms'] == 41.7
+    assert (entry['page'], entry['zoom']) == (3, 2.0)
+
+
+def test_a_log_that_cannot_be_opened_is_given_up(tmp_path, capsys):
+    recorder = PerfRecorder(log_path=str(tmp_path / 'missing' / 'perf.jsonl'))
+    recorder.record('render', 0.01)
+    recorder.record('render', 0.01)
+    assert capsys.readouterr().out.count('Error opening performance log') == 1
+    assert recorder.stats('render')['count'] == 2
@@ -0,0 +1,83 @@
+import logging
+import time
+
+import pytest
+
+from conftest import wait_until
+from page_cache import PageCache
+from page_render import render_samples
+
+
+@pytest.mark.parametrize('gray, depth', [(False, 24), (True, 8)])
+def test_pixmap_from_samples_keeps_the_rendered_format(qapp, gray, depth):
+    import fitz  # PyMuPDF
+
+    from render_worker import pixmap_from_samples
+
+    with fitz.open() as document:
+        page = document.new_page(width=101, height=50)  # Rows of RGB samples are not 32-bit aligned
+        page.draw_rect((10, 10, 20, 20), color=(1, 0, 0), fill=(1, 0, 0))
+        samples = render_samples(page, 1.0, 0, gray=gray)
+    image = pixmap_from_samples(*samples).toImage()
+    assert (image.width(), image.height()) == (101, 50)
+    assert image.depth() == depth
+    red = image.pixelColor(15, 15)
+    if gray:
+        assert red.red() == red.green() == red.blue() < 255
+    else:
+        assert (red.red(), red.green(), red.blue()) == (255, 0, 0)
+    assert image.pixelColor(100, 49).lightness() == 255
+
+
+@pytest.fixture
+def pool(qapp, pdf_path):
+    from render_worker import RenderPool
+
+    pool = RenderPool(max_workers=1)
+    pool.set_document(pdf_path)
+    yield pool
+    pool.shutdown()
+
+
+def test_request_delivers_the_page(qapp, pool):
+    delivered = []
+    pool.page_ready.connect(lambda key, pixmap: delivered.append((key, pixmap.width(), pixmap.height())))
+    key = PageCache.make_key(1, 0.5, 0)
+    pool.request(key, 1, 0.5, 0)
+    pool.request(key, 1, 0.5, 0)  # Already in flight: not queued twice
+    wait_until(qapp, lambda: delivered)
+    assert delivered == [(key, 298, 421)]
+    assert not pool.is_pending(key)
+
+
+def test_cancelled_jobs_are_not_delivered(qapp, pool):
+    delivered = []
+    pool.page_ready.connect(lambda key, pixmap: delivered.append(key))
+    pool.request(PageCache.make_key(0, 1.0, 0), 0, 1.0, 0)
+    pool.cancel_pending()
+    pool.request(PageCache.make_key(2, 1.0, 0), 2, 1.0, 0)
+    wait_until(qapp, lambda: delivered)
+    time.sleep(0.2)
+    qapp.processEvents()
+    assert delivered == [PageCache.make_key(2, 1.0, 0)]
+
+
+def test_jobs_running_at_shutdown_finish_quietly(qapp, pool, caplog):
+    from PyQt5 import sip
+
+    key = PageCache.make_key(0, 1.0, 0)
+    pool.request(key, 0, 1.0, 0)
+    future = pool._pending[key]
+    wait_until(qapp, future.running)
+    pool.shutdown()
+    sip.delete(pool)  # As when the viewer that owns it is closed and deleted
+    future.result(timeout=30)
+    time.sleep(0.2)  # Done-callbacks run just after the result is set
+    assert not [record for record in caplog.records if record.name == 'concurrent.futures']
+
+
+def test_no_jobs_after_shutdown(qapp, pool):
+    pool.shutdown()
+    key = PageCache.make_key(0, 1.0, 0)
+    pool.request(key, 0, 1.0, 0)
+    assert not pool.is_pending(key)
@@ -0,0 +1,109 @@
+import os
+
+import pytest
+
+import score_cache
+
+
+@pytest.fixture
+def score(tmp_path):
+    path = tmp_path / 'score.musicxml'
+    path.write_bytes(b'<score-partwise/>')
+    return str(path)
+
+
+def set_mtime(path, seconds):
+    os.utime(path, (seconds, seconds))
+
+
+def test_load_returns_what_was_stored(score):
+    assert score_cache.load(score, 'summary') is None
+    score_cache.store(score, 'summary', {'title': 'Test'})
+    assert score_cache.load(score, 'summary') == {'title': 'Test'}
+    assert score_cache.load(score, 'other kind') is None
+
+
+def test_rewriting_the_score_invalidates_its_entries(score):
+    score_cache.store(score, 'summary', 'old')
+    old_stat = os.stat(score)
+    with open(score, 'ab') as f:
+        f.write(b'\n')
+    assert score_cache.load(score, 'summary') is None
+    # The entry of the version that was overwritten can still be asked for
+    assert score_cache.load(score, 'summary', old_stat) == 'old'
+
+
+def test_unreadable_entries_are_ignored(score, capsys):
+    score_cache.store(score, 'summary', 'payload')
+    [(entry_path, _, _)] = score_cache.entries()
+    with open(entry_path, 'wb') as f:
+        f.write(b'not zlib')
+    assert score_cache.load(score, 'summary') is None
+    assert 'unreadable' in capsys.readouterr().out
+
+
+def test_prune_removes_least_recently_used_entries_first(score):
+    for number, kind in enumerate(('a', 'b', 'c')):
+        score_cache.store(score, kind, b'x' * 1000)
+        set_mtime(score_cache._entry_path(score, kind), 1000 + number)
+    score_cache.load(score, 'a')  # Used last now
+    size = score_cache.entries()[0][1]
+    assert score_cache.prune(2 * size) == (1, size)
+    assert score_cache.load(score, 'b') is None
+    assert score_cache.load(score, 'a') is not None and score_cache.load(score, 'c') is not None
+
+
+def test_prune_counts_files_in_subdirectories(score, cache_dir):
+    score_cache.store(score, 'summary', 'payload')
+    thumbnails = cache_dir / 'thumbnails' / 'digest' / '120'
+    thumbnails.mkdir(parents=True)
+    (thumbnails / 'page-0001.png').write_bytes(b'p' * 5000)
+    set_mtime(thumbnails / 'page-0001.png', 1000)
+    (cache_dir / 'entry.tmp').write_bytes(b't' * 5000)  # Still being written
+    assert len(score_cache.entries()) == 2
+    assert score_cache.prune(1000) == (1, 5000)
+    assert score_cache.load(score, 'summary') == 'payload'
+    # Directories left empty go with their last file
+    assert not (cache_dir / 'thumbnails').exists()
+
+
+def test_store_walks_the_cache_only_to_prune_it(score, monkeypatch):
+    walks = []
+    entries = score_cache.entries
+    monkeypatch.setattr(score_cache, 'entries', lambda: walks.append(1) or entries())
+    for kind in 'abcde':
+        score_cache.store(score, kind, b'x' * 1000, max_bytes=1024 * 1024)
+    assert len(walks) == 1  # Once to learn the size of the cache
+    score_cache.store(score, 'big', os.urandom(1024 * 1024), max_bytes=1024 * 1024)
+    assert len(walks) == 2
+    assert score_cache.load(score, 'a') is None
+
+
+def test_store_keeps_the_cache_under_its_cap(score):
+    for number, kind in enumerate('abcdef'):
+        score_cache.store(score, kind, os.urandom(1000), max_bytes=3500)
+        set_mtime(score_cache._entry_path(score, kind), 1000 + number)
+    assert sum(size for _, size, _ in score_cache.entries()) <= 3500
+    assert score_cache.load(score, 'f') is not None
+    assert score_cache.load(score, 'a') is None
+
+
+def test_clear(score):
+    score_cache.store(score, 'a', 1)
+    score_cache.store(score, 'b', 2)
+    assert score_cache.clear()[0] == 2
+    assert score_cache.entries() == []
+
+
+@pytest.mark.parametrize('text, size', [('512', 512), ('512K', 512 * 1024), ('1.5m', 1536 * 1024),
+                                        ('2GB', 2 * 1024 ** 3)])
+def test_parse_size(text, size):
+    assert score_cache.parse_size(text) == size
+
+
+def test_command_line(score, capsys):
+    score_cache.store(score, 'summary', 'payload')
+    assert score_cache.main(['stats']) == 0
+    assert '1 entries' in capsys.readouterr().out
+    assert score_cache.main(['clear']) == 0
+    assert 'Removed 1 entries' in capsys.readouterr().out
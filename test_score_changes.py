@@ -0,0 +1,86 @@
+import fitz  # PyMuPDF
+
+import score_cache
+import score_changes
+from conftest import make_pdf
+from note_table import extract_note_table
+from test_note_table import assert_same_table, rewrite
+
+
+def test_changed_pages():
+    assert score_changes.changed_pages(['a', 'b', 'c'], ['a', 'x', 'c']) == ([1], [])
+    assert score_changes.changed_pages(['a', 'b'], ['a', 'b', 'c']) == ([2], [])
+    assert score_changes.changed_pages(['a', 'b', 'c'], ['a']) == ([], [1, 2])
+    assert score_changes.changed_pages([], []) == ([], [])
+
+
+def test_page_hashes_change_only_for_the_pages_drawn_differently(tmp_path):
+    path = make_pdf(tmp_path / 'score.pdf', 4)
+    before = score_changes.page_hashes(path)
+    assert len(set(before)) == 4
+
+    with fitz.open(path) as document:
+        document[2].insert_text((72, 400), "rev B", fontsize=20)
+        document.save(tmp_path / 'new.pdf')
+    after = score_changes.page_hashes(str(tmp_path / 'new.pdf'))
+    assert score_changes.changed_pages(before, after) == ([2], [])
+
+
+def test_page_hashes_ignore_how_the_file_is_written(tmp_path):
+    path = make_pdf(tmp_path / 'score.pdf', 3)
+    with fitz.open(path) as document:
+        document.save(tmp_path / 'clean.pdf', garbage=4, deflate=True)
+    assert score_changes.page_hashes(str(tmp_path / 'clean.pdf')) == score_changes.page_hashes(path)
+
+
+def test_page_hashes_see_rotation(tmp_path):
+    path = make_pdf(tmp_path / 'score.pdf', 2)
+    with fitz.open(path) as document:
+        document[1].set_rotation(90)
+        document.save(tmp_path / 'rotated.pdf')
+    assert score_changes.changed_pages(score_changes.page_hashes(path),
+                                       score_changes.page_hashes(str(tmp_path / 'rotated.pdf'))) == ([1], [])
+
+
+def test_compare_scores_finds_the_changed_part_and_measure(score_path):
+    _, old = score_changes.index_score(score_path)
+    rewrite(score_path, b'<step>E</step>', b'<step>F</step>', after=b'<part id="P2"')
+    _, new = score_changes.index_score(score_path)
+    changes = score_changes.compare_scores(old, new)
+    assert changes == {'header': False, 'parts': ['P2'], 'removed': [], 'measures': {'P2': [1]}}
+
+
+def test_compare_scores_of_the_same_file_finds_nothing(score_path):
+    _, fingerprint = score_changes.index_score(score_path)
+    changes = score_changes.compare_scores(fingerprint, fingerprint)
+    assert changes == {'header': False, 'parts': [], 'removed': [], 'measures': {}}
+
+
+def test_compare_scores_header_and_parts(score_path):
+    _, old = score_changes.index_score(score_path)
+    rewrite(score_path, b'Test Music Score', b'Another Score')
+    rewrite(score_path, b'"P2"', b'"P3"', after=b'<part id="P1"')
+    _, new = score_changes.index_score(score_path)
+    changes = score_changes.compare_scores(old, new)
+    assert changes['header']
+    assert changes['parts'] == ['P3']
+    assert changes['removed'] == ['P2']
+    assert changes['measures'] == {'P3': [0, 1]}
+
+
+def test_reload_score_updates_the_cached_note_table(score_path):
+    import musicxml_reader
+
+    summary = musicxml_reader.read_summary(score_path)
+    _, fingerprint = score_changes.index_score(score_path)
+    score_cache.store(score_path, 'note-table', extract_note_table(score_path, workers=1))
+
+    rewrite(score_path, b'<step>E</step>', b'<step>F</step>', after=b'<part id="P2"')
+    new_summary, structure, new_fingerprint, changes = score_changes.reload_score(
+        score_path, fingerprint, summary)
+    assert changes['parts'] == ['P2']
+    assert new_summary['part_measures'] == summary['part_measures']
+    assert [part['id'] for part in structure] == ['P1', 'P2']
+    assert score_cache.load(score_path, 'fingerprint') is not None
+    assert_same_table(score_cache.load(score_path, 'note-table'), extract_note_table(score_path, workers=1))
+    assert score_changes.compare_scores(new_fingerprint, score_changes.index_score(score_path)[1])['parts'] == []
@@ -0,0 +1,76 @@
+import pytest
+
+from score_follower import ScoreFollower
+from score_timeline import Timeline
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture
+def follower(qapp, clock):
+    follower = ScoreFollower(Timeline([('1', 0.0, 2.0), ('2', 2.0, 2.0)]), clock=clock)
+    follower.positions = []
+    follower.finishes = []
+    follower.position_changed.connect(lambda index, fraction: follower.positions.append((index, fraction)))
+    follower.finished.connect(lambda: follower.finishes.append(True))
+    yield follower
+    follower.stop()
+
+
+def test_start_and_stop(follower, clock):
+    follower.start()
+    assert follower.is_running()
+    assert follower.timer.isActive()
+    clock.now += 3.0
+    follower.tick()
+    assert follower.positions == [(0, 0.0), (1, 0.5)]
+    follower.stop()
+    assert not follower.is_running()
+    assert not follower.timer.isActive()
+    clock.now += 10.0
+    assert follower.position() == 3.0
+    follower.start()
+    clock.now += 0.5
+    assert follower.position() == 3.5
+
+
+def test_speed(follower, clock):
+    follower.speed = 2.0
+    follower.start()
+    clock.now += 0.5
+    assert follower.position() == 1.0
+
+
+def test_seek_is_clamped(follower, clock):
+    follower.seek(-1.0)
+    assert follower.position() == 0.0
+    follower.seek(10.0)
+    assert follower.position() == 4.0
+    follower.seek_measure(1)
+    assert follower.positions[-1] == (1, 0.0)
+    follower.start()
+    follower.sync(3.0)
+    clock.now += 0.5
+    assert follower.position() == 3.5
+
+
+def test_finished_at_the_end(follower, clock):
+    follower.start()
+    clock.now += 5.0
+    follower.tick()
+    assert follower.finishes == [True]
+    assert not follower.is_running()
+    assert follower.position() == 5.0
+    follower.start()  # Starts over
+    assert follower.position() == 0.0
@@ -0,0 +1,99 @@
+import pytest
+
+import score_cache
+import score_index
+from conftest import TEST_SCORE
+from note_table import extract_note_table
+from score_index import ScoreIndex, parse_duration, parse_pitch
+
+# test_score.musicxml: the piano plays C4 D4 E4 F4 | G4 A4 B4 C5 in quarter
+# notes (rows 0-7), the violin rests, then plays E5 D5 C5 B4 (rows 8-11)
+
+
+@pytest.fixture(scope='module')
+def index():
+    return ScoreIndex(extract_note_table(TEST_SCORE, workers=1))
+
+
+def motif(text):
+    return [parse_pitch(name) for name in text.split()]
+
+
+def test_parse_pitch():
+    assert parse_pitch('C4') == 60
+    assert parse_pitch('F#5') == 78
+    assert parse_pitch('Bb3') == parse_pitch('B-3') == parse_pitch('B♭3') == 58
+    with pytest.raises(ValueError):
+        parse_pitch('H2')
+
+
+def test_parse_duration():
+    assert parse_duration('16th') == 0.25
+    assert parse_duration('0.5') == 0.5
+    with pytest.raises(ValueError):
+        parse_duration('long')
+
+
+def test_notes_by_pitch_part_and_duration(index):
+    assert index.notes(pitch=parse_pitch('C5')).tolist() == [7, 10]
+    assert index.notes(pitch=parse_pitch('C5'), parts=[1]).tolist() == [10]
+    assert index.notes(pitch=parse_pitch('C5'), duration=0.5).tolist() == []
+    assert index.notes(parts=[1]).tolist() == [8, 9, 10, 11]
+    assert len(index.notes()) == 12
+
+
+def test_part_indices(index):
+    assert index.part_indices('violin') == [1]
+    assert index.part_indices('2') == [1]
+    assert index.part_indices('P1') == [0]
+    assert index.part_indices('horn') == []
+
+
+def test_find_motif_at_any_transposition(index):
+    # Two whole steps up: C D E, F G A and G A B
+    assert index.find_motif(motif('C4 D4 E4')).tolist() == [0, 3, 4]
+    assert index.find_motif(motif('C4 D4 E4'), transpose=False).tolist() == [0]
+
+
+def test_find_motif_longer_than_the_ngrams(index):
+    assert index.find_motif(motif('C4 D4 E4 F4 G4')).tolist() == [0]
+    assert index.find_motif(motif('C4 D4 E4 F4 A4')).tolist() == []
+
+
+def test_find_motif_does_not_cross_parts(index):
+    # The piano ends on B4 C5 and the violin starts on E5
+    assert index.find_motif(motif('B4 C5 E5')).tolist() == []
+    assert index.find_motif(motif('E5 D5 C5 B4')).tolist() == [8]
+    assert index.find_motif(motif('E5 D5'), parts=[0]).tolist() == []
+
+
+def test_find_motif_needs_two_notes(index):
+    with pytest.raises(ValueError):
+        index.find_motif(motif('C4'))
+
+
+def test_runs_join_across_barlines(index):
+    assert index.runs(1.0) == [(0, 8), (8, 4)]
+    assert index.runs(1.0, min_length=5) == [(0, 8)]
+    assert index.runs(1.0, parts=[1]) == [(8, 4)]
+    assert index.runs(0.25) == []
+
+
+def test_locations(index):
+    assert index.locations([0, 10]) == [('Piano', 1, 0.0, 'C4'), ('Violin', 2, 2.0, 'C5')]
+
+
+def test_load_index_is_cached(score_path):
+    first = score_index.load_index(score_path)
+    assert score_cache.load(score_path, score_index.CACHE_KIND) is not None
+    assert len(score_index.load_index(score_path).table) == len(first.table)
+
+
+def test_command_line(score_path, capsys):
+    assert score_index.main([score_path, '--motif', 'C4 D4 E4', '--part', 'piano']) == 0
+    out = capsys.readouterr().out
+    assert out.splitlines()[0].split() == ['Piano', 'measure', '1', 'offset', '0', 'C4']
+    assert '3 matches in 2 measures of a part' in out
+    with pytest.raises(SystemExit):
+        score_index.main([score_path, '--part', 'horn'])
+    assert 'parts are: Piano, Violin' in capsys.readouterr().err
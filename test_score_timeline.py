@@ -0,0 +1,89 @@
+import pytest
+
+import score_cache
+import score_timeline
+from conftest import TEST_SCORE
+from score_timeline import Timeline, build_timeline, load_timeline
+
+
+def score(measures, parts=1):
+    """MusicXML text with the measure bodies given, repeated in each part."""
+    body = ''.join(f'<measure number="{number}">{content}</measure>'
+                   for number, content in enumerate(measures, 1))
+    return ('<score-partwise><part-list/>'
+            + ''.join(f'<part id="P{p}">{body}</part>' for p in range(1, parts + 1))
+            + '</score-partwise>')
+
+
+def note(duration, chord=False):
+    return f'<note>{"<chord/>" if chord else ""}<duration>{duration}</duration></note>'
+
+
+def metronome(unit, per_minute, dotted=False):
+    dot = '<beat-unit-dot/>' if dotted else ''
+    return (f'<direction><direction-type><metronome><beat-unit>{unit}</beat-unit>{dot}'
+            f'<per-minute>{per_minute}</per-minute></metronome></direction-type></direction>')
+
+
+def timeline_of(tmp_path, measures, parts=1):
+    path = tmp_path / 'score.musicxml'
+    path.write_text(score(measures, parts))
+    return build_timeline(str(path))
+
+
+def test_locate_and_duration():
+    timeline = Timeline([('1', 0.0, 2.0), ('2', 2.0, 4.0)])
+    assert len(timeline) == 2
+    assert timeline.duration == 6.0
+    assert timeline.locate(1.0) == (0, 0.5)
+    assert timeline.locate(3.0) == (1, 0.25)
+    assert timeline.locate(-1.0) == (0, 0.0)
+    assert timeline.locate(10.0) == (1, 1.0)
+    assert Timeline([]).locate(1.0) is None
+    assert Timeline([]).duration == 0.0
+
+
+def test_test_score_at_the_default_tempo():
+    timeline = build_timeline(TEST_SCORE)
+    assert timeline.numbers == ['1', '2']
+    assert timeline.starts == [0.0, 2.0]
+    assert timeline.duration == 4.0
+
+
+def test_divisions_chords_and_backup(tmp_path):
+    attributes = '<attributes><divisions>2</divisions></attributes>'
+    # Two voices: four quarter notes, then back up for two half notes
+    voices = note(2) * 4 + '<backup><duration>8</duration></backup>' + note(4) + note(4, chord=True) + note(4)
+    timeline = timeline_of(tmp_path, [attributes + voices, note(2) + '<forward><duration>2</duration></forward>'])
+    assert timeline.lengths == [2.0, 1.0]
+
+
+def test_time_signature_for_empty_measures(tmp_path):
+    time = '<attributes><time><beats>3+2</beats><beat-type>8</beat-type></time></attributes>'
+    timeline = timeline_of(tmp_path, [time, ''])
+    assert timeline.lengths == [1.25, 1.25]
+
+
+def test_tempo_marks(tmp_path):
+    sound = '<direction><sound tempo="60"/></direction>'
+    timeline = timeline_of(tmp_path, [
+        sound + note(4),
+        metronome('half', 60) + note(4),
+        metronome('quarter', 40, dotted=True) + note(3),
+        note(2) + '<sound tempo="120"/>' + note(2),
+        metronome('quarter', 'c. 90') + note(4),
+    ])
+    assert timeline.lengths == pytest.approx([4.0, 2.0, 3.0, 2.0 + 1.0, 2.0])
+    assert timeline.starts == pytest.approx([0.0, 4.0, 6.0, 9.0, 12.0])
+
+
+def test_only_the_first_part_counts(tmp_path):
+    timeline = timeline_of(tmp_path, [note(4), note(2)], parts=2)
+    assert timeline.numbers == ['1', '2']
+
+
+def test_load_timeline_is_cached(score_path, monkeypatch):
+    first = load_timeline(score_path)
+    assert score_cache.load(score_path, score_timeline.CACHE_KIND) is not None
+    monkeypatch.setattr(score_timeline, 'build_timeline', lambda path: pytest.fail('rebuilt'))
+    assert load_timeline(score_path).starts == first.starts
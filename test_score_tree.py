@@ -0,0 +1,98 @@
+import pytest
+
+import musicxml_reader
+from conftest import TEST_SCORE
+from score_tree import EVENT, MEASURE, index_file, index_structure
+
+
+@pytest.fixture
+def model(qapp):
+    from score_tree import ScoreTreeModel
+
+    model = ScoreTreeModel(TEST_SCORE, musicxml_reader.read_summary(TEST_SCORE))
+    yield model
+    model.close()
+
+
+def child(model, parent, *labels):
+    """Index of the row of parent whose first column reads labels[0], and so on down."""
+    for label in labels:
+        if model.canFetchMore(parent):
+            model.fetchMore(parent)
+        rows = [model.index(row, 0, parent) for row in range(model.rowCount(parent))]
+        parent = next(index for index in rows if index.data() == label)
+    return parent
+
+
+def test_index_structure():
+    with open(TEST_SCORE, 'rb') as f:
+        data = f.read()
+    parts = index_file(TEST_SCORE)
+    assert [part['id'] for part in parts] == ['P1', 'P2']
+    for part in parts:
+        assert part['numbers'] == ['1', '2']
+        assert data[part['start']:part['end']].startswith(f'<part id="{part["id"]}"'.encode())
+        for start, end in zip(part['starts'], part['ends']):
+            assert data[start:end].startswith(b'<measure') and data[start:end].endswith(b'</measure>')
+        assert part['divisions'].tolist() == [1.0, 1.0]
+
+
+def test_index_structure_of_empty_measures_and_changing_divisions():
+    parts = index_structure(b'<score-partwise><part id="P1">'
+                            b'<measure number="1"><attributes><divisions>4</divisions></attributes></measure>'
+                            b'<measure number="2"/>'
+                            b'<measure number="3"><attributes><divisions> 8</divisions></attributes></measure>'
+                            b'</part></score-partwise>')
+    [part] = parts
+    assert part['numbers'] == ['1', '2', '3']
+    assert len(part['ends']) == 3
+    # Divisions in effect where each measure starts
+    assert part['divisions'].tolist() == [1.0, 4.0, 4.0]
+
+
+def test_timewise_scores_are_refused():
+    with pytest.raises(ValueError):
+        index_structure(b'<score-timewise><measure number="1"/></score-timewise>')
+
+
+def test_model_header_rows(model):
+    rows = [(model.index(row, 0).data(), model.index(row, 1).data()) for row in range(model.rowCount())]
+    assert rows == [('Title', 'Test Music Score'), ('Composer', 'Test Composer'), ('Measures', '2'),
+                    ('Parts', '2 part(s)')]
+
+
+def test_parts_expand_once_the_structure_is_known(model):
+    part = child(model, child(model, model.index(3, 0)), 'P1')
+    assert model.index(part.row(), 1, part.parent()).data() == 'Piano'
+    assert not model.canFetchMore(part)
+    model.set_structure(index_file(TEST_SCORE))
+    assert model.hasChildren(part) and model.canFetchMore(part)
+    assert model.rowCount(part) == 0  # Nothing is created before it is expanded
+    model.fetchMore(part)
+    assert [model.index(row, 0, part).data() for row in range(model.rowCount(part))] == ['Measure 1', 'Measure 2']
+
+
+def test_measures_load_their_notes_on_expand(model):
+    model.set_structure(index_file(TEST_SCORE))
+    measure = child(model, model.index(3, 0), 'P2', 'Measure 2')
+    assert model.node(measure).kind == MEASURE
+    assert model.index(measure.row(), 1, measure.parent()).data() == '4 notes'
+    assert model.node(measure).notes is not None
+    model.fetchMore(measure)
+    events = [(model.index(row, 0, measure).data(), model.index(row, 1, measure).data())
+              for row in range(model.rowCount(measure))]
+    assert events[0] == ('Note at 0', 'E5 (1 quarters)')
+    assert len(events) == 4
+    note = model.index(0, 0, measure)
+    assert model.node(note).kind == EVENT
+    assert model.location(note) == ('P2', '2')
+    assert model.location(model.index(0, 0)) is None
+
+
+def test_parent_of_a_measure(model):
+    model.set_structure(index_file(TEST_SCORE))
+    part = child(model, model.index(3, 0), 'P1')
+    measure = child(model, part, 'Measure 1')
+    assert model.parent(measure) == part
+    assert model.parent(part) == model.index(3, 0)
+    assert not model.parent(model.index(3, 0)).isValid()
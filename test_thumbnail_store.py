@@ -0,0 +1,67 @@
+import os
+import shutil
+
+import fitz  # PyMuPDF
+
+import score_cache
+import thumbnail_store
+from conftest import make_pdf
+
+
+def test_thumbnails_are_stored_and_read_back(tmp_path):
+    path = make_pdf(tmp_path / 'score.pdf', 3)
+    digest, thumbnails = thumbnail_store.load_thumbnails(path)
+    assert thumbnails == {}
+    page_index, data = thumbnail_store.render_thumbnail(path, digest, 1)
+    assert page_index == 1
+    assert fitz.Pixmap(data).width == thumbnail_store.THUMBNAIL_WIDTH
+    assert thumbnail_store.load_thumbnails(path) == (digest, {1: data})
+    # Other widths are stored apart
+    assert thumbnail_store.load_thumbnails(path, width=60)[1] == {}
+
+
+def test_thumbnails_follow_the_contents_not_the_path(tmp_path):
+    path = make_pdf(tmp_path / 'score.pdf', 2)
+    digest, _ = thumbnail_store.load_thumbnails(path)
+    _, data = thumbnail_store.render_thumbnail(path, digest, 0)
+    moved = str(tmp_path / 'moved.pdf')
+    shutil.move(path, moved)
+    assert thumbnail_store.load_thumbnails(moved) == (digest, {0: data})
+
+    make_pdf(moved, 3)
+    new_digest, thumbnails = thumbnail_store.load_thumbnails(moved)
+    assert new_digest != digest and thumbnails == {}
+
+
+def test_thumbnails_of_a_rewritten_pdf_are_not_stored_under_the_old_digest(tmp_path):
+    path = make_pdf(tmp_path / 'score.pdf', 2)
+    digest, _ = thumbnail_store.load_thumbnails(path)
+    make_pdf(path, 3)  # While the page was being rendered
+    _, data = thumbnail_store.render_thumbnail(path, digest, 0)
+    assert data
+    assert not os.path.exists(thumbnail_store.thumbnail_path(digest, thumbnail_store.THUMBNAIL_WIDTH, 0))
+
+
+def test_each_version_of_a_file_is_hashed_once(tmp_path, monkeypatch):
+    path = make_pdf(tmp_path / 'score.pdf', 1)
+    hashed = []
+    pdf_hash = thumbnail_store.pdf_hash
+    monkeypatch.setattr(thumbnail_store, 'pdf_hash', lambda path: hashed.append(path) or pdf_hash(path))
+    digest = thumbnail_store.current_hash(path)
+    assert thumbnail_store.current_hash(path) == digest
+    assert len(hashed) == 1
+    with open(path, 'ab') as f:
+        f.write(b'\n')
+    thumbnail_store.current_hash(path)
+    assert len(hashed) == 2
+
+
+def test_thumbnails_count_towards_the_score_cache(tmp_path, cache_dir):
+    path = make_pdf(tmp_path / 'score.pdf', 2)
+    digest, _ = thumbnail_store.load_thumbnails(path)
+    for page_index in range(2):
+        thumbnail_store.render_thumbnail(path, digest, page_index)
+    assert len(score_cache.entries()) == 2
+    score_cache.clear()
+    assert thumbnail_store.load_thumbnails(path)[1] == {}
+    assert os.listdir(cache_dir) == []
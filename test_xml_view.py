@@ -0,0 +1,100 @@
+import pytest
+
+from conftest import TEST_SCORE, make_mxl
+from xml_view import MAX_LINE_CHARS, XmlSource
+
+
+@pytest.fixture
+def source():
+    source = XmlSource(TEST_SCORE)
+    yield source
+    source.close()
+
+
+def test_lines(source):
+    with open(TEST_SCORE, encoding='utf-8') as f:
+        lines = f.read().splitlines()
+    assert source.line_count() == len(lines)
+    assert [source.line(number) for number in range(source.line_count())] == [
+        line.expandtabs(4) for line in lines]
+
+
+def test_line_of_offset(source):
+    with open(TEST_SCORE, 'rb') as f:
+        data = f.read()
+    offset = data.index(b'<part id="P2"')
+    assert '<part id="P2"' in source.line(source.line_of_offset(offset))
+    assert source.line_of_offset(0) == 0
+
+
+def test_find_part_and_measure(source):
+    part = source.find_part('P2')
+    assert source.line(source.line_of_offset(part)).strip() == '<part id="P2">'
+    measure = source.find_part('P2', 2)
+    assert measure > part
+    assert source.line(source.line_of_offset(measure)).strip() == '<measure number="2">'
+    assert source.find_part('P1', 2) < part
+    assert source.find_part('P3') == -1
+    assert source.find_part('P2', 9) == -1
+
+
+def test_empty_file_and_crlf(tmp_path):
+    (tmp_path / 'empty.xml').write_bytes(b'')
+    empty = XmlSource(str(tmp_path / 'empty.xml'))
+    assert empty.line_count() == 0
+    empty.close()
+
+    (tmp_path / 'crlf.xml').write_bytes(b'<a>\r\n\t<b/>\r\n</a>\r\n')
+    crlf = XmlSource(str(tmp_path / 'crlf.xml'))
+    assert [crlf.line(number) for number in range(crlf.line_count())] == ['<a>', '    <b/>', '</a>']
+    crlf.close()
+
+
+def test_long_lines_are_cut(tmp_path):
+    (tmp_path / 'long.xml').write_bytes(b'<a>' + b'x' * 10 * MAX_LINE_CHARS + b'</a>\n<b/>\n')
+    source = XmlSource(str(tmp_path / 'long.xml'))
+    assert source.line(0) == ('<a>' + 'x' * 10 * MAX_LINE_CHARS)[:MAX_LINE_CHARS] + '…'
+    assert source.line(1) == '<b/>'
+    source.close()
+
+
+def test_compressed_scores(tmp_path, source):
+    with open(TEST_SCORE, 'rb') as f:
+        path = make_mxl(tmp_path / 'score.mxl', {'score.musicxml': f.read()})
+    compressed = XmlSource(path)
+    assert compressed.line_count() == source.line_count()
+    assert compressed.find_part('P2', 1) == source.find_part('P2', 1)
+    compressed.close()
+
+
+def test_view_replaces_and_frees_its_model(qapp, score_path):
+    from PyQt5.QtCore import QEvent
+
+    from xml_view import XmlLineModel, XmlSourceView
+
+    view = XmlSourceView()
+    view.load(score_path)
+    assert view.is_loaded(score_path)
+    first_source = view.source
+    for _ in range(5):
+        view.load(score_path)
+    view.clear()
+    assert view.source is None and view.model().rowCount() == 0
+    assert first_source.data.closed
+    # Replaced models are deleted later, from the event loop
+    qapp.sendPostedEvents(None, QEvent.DeferredDelete)
+    assert view.findChildren(XmlLineModel) == [view.model()]
+    view.deleteLater()
+
+
+def test_view_shows_a_part(qapp, score_path):
+    from xml_view import XmlSourceView
+
+    view = XmlSourceView()
+    assert not view.show_part('P2')
+    view.load(score_path)
+    assert view.show_part('P2', 2)
+    assert view.currentIndex().data().strip() == '<measure number="2">'
+    assert not view.show_part('P3')
+    view.clear()
+    view.deleteLater()
@@ -0,0 +1,94 @@
+"""
+On-disk store of page thumbnails, keyed by a hash of the PDF's contents.
+
+Thumbnails survive renames and moves of the PDF and are regenerated as
+soon as its contents change. They count towards the size cap of the score
+cache and are evicted with its entries. The functions that touch fitz run
+inside the viewer's render worker processes.
+"""
+import hashlib
+import os
+import tempfile
+
+import page_render
+import score_cache
+
+THUMBNAIL_WIDTH = 120  # Width of a thumbnail in pixels
+
+_digests = {}  # (path, size, mtime) -> pdf_hash, in each process
+
+
+def store_dir():
+    """Directory holding the thumbnails, inside the score cache directory."""
+    return os.path.join(score_cache.cache_dir(), 'thumbnails')
+
+
+def pdf_hash(path):
+    """SHA-1 of a file's contents."""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def current_hash(path):
+    """pdf_hash of the file at path as it is now; each version of a file is hashed once."""
+    st = os.stat(path)
+    identity = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+    digest = _digests.get(identity)
+    if digest is None:
+        digest = _digests[identity] = pdf_hash(path)
+    return digest
+
+
+def thumbnail_path(digest, width, page_index):
+    return os.path.join(store_dir(), digest, str(width), f"page-{page_index + 1:04d}.png")
+
+
+def load_thumbnails(path, width=THUMBNAIL_WIDTH):
+    """
+    Hash a PDF and read back its stored thumbnails.
+    Returns (digest, {page index: PNG bytes}).
+    """
+    digest = current_hash(path)
+    directory = os.path.dirname(thumbnail_path(digest, width, 0))
+    thumbnails = {}
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return digest, thumbnails
+    for name in names:
+        if name.startswith('page-') and name.endswith('.png'):
+            thumbnail = os.path.join(directory, name)
+            try:
+                with open(thumbnail, 'rb') as f:
+                    thumbnails[int(name[5:-4]) - 1] = f.read()
+                # Like score cache entries, thumbnails are evicted least recently used first
+                os.utime(thumbnail)
+            except FileNotFoundError:
+                continue  # Evicted meanwhile
+    return digest, thumbnails
+
+
+def render_thumbnail(path, digest, page_index, width=THUMBNAIL_WIDTH):
+    """Render one thumbnail, add it to the store and return (page index, PNG bytes)."""
+    page = page_render.worker_document(path)[page_index]
+    pixmap = page_render.render_pixmap(page, page_render.fit_width_zoom(page, width, 0), 0)
+    data = pixmap.tobytes('png')
+    if current_hash(path) != digest:
+        # The PDF was rewritten after digest was taken: the page may be from the new version
+        return page_index, data
+    output = thumbnail_path(digest, width, page_index)
+    try:
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+        # Write to a temporary file first so readers never see half an image
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(output), suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, output)
+    except OSError as e:
+        print(f"Could not store thumbnail of page {page_index + 1}: {e}")
+        return page_index, data
+    score_cache.count_written(len(data))
+    return page_index, data
@@ -0,0 +1,109 @@
+"""
+Page thumbnail sidebar.
+
+Thumbnails are held by a list model and shown by a QListView with uniform
+item sizes, so only the rows on screen are ever laid out or painted.
+Pages without a thumbnail yet show a blank placeholder of the same size.
+"""
+from PyQt5.QtCore import QAbstractListModel, QModelIndex, QSize, Qt
+from PyQt5.QtGui import QColor, QPixmap
+from PyQt5.QtWidgets import QAbstractItemView, QListView
+
+
+class ThumbnailModel(QAbstractListModel):
+    """One row per page: its number and, once rendered, its thumbnail."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.page_count = 0
+        self.thumbnail_size = QSize()
+        self.thumbnails = {}  # Page index -> QPixmap
+        self.placeholder = QPixmap()
+
+    def set_document(self, page_count, thumbnail_size):
+        """Start over with page_count blank thumbnails of thumbnail_size."""
+        self.beginResetModel()
+        self.page_count = page_count
+        self.thumbnail_size = thumbnail_size
+        self.thumbnails = {}
+        self.placeholder = QPixmap(thumbnail_size)
+        self.placeholder.fill(QColor(Qt.white))
+        self.endResetModel()
+
+    def set_thumbnail(self, page_index, png_data):
+        if not 0 <= page_index < self.page_count:
+            return
+        pixmap = QPixmap()
+        if pixmap.loadFromData(png_data, 'PNG'):
+            self.thumbnails[page_index] = pixmap
+            index = self.index(page_index)
+            self.dataChanged.emit(index, index, [Qt.DecorationRole])
+
+    def keep_thumbnail(self, page_index, pixmap):
+        """Put back a thumbnail already drawn, e.g. one of a page a rewrite left as it was."""
+        if 0 <= page_index < self.page_count:
+            self.thumbnails[page_index] = pixmap
+            index = self.index(page_index)
+            self.dataChanged.emit(index, index, [Qt.DecorationRole])
+
+    def missing_pages(self):
+        return [page for page in range(self.page_count) if page not in self.thumbnails]
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.page_count
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.DisplayRole:
+            return str(index.row() + 1)
+        if role == Qt.DecorationRole:
+            return self.thumbnails.get(index.row(), self.placeholder)
+        if role == Qt.TextAlignmentRole:
+            return Qt.AlignCenter
+        return None
+
+
+class ThumbnailView(QListView):
+    """Single column of thumbnails with their page numbers underneath."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setViewMode(QListView.IconMode)
+        self.setFlow(QListView.TopToBottom)
+        self.setWrapping(False)
+        self.setMovement(QListView.Static)
+        self.setResizeMode(QListView.Adjust)
+        self.setUniformItemSizes(True)
+        self.setSpacing(6)
+        self.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.setModel(ThumbnailModel(self))
+
+    def set_document(self, page_count, thumbnail_size):
+        self.setIconSize(thumbnail_size)
+        self.model().set_document(page_count, thumbnail_size)
+
+    def set_model(self, model):
+        """Show another document's thumbnails, e.g. those of another tab."""
+        if model is self.model():
+            return
+        selection = self.selectionModel()
+        self.setModel(model)
+        selection.deleteLater()
+        self.setIconSize(model.thumbnail_size)
+
+    def visible_rows(self):
+        """Range of rows currently on screen."""
+        rows = self.model().rowCount()
+        if rows == 0:
+            return range(0)
+        # All items have the same size, so rows follow each other at a fixed step
+        first_rect = self.visualRect(self.model().index(0))
+        step = (self.visualRect(self.model().index(1)).top() - first_rect.top()) if rows > 1 else 0
+        if step <= 0:
+            return range(rows)
+        top = -first_rect.top()
+        first = max(0, top // step)
+        last = min(rows - 1, (top + self.viewport().height()) // step)
+        return range(first, last + 1)
@@ -0,0 +1,170 @@
+"""
+Virtualized viewer for the raw text of large MusicXML files.
+
+The file is memory-mapped and indexed by line start offsets, and a
+QListView with uniform item sizes asks the model only for the lines that
+are on screen, so a 40 MB score costs the line index plus a screenful of
+text instead of a full QTextDocument.
+"""
+import mmap
+import re
+import zipfile
+
+import numpy as np
+from PyQt5.QtCore import QAbstractListModel, QModelIndex, Qt
+from PyQt5.QtGui import QFontDatabase
+from PyQt5.QtWidgets import QAbstractItemView, QListView
+
+import musicxml_reader
+
+MAX_LINE_CHARS = 2000  # Longer lines (e.g. minified XML) are cut for display
+
+
+class XmlSource:
+    """Memory-mapped MusicXML text with a line-offset index."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+        if path.lower().endswith('.mxl'):
+            self.data = self._decompress(path)
+        else:
+            self._file = open(path, 'rb')
+            try:
+                self.data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                self.data = b''  # Empty files cannot be mapped
+
+        # Line starts: offset 0 and every byte after a newline
+        newlines = np.flatnonzero(np.frombuffer(self.data, dtype=np.uint8) == 0x0A) + 1
+        if len(newlines) and newlines[-1] == len(self.data):
+            newlines = newlines[:-1]
+        self.line_starts = np.concatenate(([0], newlines)).astype(np.int64)
+
+    @staticmethod
+    def _decompress(path):
+        # Compressed scores are inflated into anonymous shared memory rather
+        # than a Python bytes object, streaming one chunk at a time
+        with zipfile.ZipFile(path) as archive:
+            info = archive.getinfo(musicxml_reader.mxl_rootfile(archive))
+            if info.file_size == 0:
+                return b''
+            data = mmap.mmap(-1, info.file_size)
+            with archive.open(info) as member:
+                while True:
+                    chunk = member.read(1024 * 1024)
+                    if not chunk:
+                        break
+                    data.write(chunk)
+            return data
+
+    def close(self):
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+        if self._file is not None:
+            self._file.close()
+
+    def line_count(self):
+        return len(self.line_starts) if len(self.data) else 0
+
+    def line(self, number):
+        """Text of one line, without its line ending."""
+        start = int(self.line_starts[number])
+        end = int(self.line_starts[number + 1]) if number + 1 < len(self.line_starts) else len(self.data)
+        end = min(end, start + MAX_LINE_CHARS * 4)
+        text = self.data[start:end].decode('utf-8', 'replace').rstrip('\r\n')
+        if len(text) > MAX_LINE_CHARS:
+            text = text[:MAX_LINE_CHARS] + '…'
+        return text.expandtabs(4)
+
+    def line_of_offset(self, offset):
+        """Number of the line containing a byte offset."""
+        return int(np.searchsorted(self.line_starts, offset, side='right')) - 1
+
+    def find_part(self, part_id, measure=None):
+        """
+        Byte offset of <part id="part_id">, or of one of its measures when
+        measure is given (a measure number as written in the file).
+        Returns -1 if it cannot be found.
+        """
+        quoted = re.escape(str(part_id).encode('utf-8'))
+        match = re.search(rb'<part\s[^>]*id=["\']' + quoted + rb'["\']', self.data)
+        if match is None:
+            return -1
+        if measure is None:
+            return match.start()
+        end_match = re.compile(rb'</part>').search(self.data, match.end())
+        end = end_match.start() if end_match else len(self.data)
+        number = re.escape(str(measure).encode('utf-8'))
+        measure_match = re.compile(rb'<measure\s[^>]*number=["\']' + number + rb'["\']').search(
+            self.data, match.end(), end)
+        return measure_match.start() if measure_match else -1
+
+
+class XmlLineModel(QAbstractListModel):
+    """List model exposing the lines of an XmlSource on demand."""
+
+    def __init__(self, source=None, parent=None):
+        super().__init__(parent)
+        self.source = source
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid() or self.source is None:
+            return 0
+        return self.source.line_count()
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and index.isValid():
+            return self.source.line(index.row())
+        return None
+
+
+class XmlSourceView(QListView):
+    """Read-only, virtualized display of a MusicXML file's raw text."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.source = None
+        self.setUniformItemSizes(True)
+        self.setFont(QFontDatabase.systemFont(QFontDatabase.FixedFont))
+        self.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.setModel(XmlLineModel(parent=self))
+
+    def is_loaded(self, path):
+        return self.source is not None and self.source.path == path
+
+    def load(self, path):
+        """Map and index a file and show it from the top."""
+        self._show(XmlSource(path))
+
+    def clear(self):
+        if self.source is not None:
+            self._show(None)
+
+    def _show(self, source):
+        # setModel deletes neither the old model nor its selection model,
+        # and the old model would keep its source mapped
+        old_model = self.model()
+        old_selection = self.selectionModel()
+        old_source = self.source
+        self.source = source
+        self.setModel(XmlLineModel(source, self))
+        old_selection.deleteLater()
+        old_model.deleteLater()
+        if old_source is not None:
+            old_source.close()
+
+    def show_offset(self, offset):
+        """Scroll to and select the line holding a byte offset."""
+        if self.source is None or offset < 0:
+            return False
+        index = self.model().index(self.source.line_of_offset(offset))
+        self.setCurrentIndex(index)
+        self.scrollTo(index, QAbstractItemView.PositionAtTop)
+        return True
+
+    def show_part(self, part_id, measure=None):
+        """Jump to the XML of a part, or of one measure of it."""
+        if self.source is None:
+            return False
+        return self.show_offset(self.source.find_part(part_id, measure))